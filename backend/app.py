@@ -1,22 +1,95 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, g, request, jsonify, send_from_directory, stream_with_context
 from flask_cors import CORS
-from datetime import datetime
+from datetime import date, datetime
+import atexit
+import csv
+import io
+import json
+import math
 import os
-import pandas as pd
+import time
+import numpy as np
 
 from models import db, WaterSample, DiseaseAlert, Prediction, User
+from auth import HasherBusy, HasherTimeout, init_auth, issue_token, require_role, revoke_token
 from database import init_db, get_db_stats
-from prediction import ml_predict, save_prediction
-from notifications import Notification, check_water_quality_alerts, check_disease_alerts
+from prediction import ml_predict, ml_predict_batch, save_prediction, save_predictions, registry, SERVING_FEATURES
+from notifications import Notification, alert_rules
+from outbox import enqueue, start_worker
+from ingest import ingest_water_samples, parse_water_sample, stage_water_sample, DEFAULT_FIELDS
+from metrics import collect as collect_metrics, init_metrics, render as render_metrics
+from facets import facet_index, queue_for_facets, FIELDS as FACET_FIELDS
+from pubsub import notification_bus
+from rollups import BUCKETS, apply_disease_rollups, region_trends
+from summary import get_summary_stats
+from versions import bump_version, conditional_get
+from write_buffer import BufferFull, NotYetDurable, start_write_buffer
+from utils.pagination import keyset_page, parse_limit, stream_json_array
+from utils.serialization import (FastJSONProvider, JSON_MIMETYPE, init_compression, msgpack_available,
+                                 msgpack_bytes, row_serializer, wants_msgpack)
 
 def create_app():
     app = Flask(__name__)
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///health_monitor.db'
+    app.json = FastJSONProvider(app)
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///health_monitor.db')
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['PREDICT_BATCH_MAX_ROWS'] = 10000
+    app.config['PAGE_DEFAULT_LIMIT'] = 50
+    app.config['PAGE_MAX_LIMIT'] = 500
+    app.config['STREAM_CHUNK_SIZE'] = 1000
+    app.config['BULK_CHUNK_SIZE'] = 5000
+    app.config['BULK_MAX_ERRORS'] = 1000
+    app.config['LONG_POLL_TIMEOUT'] = 25.0
+    app.config['SSE_HEARTBEAT_SECONDS'] = 15.0
+    app.config['NOTIFICATION_PAGE_SIZE'] = 50
+    app.config['NOTIFICATION_POLL_SECONDS'] = 1.0  # database check while waiting, without in-process outbox workers
+    app.config['OUTBOX_WORKERS'] = 2  # 0 when run_outbox_worker.py drains the outbox
+    app.config['OUTBOX_BATCH_SIZE'] = 100
+    app.config['OUTBOX_POLL_INTERVAL'] = 1.0
+    app.config['OUTBOX_MAX_ATTEMPTS'] = 5
+    app.config['OUTBOX_LEASE_SECONDS'] = 60
+    app.config['WATER_WRITE_MODE'] = 'sync'  # or 'buffered' for group commit
+    app.config['WRITE_BUFFER_MAX_QUEUE'] = 10000
+    app.config['WRITE_BUFFER_FLUSH_MS'] = 50
+    app.config['WRITE_BUFFER_FLUSH_ROWS'] = 500
+    app.config['WRITE_BUFFER_TIMEOUT'] = 5.0
+    app.config['COMPRESS_MIN_BYTES'] = 500
+    app.config['COMPRESS_LEVEL'] = 6
+    app.config['METRICS_ENABLED'] = True
+    app.config['SECRET_KEY'] = None  # set FLASK_SECRET_KEY, shared by every worker
+    app.config['AUTH_TOKEN_TTL'] = 8 * 3600
+    app.config['AUTH_HASH_METHOD'] = 'scrypt'
+    app.config['AUTH_HASH_WORKERS'] = 2
+    app.config['AUTH_HASH_MAX_PENDING'] = 32
+    app.config['AUTH_HASH_TIMEOUT'] = 10.0
+    # e.g. FLASK_SQLITE_JOURNAL_MODE=DELETE or FLASK_DB_READ_SPLIT=false
+    app.config.from_prefixed_env()
     
     CORS(app)
+    # First in, last out: timings include the auth check and compression
+    init_metrics(app)
+    init_compression(app)
+    atexit.register(init_auth(app).stop)
     init_db(app)
     
+    # Load the model and compile the alert rules once up front
+    registry.warm_up()
+    alert_rules.load()
+    
+    with app.app_context():
+        notification_bus.prime(db.session.query(db.func.max(Notification.id)).scalar())
+        facet_index.rebuild()
+    
+    if int(app.config['OUTBOX_WORKERS']) > 0:
+        outbox_worker = start_worker(app)
+        app.extensions['outbox_worker'] = outbox_worker
+        atexit.register(outbox_worker.stop)
+    
+    if app.config['WATER_WRITE_MODE'] == 'buffered':
+        write_buffer = start_write_buffer(app)
+        app.extensions['write_buffer'] = write_buffer
+        atexit.register(write_buffer.stop)
+    
     return app
 
 app = create_app()
@@ -28,72 +101,205 @@ def health_check():
     return jsonify({
         'status': 'healthy',
         'database': stats,
+        'model': registry.stats(),
+        'write_buffer': app.extensions['write_buffer'].stats() if 'write_buffer' in app.extensions else None,
         'timestamp': datetime.utcnow().isoformat()
     })
 
-@app.route('/api/water', methods=['GET'])
-def get_water_samples():
-    """Get water samples with optional filters"""
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    """Request, SQL, model and queue metrics in the Prometheus text format"""
+    return Response(render_metrics(collect_metrics()), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+def water_samples_query(args):
+    """WaterSample query with the optional GET /api/water filters applied"""
     query = WaterSample.query
     
-    # Apply filters
-    if request.args.get('state'):
-        query = query.filter(WaterSample.state == request.args.get('state'))
+    if args.get('state'):
+        query = query.filter(WaterSample.state == args.get('state'))
     
-    if request.args.get('district'):
-        query = query.filter(WaterSample.district == request.args.get('district'))
+    if args.get('district'):
+        query = query.filter(WaterSample.district == args.get('district'))
     
-    if request.args.get('start_date'):
-        start_date = datetime.fromisoformat(request.args.get('start_date'))
+    if args.get('start_date'):
+        start_date = datetime.fromisoformat(args.get('start_date'))
         query = query.filter(WaterSample.sample_date >= start_date)
     
-    if request.args.get('end_date'):
-        end_date = datetime.fromisoformat(request.args.get('end_date'))
+    if args.get('end_date'):
+        end_date = datetime.fromisoformat(args.get('end_date'))
         query = query.filter(WaterSample.sample_date <= end_date)
     
-    samples = query.order_by(WaterSample.sample_date.desc()).all()
-    return jsonify([sample.to_dict() for sample in samples])
+    return query
+
+# Columns every list response selects, in to_dict() order
+WATER_SAMPLE_COLUMNS = [
+    WaterSample.id, WaterSample.location, WaterSample.state, WaterSample.district,
+    WaterSample.ph, WaterSample.turbidity, WaterSample.bacterial_count, WaterSample.temperature,
+    WaterSample.contamination_level, WaterSample.sample_date
+]
+DISEASE_ALERT_COLUMNS = [
+    DiseaseAlert.id, DiseaseAlert.disease, DiseaseAlert.cases, DiseaseAlert.risk_level,
+    DiseaseAlert.location, DiseaseAlert.state, DiseaseAlert.district, DiseaseAlert.reported_at
+]
+SERIALIZE_WATER_SAMPLES = row_serializer(WATER_SAMPLE_COLUMNS)
+SERIALIZE_DISEASE_ALERTS = row_serializer(DISEASE_ALERT_COLUMNS)
+
+def list_response(query, sort_column, id_column, columns, serialize_rows):
+    """Serve a list endpoint as a full list, a keyset page or a streamed array.
+    
+    ?limit=/?cursor= return {'items': [...], 'next_cursor': ...}; ?stream=1
+    streams the full list from a server-side cursor. Without either the
+    plain JSON list is returned, as before.
+    
+    Only the given columns are selected and rows stay plain tuples, so no
+    ORM objects are built; serialize_rows (see row_serializer) turns a batch
+    of them into the same dicts to_dict() returns. ?format=columnar replaces
+    the row objects with {'column': [values...]}, and clients that prefer
+    application/msgpack in Accept get the same payload as MessagePack.
+    """
+    args = request.args
+    columnar = args.get('format', 'json') == 'columnar'
+    if args.get('format', 'json') not in ('json', 'columnar'):
+        return jsonify({'error': 'format must be json or columnar'}), 400
+    
+    binary = wants_msgpack()
+    if binary and not msgpack_available():
+        if request.accept_mimetypes[JSON_MIMETYPE] == 0:
+            return jsonify({'error': 'application/msgpack is not available on this server'}), 406
+        binary = False
+    
+    query = query.with_entities(*columns)
+    
+    if args.get('stream', '').lower() in ('1', 'true'):
+        if columnar or binary:
+            return jsonify({'error': 'stream=1 only supports JSON rows'}), 400
+        rows = query.order_by(sort_column.desc(), id_column.desc())
+        chunk_size = app.config['STREAM_CHUNK_SIZE']
+        return Response(stream_with_context(stream_json_array(rows, serialize_rows, chunk_size)),
+                        mimetype='application/json')
+    
+    if columnar:
+        names = [column.key for column in columns]
+        
+        def serialize_all(rows):
+            values = zip(*rows) if rows else ([] for _ in names)
+            return dict(zip(names, (list(column) for column in values)))
+    else:
+        serialize_all = serialize_rows
+    
+    if 'limit' in args or 'cursor' in args:
+        try:
+            limit = parse_limit(args.get('limit'), app.config['PAGE_DEFAULT_LIMIT'], app.config['PAGE_MAX_LIMIT'])
+            rows, next_cursor = keyset_page(query, sort_column, id_column, limit, args.get('cursor'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        payload = {
+            'items': serialize_all(rows),
+            'next_cursor': next_cursor
+        }
+    else:
+        payload = serialize_all(query.order_by(sort_column.desc(), id_column.desc()).all())
+    
+    response = Response(msgpack_bytes(payload), mimetype='application/msgpack') if binary else jsonify(payload)
+    response.vary.add('Accept')
+    return response
+
+@app.route('/api/water', methods=['GET'])
+@conditional_get('water_samples')
+def get_water_samples():
+    """Get water samples with optional filters"""
+    try:
+        query = water_samples_query(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return list_response(query, WaterSample.sample_date, WaterSample.id, WATER_SAMPLE_COLUMNS,
+                         SERIALIZE_WATER_SAMPLES)
 
 @app.route('/api/water', methods=['POST'])
 def add_water_sample():
-    """Add new water sample"""
+    """Add new water sample.
+    
+    With WATER_WRITE_MODE='buffered' the sample is group-committed by the write
+    buffer: the reply is 202 with the assigned id as soon as it is staged, or
+    201 once it is durable when the request asks for ?durable=1 (202 with
+    status "accepted, not yet durable" if the commit outlasts the wait).
+    """
     data = request.get_json()
     
     try:
-        sample = WaterSample(
-            location=data['location'],
-            state=data['state'],
-            district=data['district'],
-            ph=float(data['ph']),
-            turbidity=float(data['turbidity']),
-            bacterial_count=float(data['bacterial_count']),
-            temperature=float(data['temperature']),
-            contamination_level=data['contamination_level']
-        )
-        
-        db.session.add(sample)
+        fields = parse_water_sample(data)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+    
+    write_buffer = app.extensions.get('write_buffer')
+    if write_buffer is not None:
+        durable = request.args.get('durable', '').lower() in ('1', 'true')
+        try:
+            sample = write_buffer.submit(fields, durable=durable)
+        except (BufferFull, TimeoutError) as e:
+            # Nothing was written, so retrying cannot duplicate the sample
+            return jsonify({'error': str(e)}), 503, {'Retry-After': '1'}
+        except NotYetDurable as e:
+            return jsonify(dict(e.sample, status=str(e))), 202
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+        return jsonify(sample), 201 if durable else 202
+    
+    try:
+        sample = stage_water_sample(fields)
         db.session.commit()
         
-        # Check for alerts
-        check_water_quality_alerts(sample)
-        
         return jsonify(sample.to_dict()), 201
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
-@app.route('/api/alerts', methods=['GET'])
-def get_disease_alerts():
-    """Get disease alerts with optional filters"""
+def disease_alerts_query(args):
+    """DiseaseAlert query with the optional GET /api/alerts filters applied"""
     query = DiseaseAlert.query
     
-    if request.args.get('disease'):
-        query = query.filter(DiseaseAlert.disease == request.args.get('disease'))
+    if args.get('disease'):
+        query = query.filter(DiseaseAlert.disease == args.get('disease'))
+    
+    if args.get('district'):
+        query = query.filter(DiseaseAlert.district == args.get('district'))
+    
+    return query
+
+@app.route('/api/water/bulk', methods=['POST'])
+def add_water_samples_bulk():
+    """Bulk-load water samples from a CSV or NDJSON body.
+    
+    Query args matching sample fields (e.g. ?district=Ranchi) fill columns the
+    upload does not carry; ?chunk_size= sets how many rows go in per commit.
+    """
+    if request.mimetype == 'text/csv':
+        fmt = 'csv'
+    elif request.mimetype in ('application/x-ndjson', 'application/jsonl', 'application/json-seq'):
+        fmt = 'ndjson'
+    else:
+        return jsonify({'error': 'Send text/csv or application/x-ndjson'}), 415
+    
+    try:
+        chunk_size = int(request.args.get('chunk_size', app.config['BULK_CHUNK_SIZE']))
+        if chunk_size < 1:
+            raise ValueError
+    except ValueError:
+        return jsonify({'error': 'chunk_size must be a positive integer'}), 400
     
-    if request.args.get('district'):
-        query = query.filter(DiseaseAlert.district == request.args.get('district'))
+    defaults = {key: value for key, value in request.args.items() if key in DEFAULT_FIELDS}
+    report = ingest_water_samples(request.stream, fmt, defaults, chunk_size,
+                                  app.config['BULK_MAX_ERRORS'])
     
-    alerts = query.order_by(DiseaseAlert.reported_at.desc()).all()
-    return jsonify([alert.to_dict() for alert in alerts])
+    return jsonify(report), 201 if report['inserted'] else 400
+
+@app.route('/api/alerts', methods=['GET'])
+@conditional_get('disease_alerts')
+def get_disease_alerts():
+    """Get disease alerts with optional filters"""
+    query = disease_alerts_query(request.args)
+    return list_response(query, DiseaseAlert.reported_at, DiseaseAlert.id, DISEASE_ALERT_COLUMNS,
+                         SERIALIZE_DISEASE_ALERTS)
 
 @app.route('/api/alerts', methods=['POST'])
 def add_disease_alert():
@@ -111,10 +317,14 @@ def add_disease_alert():
         )
         
         db.session.add(alert)
-        db.session.commit()
+        versions = bump_version('disease_alerts')
+        db.session.flush()
+        apply_disease_rollups([alert])
+        queue_for_facets(db.session, alerts=[alert], versions=versions)
         
-        # Check for alerts
-        check_disease_alerts(alert)
+        # Notifications are created by the outbox worker after this single commit
+        enqueue('disease_alert.alerts', {'alert_id': alert.id})
+        db.session.commit()
         
         return jsonify(alert.to_dict()), 201
     except Exception as e:
@@ -146,82 +356,296 @@ def predict_risk():
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
+@app.route('/api/predict/batch', methods=['POST'])
+def predict_risk_batch():
+    """Predict disease risk for many samples (JSON array or CSV) in one call"""
+    if request.mimetype == 'text/csv':
+        rows = list(csv.DictReader(io.StringIO(request.get_data(as_text=True))))
+    else:
+        data = request.get_json(silent=True)
+        rows = data.get('rows') if isinstance(data, dict) else data
+        if not isinstance(rows, list):
+            return jsonify({'error': 'Expected a JSON array of samples or a CSV body'}), 400
+    
+    max_rows = app.config['PREDICT_BATCH_MAX_ROWS']
+    if len(rows) > max_rows:
+        return jsonify({'error': f'Batch too large: {len(rows)} rows (max {max_rows})'}), 413
+    
+    # Validate every row first; bad rows are reported without failing the batch
+    valid_rows, features, errors = [], [], []
+    for index, row in enumerate(rows):
+        try:
+            values = [float(row[name]) for name in SERVING_FEATURES]
+            for name, value in zip(SERVING_FEATURES, values):
+                if not math.isfinite(value):
+                    raise ValueError(f'{name} must be finite')
+            location = row['location']
+            if not location:
+                raise ValueError('location is required')
+        except KeyError as e:
+            errors.append({'row': index, 'error': f'missing field {e}'})
+            continue
+        except (TypeError, ValueError) as e:
+            errors.append({'row': index, 'error': str(e)})
+            continue
+        features.append(values)
+        valid_rows.append((index, location))
+    
+    if not valid_rows:
+        return jsonify({'results': [], 'errors': errors, 'count': 0}), 400
+    
+    try:
+        matrix = np.array(features, dtype=np.float64)
+        risks, scores = ml_predict_batch(matrix)
+        
+        records = [{
+            'ph': ph,
+            'turbidity': turbidity,
+            'bacterial_count': bacterial_count,
+            'temperature': temperature,
+            'location': location,
+            'risk': risk,
+            'score': score
+        } for (ph, turbidity, bacterial_count, temperature), (_, location), risk, score
+            in zip(features, valid_rows, risks, scores)]
+        ids = save_predictions(records)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    
+    results = [{
+        'row': index,
+        'risk': risk,
+        'score': round(score, 2),
+        'id': prediction_id
+    } for (index, _), risk, score, prediction_id in zip(valid_rows, risks, scores, ids)]
+    
+    return jsonify({'results': results, 'errors': errors, 'count': len(results)})
+
 @app.route('/api/summary', methods=['GET'])
+@conditional_get('water_samples')
 def get_summary():
     """Get summary statistics"""
     try:
-        # Get water quality statistics
-        samples = WaterSample.query.all()
-        
-        if not samples:
-            return jsonify({
-                'avg_ph': 0,
-                'avg_turbidity': 0,
-                'contamination_index': 0,
-                'sample_count': 0
-            })
-        
-        df = pd.DataFrame([{
-            'ph': s.ph,
-            'turbidity': s.turbidity,
-            'contamination_level': s.contamination_level
-        } for s in samples])
-        
-        avg_ph = df['ph'].mean()
-        avg_turbidity = df['turbidity'].mean()
-        contamination_count = len(df[df['contamination_level'].isin(['High Risk', 'Moderate'])])
-        contamination_index = (contamination_count / len(df)) * 100
-        
-        return jsonify({
-            'avg_ph': round(avg_ph, 2),
-            'avg_turbidity': round(avg_turbidity, 2),
-            'contamination_index': round(contamination_index, 1),
-            'sample_count': len(samples)
-        })
+        return jsonify(get_summary_stats())
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
+@app.route('/api/regions', methods=['GET'])
+@conditional_get('water_samples', 'disease_alerts')
+def get_regions():
+    """Water quality and disease trends per district, read from the daily rollups"""
+    bucket = request.args.get('bucket', 'month')
+    if bucket not in BUCKETS:
+        return jsonify({'error': f"bucket must be one of {', '.join(BUCKETS)}"}), 400
+    
+    try:
+        start_date = date.fromisoformat(request.args['start_date'][:10]) if request.args.get('start_date') else None
+        end_date = date.fromisoformat(request.args['end_date'][:10]) if request.args.get('end_date') else None
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    regions = region_trends(
+        state=request.args.get('state'),
+        district=request.args.get('district'),
+        start=start_date,
+        end=end_date,
+        bucket=bucket
+    )
+    return jsonify({'bucket': bucket, 'regions': regions})
+
+@app.route('/api/facets', methods=['GET'])
+@conditional_get('water_samples', 'disease_alerts')
+def get_facets():
+    """Filter values with counts from the in-memory facet index.
+    
+    Without q: the state → district → location tree (optionally narrowed by
+    state/district) plus diseases. With q: prefix matches for autocomplete,
+    optionally limited to one field.
+    """
+    # Catch up with inserts committed by other processes; the ETag above is
+    # derived from the same table versions
+    facet_index.refresh()
+    prefix = request.args.get('q')
+    if prefix is None:
+        return jsonify(facet_index.tree(request.args.get('state'), request.args.get('district')))
+    
+    field = request.args.get('field')
+    if field is not None and field not in FACET_FIELDS:
+        return jsonify({'error': f"field must be one of {', '.join(FACET_FIELDS)}"}), 400
+    try:
+        limit = parse_limit(request.args.get('limit'), 10, app.config['PAGE_MAX_LIMIT'])
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'q': prefix, 'matches': facet_index.search(prefix, field, limit)})
+
 @app.route('/api/login', methods=['POST'])
 def login():
-    """User login endpoint"""
+    """User login endpoint.
+    
+    Returns a signed token to send as "Authorization: Bearer <token>"; it
+    carries the user id and role, so later requests need no user lookup.
+    """
     data = request.get_json()
     
     try:
         username = data['username']
         password = data['password']
         
-        # Find user in database
-        user = User.query.filter_by(username=username, password=password).first()
+        # Find user in database; the password is checked against its hash off-thread
+        user = User.query.filter_by(username=username).first()
+        hasher = app.extensions['password_hasher']
+        matches, needs_rehash = hasher.verify(user.password if user else None, password)
         
-        if user:
+        if matches:
+            if needs_rehash:
+                # Plaintext from before hashing (or an older method): upgrade it now
+                user.password = hasher.hash(password)
+                db.session.commit()
+            token, expires_in = issue_token(user)
             return jsonify({
                 'status': 'success',
                 'message': 'Login successful',
                 'role': user.role,
-                'user_id': user.id
+                'user_id': user.id,
+                'token': token,
+                'token_type': 'Bearer',
+                'expires_in': expires_in
             })
         else:
             return jsonify({
                 'status': 'error',
                 'message': 'Invalid username or password'
             }), 401
+    except HasherBusy as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 503, {'Retry-After': '1'}
+    except HasherTimeout as e:
+        # Not a credentials failure: the hash queue is backed up
+        return jsonify({'status': 'error', 'message': str(e)}), 503, {'Retry-After': '1'}
     except Exception as e:
         return jsonify({
             'status': 'error',
             'message': str(e)
         }), 400
 
+@app.route('/api/logout', methods=['POST'])
+@require_role()
+def logout():
+    """Revoke the bearer token used for this request"""
+    revoke_token(g.user)
+    return jsonify({'status': 'success', 'message': 'Logged out'})
+
+def notifications_since(since_id, limit):
+    """Notifications newer than since_id, oldest first; from memory when possible"""
+    items, complete = notification_bus.since(since_id, limit)
+    if complete:
+        return items
+    rows = (Notification.query
+            .filter(Notification.id > since_id)
+            .order_by(Notification.id)
+            .limit(limit)
+            .all())
+    items = [row.to_dict() for row in rows]
+    # Fill the buffer's gaps so the next reader is served from memory
+    notification_bus.publish(items)
+    return items
+
+def wait_for_notifications(since_id, timeout, limit):
+    """notification_bus.wait() that also notices notifications created by other processes.
+    
+    When run_outbox_worker.py drains the outbox, alert notifications are
+    committed in that process and never published on this bus, so waiters
+    check max(id) every NOTIFICATION_POLL_SECONDS and read what is new from
+    the database.
+    """
+    if 'outbox_worker' in app.extensions:
+        return notification_bus.wait(since_id, timeout, limit)
+    
+    interval = float(app.config['NOTIFICATION_POLL_SECONDS'])
+    deadline = time.monotonic() + timeout
+    while True:
+        remaining = deadline - time.monotonic()
+        items, complete = notification_bus.wait(since_id, max(0.0, min(interval, remaining)), limit)
+        if items or not complete:
+            return items, complete
+        notification_bus.prime(db.session.query(db.func.max(Notification.id)).scalar())
+        # Hold no pooled connection between checks
+        db.session.close()
+        if remaining <= interval:
+            return notification_bus.since(since_id, limit)
+
 @app.route('/api/notifications', methods=['GET'])
+@conditional_get('notifications', skip=lambda request: 'since_id' in request.args)
 def get_notifications():
-    """Get notifications for current user"""
+    """Get notifications for current user.
+    
+    With ?since_id=N this is a long poll: it returns as soon as anything newer
+    than N is created, or an empty list after ?timeout= seconds.
+    """
     try:
+        if 'since_id' in request.args:
+            since_id = int(request.args['since_id'])
+            timeout = min(float(request.args.get('timeout', app.config['LONG_POLL_TIMEOUT'])),
+                          app.config['LONG_POLL_TIMEOUT'])
+            limit = app.config['NOTIFICATION_PAGE_SIZE']
+            
+            items = notifications_since(since_id, limit)
+            if not items:
+                items, _ = wait_for_notifications(since_id, timeout, limit)
+                if not items and notification_bus.last_id is not None and notification_bus.last_id > since_id:
+                    items = notifications_since(since_id, limit)
+            
+            return jsonify({
+                'notifications': list(reversed(items)),
+                'last_id': items[-1]['id'] if items else since_id
+            })
+        
         notifications = Notification.query.order_by(Notification.created_at.desc()).limit(50).all()
         return jsonify({
-            'notifications': [notification.to_dict() for notification in notifications]
+            'notifications': [notification.to_dict() for notification in notifications],
+            'last_id': notification_bus.last_id
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
+@app.route('/api/notifications/stream', methods=['GET'])
+def stream_notifications():
+    """Server-Sent Events stream of new notifications.
+    
+    Resumes after the Last-Event-ID header (or ?since_id=) when given,
+    otherwise starts with notifications created from now on.
+    """
+    cursor = request.headers.get('Last-Event-ID') or request.args.get('since_id')
+    try:
+        cursor = int(cursor) if cursor is not None else (notification_bus.last_id or 0)
+    except ValueError:
+        return jsonify({'error': 'since_id must be an integer'}), 400
+    
+    heartbeat = app.config['SSE_HEARTBEAT_SECONDS']
+    limit = app.config['NOTIFICATION_PAGE_SIZE']
+    
+    def events(cursor):
+        yield 'retry: 3000\n\n'
+        while True:
+            items = notifications_since(cursor, limit)
+            # The catch-up query is the only DB access; release the connection
+            db.session.close()
+            if not items:
+                items, complete = wait_for_notifications(cursor, heartbeat, limit)
+                if not complete:
+                    continue
+            if not items:
+                yield ': keep-alive\n\n'
+                continue
+            for item in items:
+                yield f"id: {item['id']}\nevent: notification\ndata: {json.dumps(item)}\n\n"
+            cursor = items[-1]['id']
+    
+    return Response(stream_with_context(events(cursor)), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
 @app.route('/uploads/<filename>')
 def uploaded_file(filename):
     """Serve uploaded files"""
@@ -238,14 +662,21 @@ if __name__ == '__main__':
     print("Smart Community Health Monitoring Backend")
     print("API Endpoints:")
     print("   GET  /api/health")
+    print("   GET  /api/metrics")
     print("   POST /api/login")
+    print("   POST /api/logout")
     print("   GET  /api/water")
     print("   POST /api/water")
+    print("   POST /api/water/bulk")
     print("   GET  /api/alerts")
     print("   POST /api/alerts")
     print("   POST /api/predict")
+    print("   POST /api/predict/batch")
     print("   GET  /api/summary")
+    print("   GET  /api/regions")
+    print("   GET  /api/facets")
     print("   GET  /api/notifications")
+    print("   GET  /api/notifications/stream")
     print("   GET  /uploads/<file>")
     print("\nServer running on http://0.0.0.0:5000")
     
@@ -0,0 +1,207 @@
+"""
+Signed session tokens and salted password hashes.
+
+/api/login returns a token signed with SECRET_KEY that carries the user id,
+role and expiry, so a before_request hook can authenticate every request
+without touching the database; g.user is the decoded claims or None.
+/api/logout adds the token's id to an in-memory revocation set until it
+would have expired anyway. Like the notification bus, that set only covers
+this process: with several workers, keep AUTH_TOKEN_TTL short.
+
+Passwords are stored as werkzeug hashes. Hashing runs on a small bounded
+executor so a burst of logins cannot occupy every CPU; hashlib releases the
+GIL, so other requests keep being served meanwhile. Plaintext passwords
+from older databases are replaced by a hash at the user's next login.
+"""
+
+import os
+import hmac
+import time
+import uuid
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from functools import wraps
+
+from flask import current_app, g, jsonify, request
+from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
+from werkzeug.security import check_password_hash, generate_password_hash
+
+logger = logging.getLogger(__name__)
+
+TOKEN_SALT = 'auth-token'
+
+# Prefixes of werkzeug's "method$salt$hash" strings; anything else is a legacy plaintext password
+HASH_PREFIXES = ('scrypt:', 'pbkdf2:')
+
+class HasherBusy(Exception):
+    """Too many password hashes already queued"""
+
+class HasherTimeout(Exception):
+    """A queued password hash did not finish within AUTH_HASH_TIMEOUT"""
+
+class RevocationList:
+    """Token ids revoked before their expiry, forgotten once they would have expired"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._expiry = {}  # jti → unix time the token expires
+        self._next_purge = 0.0
+
+    def revoke(self, jti, expires_at):
+        with self._lock:
+            self._expiry[jti] = expires_at
+            self._purge(time.time())
+
+    def is_revoked(self, jti):
+        with self._lock:
+            expires_at = self._expiry.get(jti)
+            return expires_at is not None and expires_at > time.time()
+
+    def _purge(self, now):
+        if now < self._next_purge:
+            return
+        self._expiry = {jti: expires_at for jti, expires_at in self._expiry.items() if expires_at > now}
+        self._next_purge = now + 60
+
+    def __len__(self):
+        with self._lock:
+            return len(self._expiry)
+
+class PasswordHasher:
+    """werkzeug hashing on a bounded thread pool"""
+
+    def __init__(self, method, workers, max_pending, timeout):
+        self.method = method
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._pending = 0
+        self._completed = 0
+        self._rejected = 0
+        self._timed_out = 0
+        self._lock = threading.Lock()
+        # Compared against for unknown users so they take as long as wrong passwords
+        self._dummy = generate_password_hash(uuid.uuid4().hex, method=method)
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise HasherBusy('Too many logins in progress, retry shortly')
+        with self._lock:
+            self._pending += 1
+        future = self._executor.submit(fn, *args)
+        # The slot is held until the hash finishes, even if the caller timed out
+        future.add_done_callback(self._finished)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            # The server is overloaded; the credentials were never checked
+            with self._lock:
+                self._timed_out += 1
+            raise HasherTimeout('Login timed out waiting for the password hasher, retry shortly') from None
+
+    def _finished(self, future):
+        with self._lock:
+            self._pending -= 1
+            self._completed += 1
+        self._slots.release()
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, stored, password):
+        """(matches, needs_rehash) for a stored hash or legacy plaintext password"""
+        if stored is None:
+            self._run(check_password_hash, self._dummy, password)
+            return False, False
+        if not stored.startswith(HASH_PREFIXES):
+            return hmac.compare_digest(stored.encode(), password.encode()), True
+        matches = self._run(check_password_hash, stored, password)
+        return matches, matches and not stored.startswith(self.method.split(':')[0] + ':')
+
+    def stats(self):
+        with self._lock:
+            return {'pending': self._pending, 'completed': self._completed, 'rejected': self._rejected,
+                    'timed_out': self._timed_out}
+
+    def stop(self):
+        self._executor.shutdown(wait=False)
+
+def hash_password(password, method='scrypt'):
+    """Synchronous hash for scripts (seeding, admin tools)"""
+    return generate_password_hash(password, method=method)
+
+def _serializer(app):
+    return URLSafeTimedSerializer(app.config['SECRET_KEY'], salt=TOKEN_SALT,
+                                  signer_kwargs={'digest_method': hashlib.sha256})
+
+def issue_token(user):
+    """Signed token for a user; returns (token, seconds until it expires)"""
+    ttl = int(current_app.config['AUTH_TOKEN_TTL'])
+    claims = {'uid': user.id, 'role': user.role, 'jti': uuid.uuid4().hex, 'exp': int(time.time()) + ttl}
+    return _serializer(current_app).dumps(claims), ttl
+
+def verify_token(token):
+    """Claims of a valid, unexpired and unrevoked token; raises ValueError otherwise"""
+    try:
+        claims = _serializer(current_app).loads(token, max_age=int(current_app.config['AUTH_TOKEN_TTL']))
+    except SignatureExpired as e:
+        raise ValueError('Token expired') from e
+    except BadSignature as e:
+        raise ValueError('Invalid token') from e
+    if claims['exp'] <= time.time():
+        raise ValueError('Token expired')
+    if current_app.extensions['auth_revocations'].is_revoked(claims['jti']):
+        raise ValueError('Token revoked')
+    return claims
+
+def revoke_token(claims):
+    current_app.extensions['auth_revocations'].revoke(claims['jti'], claims['exp'])
+
+def require_role(*roles):
+    """Reject requests without a valid token (401) or, when roles are given, another role (403)"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if g.get('user') is None:
+                return jsonify({'error': 'Authentication required'}), 401, {'WWW-Authenticate': 'Bearer'}
+            if roles and g.user['role'] not in roles:
+                return jsonify({'error': 'Forbidden'}), 403
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def init_auth(app):
+    """Token verification hook, revocation set and password hasher for the app"""
+    if not app.config.get('SECRET_KEY'):
+        # Tokens then only verify in this process and die with it
+        logger.warning('SECRET_KEY is not set (FLASK_SECRET_KEY); using a random per-process key')
+        app.config['SECRET_KEY'] = os.urandom(32).hex()
+
+    app.extensions['auth_revocations'] = RevocationList()
+    app.extensions['password_hasher'] = PasswordHasher(
+        app.config['AUTH_HASH_METHOD'],
+        int(app.config['AUTH_HASH_WORKERS']),
+        int(app.config['AUTH_HASH_MAX_PENDING']),
+        float(app.config['AUTH_HASH_TIMEOUT'])
+    )
+
+    @app.before_request
+    def authenticate():
+        g.user = None
+        header = request.headers.get('Authorization', '')
+        if not header:
+            return None
+        scheme, _, token = header.partition(' ')
+        if scheme.lower() != 'bearer' or not token:
+            return jsonify({'error': 'Expected Authorization: Bearer <token>'}), 401
+        try:
+            g.user = verify_token(token.strip())
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 401, {'WWW-Authenticate': 'Bearer error="invalid_token"'}
+        return None
+
+    return app.extensions['password_hasher']
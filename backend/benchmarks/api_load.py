@@ -0,0 +1,251 @@
+"""
+Load and latency benchmark for the HTTP API.
+
+Starts the app in-process against a temporary database seeded with --rows
+water samples (plus alerts and a login user), warms every scenario up once,
+then runs --clients concurrent clients for --seconds. Each client picks
+scenarios at random: a read with probability --read-share, otherwise a
+write, weighted within each group by SCENARIOS. The report is JSON with
+throughput and p50/p95/p99 latency per scenario. Run from the backend folder:
+
+    python -m benchmarks.api_load --rows 100000 --clients 8 --seconds 20
+    python -m benchmarks.api_load --save-baseline      # store the current numbers
+    python -m benchmarks.api_load --compare            # exit 1 on regressions
+
+Baselines live in benchmarks/baselines/, one file per (rows, clients,
+read share). They are machine specific: record one on the machine you
+compare on. The SSE stream and /uploads are not exercised.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+
+from benchmarks.common import LOCATIONS, percentile, seed_disease_alerts, seed_water_samples, use_scratch_database
+
+BASELINE_DIR = os.path.join(os.path.dirname(__file__), 'baselines')
+
+USERNAME, PASSWORD = 'bench', 'bench-password'
+
+def _sample(rng):
+    location, state, district = rng.choice(LOCATIONS)
+    return {
+        'location': location, 'state': state, 'district': district,
+        'ph': round(rng.uniform(6.0, 8.5), 1), 'turbidity': round(rng.uniform(0.5, 6.0), 1),
+        'bacterial_count': rng.randint(0, 2000), 'temperature': round(rng.uniform(20, 40), 1),
+        'contamination_level': rng.choice(['Safe', 'Moderate', 'High Risk'])
+    }
+
+def _district(rng):
+    return rng.choice(LOCATIONS)[2]
+
+def _bulk_csv(rng, rows=100):
+    fields = ['location', 'state', 'district', 'ph', 'turbidity', 'bacterial_count', 'temperature',
+              'contamination_level']
+    lines = [','.join(fields)]
+    for _ in range(rows):
+        sample = _sample(rng)
+        lines.append(','.join(str(sample[field]) for field in fields))
+    return '\n'.join(lines) + '\n'
+
+# name → (group, weight within the group, request builder, accepted status codes)
+# Builders take a random.Random and return test-client keyword arguments.
+SCENARIOS = {
+    'health': ('read', 1, lambda rng: {'method': 'GET', 'path': '/api/health'}, {200}),
+    'water_page': ('read', 6, lambda rng: {'method': 'GET', 'path': '/api/water?limit=50'}, {200}),
+    'water_district': ('read', 4, lambda rng: {
+        'method': 'GET', 'path': f'/api/water?district={_district(rng)}&limit=100'}, {200}),
+    'water_columnar': ('read', 2, lambda rng: {
+        'method': 'GET', 'path': '/api/water?format=columnar&limit=500'}, {200}),
+    'alerts_page': ('read', 3, lambda rng: {'method': 'GET', 'path': '/api/alerts?limit=50'}, {200}),
+    'summary': ('read', 4, lambda rng: {'method': 'GET', 'path': '/api/summary'}, {200}),
+    'regions': ('read', 2, lambda rng: {
+        'method': 'GET', 'path': f'/api/regions?district={_district(rng)}&bucket=month'}, {200}),
+    'facets': ('read', 2, lambda rng: {'method': 'GET', 'path': '/api/facets'}, {200}),
+    'facets_search': ('read', 2, lambda rng: {
+        'method': 'GET', 'path': f'/api/facets?q={_district(rng)[:2]}'}, {200}),
+    'notifications': ('read', 2, lambda rng: {'method': 'GET', 'path': '/api/notifications'}, {200}),
+    'water_post': ('write', 6, lambda rng: {'method': 'POST', 'path': '/api/water', 'json': _sample(rng)},
+                   {201, 202}),
+    'alert_post': ('write', 1, lambda rng: {'method': 'POST', 'path': '/api/alerts', 'json': {
+        'disease': rng.choice(['Dengue', 'Malaria', 'Typhoid', 'Cholera']), 'cases': rng.randint(1, 150),
+        'risk_level': rng.choice(['Low', 'Medium', 'High']),
+        **{key: _sample(rng)[key] for key in ('location', 'state', 'district')}}}, {201}),
+    'predict': ('write', 3, lambda rng: {'method': 'POST', 'path': '/api/predict', 'json': _sample(rng)},
+                {200}),
+    'predict_batch': ('write', 1, lambda rng: {
+        'method': 'POST', 'path': '/api/predict/batch', 'json': [_sample(rng) for _ in range(50)]}, {200}),
+    'water_bulk': ('write', 1, lambda rng: {
+        'method': 'POST', 'path': '/api/water/bulk', 'data': _bulk_csv(rng), 'content_type': 'text/csv'},
+        {201}),
+    'login': ('write', 1, lambda rng: {
+        'method': 'POST', 'path': '/api/login', 'json': {'username': USERNAME, 'password': PASSWORD}}, {200}),
+}
+
+def seed(rows):
+    """Create the app against a fresh database holding `rows` samples; returns the app"""
+    use_scratch_database('health_monitor_api_')
+
+    from app import app
+    from auth import hash_password
+    from facets import facet_index
+    from models import db, DiseaseAlert, User, WaterSample
+    from rollups import rebuild_rollups
+    from summary import rebuild_summary
+
+    with app.app_context():
+        seed_water_samples(db, WaterSample, rows)
+        seed_disease_alerts(db, DiseaseAlert, max(rows // 100, 10))
+        db.session.add(User(username=USERNAME, password=hash_password(PASSWORD), role='admin'))
+        db.session.commit()
+        rebuild_summary()
+        rebuild_rollups()
+        facet_index.rebuild()
+    return app
+
+def run(app, clients, seconds, read_share, seed_value=0):
+    """Drive the API from `clients` threads; returns the per-scenario latencies and error counts"""
+    groups = {'read': [], 'write': []}
+    for name, (group, weight, _, _) in SCENARIOS.items():
+        groups[group].append((name, weight))
+
+    # One untimed pass so lazy imports, model loading and caches don't land in the numbers
+    warm = app.test_client()
+    for name, (_, _, build, accepted) in SCENARIOS.items():
+        request = build(random.Random(seed_value))
+        response = warm.open(request.pop('path'), **request)
+        if response.status_code not in accepted:
+            raise RuntimeError(f'{name} returned {response.status_code}: {response.get_data(as_text=True)[:200]}')
+
+    stop = threading.Event()
+    latencies = {name: [] for name in SCENARIOS}
+    errors = {name: 0 for name in SCENARIOS}
+    lock = threading.Lock()
+
+    def client_loop(index):
+        rng = random.Random(seed_value + index + 1)
+        client = app.test_client()
+        local = {name: [] for name in SCENARIOS}
+        failed = {name: 0 for name in SCENARIOS}
+        while not stop.is_set():
+            names, weights = zip(*groups['read' if rng.random() < read_share else 'write'])
+            name = rng.choices(names, weights)[0]
+            _, _, build, accepted = SCENARIOS[name]
+            request = build(rng)
+            start = time.perf_counter()
+            response = client.open(request.pop('path'), **request)
+            response.get_data()
+            elapsed = time.perf_counter() - start
+            if response.status_code in accepted:
+                local[name].append(elapsed)
+            else:
+                failed[name] += 1
+        with lock:
+            for name in SCENARIOS:
+                latencies[name].extend(local[name])
+                errors[name] += failed[name]
+
+    threads = [threading.Thread(target=client_loop, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return latencies, errors
+
+def summarize(latencies, errors, seconds):
+    def stats(values, failed):
+        return {
+            'requests': len(values),
+            'errors': failed,
+            'throughput_rps': round(len(values) / seconds, 1),
+            'p50_ms': round(percentile(values, 0.50) * 1000, 2),
+            'p95_ms': round(percentile(values, 0.95) * 1000, 2),
+            'p99_ms': round(percentile(values, 0.99) * 1000, 2),
+        }
+
+    endpoints = {name: stats(values, errors[name]) for name, values in latencies.items() if values or errors[name]}
+    total = stats([v for values in latencies.values() for v in values], sum(errors.values()))
+    return endpoints, total
+
+def baseline_path(rows, clients, read_share):
+    return os.path.join(BASELINE_DIR, f'api_load-{rows}-c{clients}-r{round(read_share * 100)}.json')
+
+def compare(report, baseline, tolerance, min_requests=200):
+    """Scenarios whose p95 rose or throughput fell by more than `tolerance` (a fraction).
+
+    Scenarios with fewer than min_requests samples in either run are too
+    noisy to judge and are skipped.
+    """
+    regressions = []
+    for name, current in dict(report['endpoints'], total=report['total']).items():
+        before = baseline['total'] if name == 'total' else baseline['endpoints'].get(name)
+        if not before or min(before['requests'], current['requests']) < min_requests:
+            continue
+        if before['p95_ms'] and current['p95_ms'] > before['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {before['p95_ms']} → {current['p95_ms']} ms")
+        if before['throughput_rps'] and current['throughput_rps'] < before['throughput_rps'] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {before['throughput_rps']} → {current['throughput_rps']} req/s")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000, help='seeded water samples, e.g. 1000 / 100000 / 1000000')
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--read-share', type=float, default=0.8, help='fraction of requests that are reads')
+    parser.add_argument('--seed', type=int, default=0, help='random seed for the request mix')
+    parser.add_argument('--output', help='also write the JSON report here')
+    parser.add_argument('--baseline', help='baseline file (default: benchmarks/baselines/api_load-<config>.json)')
+    parser.add_argument('--save-baseline', action='store_true', help='store this run as the baseline')
+    parser.add_argument('--compare', action='store_true', help='exit 1 when a scenario regressed past --tolerance')
+    parser.add_argument('--tolerance', type=float, default=0.5,
+                        help='allowed relative p95 increase / throughput drop (default 0.5)')
+    parser.add_argument('--min-requests', type=int, default=200,
+                        help='ignore scenarios with fewer samples than this when comparing')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    app = seed(args.rows)
+    seed_seconds = time.perf_counter() - start
+    latencies, errors = run(app, args.clients, args.seconds, args.read_share, args.seed)
+    endpoints, total = summarize(latencies, errors, args.seconds)
+
+    report = {
+        'config': {'rows': args.rows, 'clients': args.clients, 'seconds': args.seconds,
+                   'read_share': args.read_share, 'seed': args.seed,
+                   'write_mode': app.config['WATER_WRITE_MODE'], 'seed_seconds': round(seed_seconds, 1)},
+        'endpoints': endpoints,
+        'total': total
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    path = args.baseline or baseline_path(args.rows, args.clients, args.read_share)
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+            f.write('\n')
+        print(f"Baseline saved to {path}", file=sys.stderr)
+    elif args.compare or os.path.exists(path):
+        if not os.path.exists(path):
+            sys.exit(f"No baseline at {path}; record one with --save-baseline")
+        with open(path) as f:
+            regressions = compare(report, json.load(f), args.tolerance, args.min_requests)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if not regressions:
+            print(f"No regressions against {path} (tolerance {args.tolerance:.0%})", file=sys.stderr)
+        elif args.compare:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""Helpers shared by the benchmarks: seeding a scratch database and percentiles."""
+
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+import numpy as np
+
+# (location, state, district) the seeded rows are spread over
+LOCATIONS = [
+    (f'{district} Station {i}', state, district)
+    for state, districts in (
+        ('Maharashtra', ('Mumbai', 'Pune', 'Nagpur')),
+        ('Karnataka', ('Bangalore', 'Mysore')),
+        ('Tamil Nadu', ('Chennai', 'Madurai')),
+        ('Kerala', ('Ernakulam', 'Thrissur')),
+        ('West Bengal', ('Kolkata',)),
+        ('Telangana', ('Hyderabad',)),
+        ('Gujarat', ('Ahmedabad', 'Surat')),
+        ('Delhi', ('Delhi',)),
+    )
+    for district in districts
+    for i in range(20)
+]
+LEVELS = np.array(['Safe', 'Moderate', 'High Risk'], dtype=object)
+DISEASES = np.array(['Dengue', 'Malaria', 'Typhoid', 'Cholera', 'Hepatitis A'], dtype=object)
+
+def use_scratch_database(prefix):
+    """Point DATABASE_URL at a fresh temp file; call before importing app"""
+    tmp = tempfile.mkdtemp(prefix=prefix)
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tmp, 'bench.db')
+    return tmp
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def seed_water_samples(db, WaterSample, n, chunk=50000, seed=42, days=365):
+    """Insert n random samples spread over LOCATIONS and the last `days` days"""
+    rng = np.random.default_rng(seed)
+    end = datetime.utcnow()
+    for offset in range(0, n, chunk):
+        size = min(chunk, n - offset)
+        places = rng.integers(0, len(LOCATIONS), size)
+        rows = [
+            {'location': LOCATIONS[place][0], 'state': LOCATIONS[place][1], 'district': LOCATIONS[place][2],
+             'ph': round(float(ph), 2), 'turbidity': round(float(turbidity), 2),
+             'bacterial_count': float(bacteria), 'temperature': round(float(temperature), 1),
+             'contamination_level': level, 'sample_date': end - timedelta(seconds=int(second))}
+            for place, ph, turbidity, bacteria, temperature, level, second in zip(
+                places, rng.uniform(5.5, 9.0, size), rng.exponential(3.0, size),
+                rng.integers(0, 5000, size), rng.uniform(15.0, 40.0, size),
+                LEVELS[rng.integers(0, 3, size)], rng.integers(0, days * 86400, size))
+        ]
+        db.session.execute(db.insert(WaterSample), rows)
+        db.session.commit()
+
+def seed_disease_alerts(db, DiseaseAlert, n, seed=42, days=365):
+    """Insert n random alerts over the same locations"""
+    rng = np.random.default_rng(seed + 1)
+    end = datetime.utcnow()
+    places = rng.integers(0, len(LOCATIONS), n)
+    cases = rng.integers(1, 200, n)
+    rows = [
+        {'disease': disease, 'cases': int(count),
+         'risk_level': 'High' if count > 100 else 'Medium' if count > 50 else 'Low',
+         'location': LOCATIONS[place][0], 'state': LOCATIONS[place][1], 'district': LOCATIONS[place][2],
+         'reported_at': end - timedelta(seconds=int(second))}
+        for place, count, disease, second in zip(
+            places, cases, DISEASES[rng.integers(0, len(DISEASES), n)], rng.integers(0, days * 86400, n))
+    ]
+    if rows:
+        db.session.execute(db.insert(DiseaseAlert), rows)
+        db.session.commit()
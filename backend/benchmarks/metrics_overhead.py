@@ -0,0 +1,99 @@
+"""
+Cost of request/SQL metrics collection (METRICS_ENABLED) per request.
+
+Serves ROUTES from one client against a seeded scratch database and
+alternates short blocks of requests with collection switched on and off
+(SQL event listeners removed, recording calls stubbed), so drift on the
+machine lands on both sides alike. Reports p50 and mean latency per route
+both ways, plus the raw cost of the recording calls. Run from the backend folder:
+
+    python -m benchmarks.metrics_overhead [--requests 2000] [--rows 10000]
+"""
+
+import argparse
+import os
+import time
+
+from benchmarks.common import percentile, seed_water_samples, use_scratch_database
+
+ROUTES = ['/api/facets', '/api/water?limit=50', '/api/summary', '/api/health']
+BLOCK = 50
+
+def recording_cost(iterations=200000):
+    """Microseconds for one request's start/finish and for one SQL statement"""
+    from metrics import RequestMetrics
+
+    metrics = RequestMetrics()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        metrics.start_request()
+        metrics.finish_request('GET', '/api/water', 200)
+    per_request = (time.perf_counter() - start) / iterations
+
+    metrics.start_request()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        metrics.record_statement(0.0001)
+    per_statement = (time.perf_counter() - start) / iterations
+    return round(per_request * 1e6, 2), round(per_statement * 1e6, 2)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=2000, help='timed requests per route and mode')
+    parser.add_argument('--rows', type=int, default=10000)
+    args = parser.parse_args()
+
+    use_scratch_database('health_monitor_metrics_')
+    os.environ.setdefault('FLASK_OUTBOX_WORKERS', '0')
+    os.environ['FLASK_METRICS_ENABLED'] = 'true'
+
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    import metrics
+    from app import app
+    from models import db, WaterSample
+    from summary import rebuild_summary
+
+    with app.app_context():
+        seed_water_samples(db, WaterSample, args.rows)
+        rebuild_summary()
+
+    listeners = [('before_cursor_execute', metrics._before_cursor_execute),
+                 ('after_cursor_execute', metrics._after_cursor_execute),
+                 ('handle_error', metrics._handle_error)]
+    recorders = {name: getattr(metrics.request_metrics, name)
+                 for name in ('start_request', 'finish_request', 'record_statement')}
+
+    def collecting(enabled):
+        for name, fn in listeners:
+            (event.listen if enabled else event.remove)(Engine, name, fn)
+        for name, method in recorders.items():
+            setattr(metrics.request_metrics, name, method if enabled else (lambda *args: None))
+
+    client = app.test_client()
+    print(f"{'route':<24} {'off mean µs':>12} {'on mean µs':>11} {'off p50':>9} {'on p50':>9} {'overhead':>9}")
+    enabled = True
+    for route in ROUTES:
+        for _ in range(BLOCK):
+            client.get(route)
+        latencies = {False: [], True: []}
+        while min(len(values) for values in latencies.values()) < args.requests:
+            enabled = not enabled
+            collecting(enabled)
+            for _ in range(BLOCK):
+                start = time.perf_counter()
+                client.get(route).get_data()
+                latencies[enabled].append(time.perf_counter() - start)
+        off, on = latencies[False], latencies[True]
+        off_p50, on_p50 = percentile(off, 0.50) * 1e6, percentile(on, 0.50) * 1e6
+        print(f"{route:<24} {sum(off) / len(off) * 1e6:>12.1f} {sum(on) / len(on) * 1e6:>11.1f} "
+              f"{off_p50:>9.1f} {on_p50:>9.1f} {(on_p50 - off_p50) / off_p50:>+9.1%}")
+    if not enabled:
+        collecting(True)
+
+    per_request, per_statement = recording_cost()
+    print(f"recording: {per_request} µs per request, {per_statement} µs per SQL statement")
+
+if __name__ == '__main__':
+    main()
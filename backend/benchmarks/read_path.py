@@ -0,0 +1,82 @@
+"""
+List-endpoint read path: ORM objects + to_dict() vs. Core row tuples.
+
+Seeds a temporary database with the largest --sizes value, then for each
+size times fetching the newest N water samples in the GET /api/water order
+and encoding them as JSON, once through WaterSample objects and to_dict()
+(the old path) and once through query.with_entities() row tuples and
+row_serializer() (the current one). Run from the backend folder:
+
+    python -m benchmarks.read_path [--sizes 10000 1000000] [--repeats 3]
+"""
+
+import argparse
+import os
+import time
+import tracemalloc
+
+from benchmarks.common import seed_water_samples, use_scratch_database
+
+def measure(fn, repeats, trace_memory):
+    """Best wall time over repeats, plus peak traced allocation of one extra run"""
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        body = fn()
+        best = min(best, time.perf_counter() - start)
+    peak = None
+    if trace_memory:
+        tracemalloc.start()
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return body, best, peak
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 1000000])
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--memory', action='store_true', help='also report peak Python allocations (slow)')
+    args = parser.parse_args()
+
+    use_scratch_database('health_monitor_read_')
+    os.environ.setdefault('FLASK_OUTBOX_WORKERS', '0')
+
+    from app import app, WATER_SAMPLE_COLUMNS, SERIALIZE_WATER_SAMPLES
+    from models import db, WaterSample
+    from utils.serialization import dumps_bytes
+
+    order = (WaterSample.sample_date.desc(), WaterSample.id.desc())
+
+    with app.app_context():
+        start = time.perf_counter()
+        seed_water_samples(db, WaterSample, max(args.sizes))
+        print(f"Seeded {max(args.sizes)} rows in {time.perf_counter() - start:.1f}s")
+
+        for n in sorted(args.sizes):
+            def orm_path():
+                samples = WaterSample.query.order_by(*order).limit(n).all()
+                body = dumps_bytes([sample.to_dict() for sample in samples])
+                db.session.expunge_all()
+                return body
+
+            def tuple_path():
+                rows = WaterSample.query.with_entities(*WATER_SAMPLE_COLUMNS).order_by(*order).limit(n).all()
+                return dumps_bytes(SERIALIZE_WATER_SAMPLES(rows))
+
+            orm_body, orm_s, orm_peak = measure(orm_path, args.repeats, args.memory)
+            tuple_body, tuple_s, tuple_peak = measure(tuple_path, args.repeats, args.memory)
+            assert orm_body == tuple_body, 'read paths disagree'
+
+            print(f"\n{n} rows ({len(tuple_body) / 2**20:.1f} MiB of JSON)")
+            print(f"{'path':<22} {'ms':>9} {'rows/s':>12}" + (f" {'peak MiB':>9}" if args.memory else ''))
+            for name, seconds, peak in (('ORM + to_dict()', orm_s, orm_peak),
+                                        ('row tuples', tuple_s, tuple_peak)):
+                line = f"{name:<22} {seconds * 1000:>9.1f} {n / seconds:>12,.0f}"
+                if args.memory:
+                    line += f" {peak / 2**20:>9.1f}"
+                print(line)
+            print(f"speedup: {orm_s / tuple_s:.2f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""
+Throughput of the scalar rule_predict loop vs. the vectorized rule_predict_batch.
+
+Run from the backend folder:
+    python -m benchmarks.rule_engine [--sizes 1000 100000 10000000] [--scalar-limit 1000000]
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from prediction import rule_predict, rule_predict_batch
+
+def make_samples(n, seed=42):
+    rng = np.random.default_rng(seed)
+    return (
+        rng.uniform(4.0, 11.0, n),
+        rng.exponential(3.0, n),
+        rng.lognormal(4.0, 2.0, n),
+        rng.uniform(10.0, 45.0, n)
+    )
+
+def time_scalar(columns):
+    rows = list(zip(*(column.tolist() for column in columns)))
+    start = time.perf_counter()
+    for row in rows:
+        rule_predict(*row)
+    return time.perf_counter() - start
+
+def time_batch(columns):
+    start = time.perf_counter()
+    rule_predict_batch(*columns)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10**3, 10**4, 10**5, 10**6, 10**7])
+    parser.add_argument('--scalar-limit', type=int, default=10**6,
+                        help='largest size to time the scalar loop at; bigger sizes are extrapolated')
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'scalar rows/s':>15} {'batch rows/s':>15} {'speedup':>9}")
+    for n in args.sizes:
+        columns = make_samples(n)
+        batch = time_batch(columns)
+
+        if n <= args.scalar_limit:
+            scalar = time_scalar(columns)
+            note = ''
+        else:
+            sample = min(args.scalar_limit, 10**5)
+            scalar = time_scalar(tuple(column[:sample] for column in columns)) * n / sample
+            note = ' (scalar extrapolated)'
+
+        print(f"{n:>10} {n / scalar:>15,.0f} {n / batch:>15,.0f} {scalar / batch:>8.1f}x{note}")
+
+if __name__ == '__main__':
+    main()
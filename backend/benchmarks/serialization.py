@@ -0,0 +1,97 @@
+"""
+Bytes on the wire and encode time of the list-endpoint formats per N rows.
+
+Compares the original path (to_dict + stdlib json) with the fast JSON
+encoder, ?format=columnar and MessagePack (when installed), each raw and
+gzip/deflate compressed. Run from the backend folder:
+    python -m benchmarks.serialization [--rows 10000] [--level 6]
+"""
+
+import argparse
+import json
+import time
+import zlib
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from models import WaterSample
+from utils import serialization
+
+def make_samples(n, seed=42):
+    rng = np.random.default_rng(seed)
+    start = datetime(2025, 1, 1)
+    levels = np.array(['Safe', 'Moderate', 'High Risk'], dtype=object)
+    return [
+        WaterSample(
+            id=i + 1, location=f'Station {i % 500}', state='Kerala', district=f'District {i % 14}',
+            ph=round(float(ph), 2), turbidity=round(float(turbidity), 2),
+            bacterial_count=float(bacteria), temperature=round(float(temperature), 1),
+            contamination_level=level, sample_date=start + timedelta(minutes=int(minute))
+        )
+        for i, (ph, turbidity, bacteria, temperature, level, minute) in enumerate(zip(
+            rng.uniform(5.5, 9.0, n), rng.exponential(3.0, n), rng.integers(0, 5000, n),
+            rng.uniform(15.0, 40.0, n), levels[rng.integers(0, 3, n)], np.sort(rng.integers(0, 10**6, n))
+        ))
+    ]
+
+COLUMNS = ['id', 'location', 'state', 'district', 'ph', 'turbidity', 'bacterial_count',
+           'temperature', 'contamination_level', 'sample_date']
+
+def legacy_json(samples):
+    # What jsonify produced before: sorted keys, compact separators, stdlib encoder
+    return json.dumps([s.to_dict() for s in samples], sort_keys=True, separators=(',', ':')).encode()
+
+def fast_json(samples):
+    return serialization.dumps_bytes([s.to_dict() for s in samples])
+
+def columnar(rows):
+    return dict(zip(COLUMNS, (list(values) for values in zip(*rows))))
+
+def timed(fn, *args, repeats=5):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+def compress(body, coding, level):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31 if coding == 'gzip' else 15)
+    return compressor.compress(body) + compressor.flush()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--level', type=int, default=6, help='zlib level (COMPRESS_LEVEL)')
+    args = parser.parse_args()
+
+    samples = make_samples(args.rows)
+    # The columnar path reads plain row tuples (query.with_entities) instead of objects
+    rows = [tuple(getattr(s, c) for c in COLUMNS) for s in samples]
+
+    variants = [
+        ('legacy json rows', lambda: legacy_json(samples)),
+        ('fast json rows', lambda: fast_json(samples)),
+        ('fast json columnar', lambda: serialization.dumps_bytes(columnar(rows))),
+    ]
+    if serialization.msgpack is not None:
+        variants += [
+            ('msgpack rows', lambda: serialization.msgpack_bytes([s.to_dict() for s in samples])),
+            ('msgpack columnar', lambda: serialization.msgpack_bytes(columnar(rows))),
+        ]
+    encoder = 'orjson' if serialization.orjson is not None else 'stdlib json'
+    print(f"{args.rows} rows, fast encoder: {encoder}, msgpack: "
+          f"{'yes' if serialization.msgpack is not None else 'not installed'}")
+
+    print(f"{'format':<20} {'encode ms':>10} {'raw KiB':>9} {'gzip KiB':>9} {'gzip ms':>8} "
+          f"{'deflate KiB':>12} {'deflate ms':>11}")
+    for name, encode in variants:
+        body, encode_s = timed(encode)
+        gz, gzip_s = timed(compress, body, 'gzip', args.level)
+        df, deflate_s = timed(compress, body, 'deflate', args.level)
+        print(f"{name:<20} {encode_s * 1000:>10.1f} {len(body) / 1024:>9.1f} {len(gz) / 1024:>9.1f} "
+              f"{gzip_s * 1000:>8.1f} {len(df) / 1024:>12.1f} {deflate_s * 1000:>11.1f}")
+
+if __name__ == '__main__':
+    main()
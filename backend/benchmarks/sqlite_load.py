@@ -0,0 +1,130 @@
+"""
+Multi-writer / multi-reader load test for the SQLite storage layer.
+
+Starts the app in-process against a temporary database and runs N writer
+threads (POST /api/water) alongside M reader threads (GET /api/water pages
+and /api/summary) for a fixed duration. Run from the backend folder:
+
+    python -m benchmarks.sqlite_load --writers 8 --readers 8 --seconds 10
+    python -m benchmarks.sqlite_load --compare     # tuned vs. pre-WAL defaults
+
+Settings can be varied with FLASK_<NAME> env vars, e.g.
+FLASK_SQLITE_SYNCHRONOUS=FULL or FLASK_DB_READ_SPLIT=false.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from benchmarks.common import percentile, use_scratch_database
+
+# Settings matching the engine before WAL/busy-timeout tuning
+LEGACY_ENV = {
+    'FLASK_SQLITE_JOURNAL_MODE': 'DELETE',
+    'FLASK_SQLITE_SYNCHRONOUS': 'FULL',
+    'FLASK_SQLITE_BUSY_TIMEOUT_MS': '0',
+    'FLASK_SQLITE_MMAP_SIZE': '0',
+    'FLASK_SQLITE_CACHE_SIZE': '-2000',
+    'FLASK_DB_READ_SPLIT': 'false',
+}
+
+SAMPLE = {
+    'location': 'Load Test Well', 'state': 'Kerala', 'district': 'Kochi',
+    'ph': 7.1, 'turbidity': 1.2, 'bacterial_count': 20, 'temperature': 26.0,
+    'contamination_level': 'Safe'
+}
+
+def run(writers, readers, seconds, seed_rows):
+    """Run the load in this process; the app must not have been imported yet"""
+    use_scratch_database('health_monitor_load_')
+
+    from app import app
+    from models import db, WaterSample
+    from summary import rebuild_summary
+
+    with app.app_context():
+        db.session.execute(db.insert(WaterSample), [dict(SAMPLE) for _ in range(seed_rows)])
+        db.session.commit()
+        rebuild_summary()
+
+    stop = threading.Event()
+    results = {'write': [], 'read': []}
+    errors = {'write': 0, 'read': 0}
+    lock = threading.Lock()
+
+    def worker(kind):
+        client = app.test_client()
+        latencies, failed = [], 0
+        toggle = False
+        while not stop.is_set():
+            start = time.perf_counter()
+            if kind == 'write':
+                response = client.post('/api/water', json=SAMPLE)
+                ok = response.status_code == 201
+            else:
+                toggle = not toggle
+                response = client.get('/api/water?limit=50' if toggle else '/api/summary')
+                ok = response.status_code == 200
+            elapsed = time.perf_counter() - start
+            if ok:
+                latencies.append(elapsed)
+            else:
+                failed += 1
+        with lock:
+            results[kind].extend(latencies)
+            errors[kind] += failed
+
+    threads = [threading.Thread(target=worker, args=('write',)) for _ in range(writers)]
+    threads += [threading.Thread(target=worker, args=('read',)) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    report = {'writers': writers, 'readers': readers, 'seconds': seconds,
+              'journal_mode': app.config['SQLITE_JOURNAL_MODE'],
+              'read_split': bool(app.config['DB_READ_SPLIT'])}
+    for kind in ('write', 'read'):
+        latencies = results[kind]
+        report[kind] = {
+            'ops_per_second': round(len(latencies) / seconds, 1),
+            'errors': errors[kind],
+            'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        }
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--writers', type=int, default=8)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--seed-rows', type=int, default=10000)
+    parser.add_argument('--compare', action='store_true',
+                        help='run once with legacy settings and once tuned, each in a fresh process')
+    args = parser.parse_args()
+
+    if not args.compare:
+        print(json.dumps(run(args.writers, args.readers, args.seconds, args.seed_rows), indent=2))
+        return
+
+    command = [sys.executable, '-m', 'benchmarks.sqlite_load',
+               '--writers', str(args.writers), '--readers', str(args.readers),
+               '--seconds', str(args.seconds), '--seed-rows', str(args.seed_rows)]
+    for label, extra_env in (('legacy', LEGACY_ENV), ('tuned', {})):
+        env = dict(os.environ, **extra_env)
+        output = subprocess.run(command, env=env, capture_output=True, text=True, check=True).stdout
+        report = json.loads(output[output.index('{'):])
+        print(f"{label:>7}: writes {report['write']['ops_per_second']:>8}/s "
+              f"(errors {report['write']['errors']}, p99 {report['write']['p99_ms']} ms)  "
+              f"reads {report['read']['ops_per_second']:>8}/s "
+              f"(errors {report['read']['errors']}, p99 {report['read']['p99_ms']} ms)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""
+Latency of sklearn predict_proba vs. the flattened forest.FlatForest evaluator.
+
+Run from the backend folder:
+    python -m benchmarks.tree_eval [--model models/ai_model.pkl] [--sizes 1 10 100 1000 10000]
+"""
+
+import argparse
+import time
+import warnings
+
+import joblib
+import numpy as np
+
+from forest import FlatForest
+from prediction import MODEL_PATH, FLAT_MAX_ROWS
+
+def make_rows(n, n_features, seed=42):
+    rng = np.random.default_rng(seed)
+    return np.column_stack([rng.uniform(0.0, 12.0, n) for _ in range(n_features)])
+
+def median_seconds(fn, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--model', default=MODEL_PATH)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 10, 100, 1000, 10000])
+    parser.add_argument('--repeats', type=int, default=50)
+    args = parser.parse_args()
+
+    # The registry serves bare arrays; silence the fitted-on-DataFrame name warning
+    warnings.filterwarnings('ignore', message='X does not have valid feature names')
+    model = joblib.load(args.model)
+    start = time.perf_counter()
+    flat = FlatForest.from_estimator(model)
+    print(f"{args.model}: {flat.n_trees} trees, {flat.n_nodes} nodes, "
+          f"flattened in {(time.perf_counter() - start) * 1000:.1f} ms")
+    print(f"(the registry uses the flat evaluator up to {FLAT_MAX_ROWS} rows)")
+
+    print(f"{'rows':>8} {'sklearn ms':>12} {'flat ms':>10} {'speedup':>9} {'max |diff|':>11}")
+    for n in args.sizes:
+        rows = make_rows(n, flat.n_features)
+        repeats = max(3, args.repeats if n <= 1000 else args.repeats // 10)
+        sklearn_s = median_seconds(lambda: model.predict_proba(rows), repeats)
+        flat_s = median_seconds(lambda: flat.predict_proba(rows), repeats)
+        diff = np.abs(model.predict_proba(rows) - flat.predict_proba(rows)).max()
+        print(f"{n:>8} {sklearn_s * 1000:>12.3f} {flat_s * 1000:>10.3f} {sklearn_s / flat_s:>8.1f}x {diff:>11.1e}")
+
+if __name__ == '__main__':
+    main()
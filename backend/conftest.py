@@ -0,0 +1,11 @@
+import os
+import tempfile
+
+# Manual scripts that talk to a live server or populate the real database
+collect_ignore = ['test_server.py', 'test_predict.py', 'test_notifications.py', 'simple_test.py', 'run_test.py']
+
+# app.py builds its app at import time; point it at a throwaway database first
+_db_dir = tempfile.mkdtemp(prefix='health_monitor_test_')
+os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(_db_dir, 'test.db'))
+# Keep background outbox threads from issuing queries while tests capture SQL
+os.environ.setdefault('FLASK_OUTBOX_WORKERS', '0')
@@ -1,14 +1,124 @@
 from flask import Flask
+from sqlalchemy import event, inspect, make_url
 from models import db, WaterSample, DiseaseAlert, Prediction
+from rollups import ensure_rollups
+from summary import ensure_summary
+from utils.db_routing import READ_BIND
+
+# Storage settings, overridable through app.config (or FLASK_<NAME> env vars)
+STORAGE_DEFAULTS = {
+    'SQLITE_JOURNAL_MODE': 'WAL',           # readers no longer block on the writer
+    'SQLITE_SYNCHRONOUS': 'NORMAL',         # fsync at checkpoints, not every commit
+    'SQLITE_BUSY_TIMEOUT_MS': 5000,         # wait for the write lock instead of "database is locked"
+    'SQLITE_MMAP_SIZE': 256 * 1024 * 1024,
+    'SQLITE_CACHE_SIZE': -64 * 1024,        # negative = KiB per connection
+    'DB_POOL_SIZE': 5,
+    'DB_MAX_OVERFLOW': 10,
+    'DB_POOL_TIMEOUT': 30,
+    'DB_READ_SPLIT': True,
+    'DB_READ_POOL_SIZE': 10,
+    'DB_READ_MAX_OVERFLOW': 20,
+}
+
+JOURNAL_MODES = ('DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF')
+SYNCHRONOUS_LEVELS = ('OFF', 'NORMAL', 'FULL', 'EXTRA')
+
+def _is_sqlite_file(uri):
+    url = make_url(uri)
+    return url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:')
+
+def _sqlite_pragmas(config, read_only=False):
+    journal_mode = str(config['SQLITE_JOURNAL_MODE']).upper()
+    synchronous = str(config['SQLITE_SYNCHRONOUS']).upper()
+    if journal_mode not in JOURNAL_MODES:
+        raise ValueError(f'Unsupported SQLITE_JOURNAL_MODE: {journal_mode}')
+    if synchronous not in SYNCHRONOUS_LEVELS:
+        raise ValueError(f'Unsupported SQLITE_SYNCHRONOUS: {synchronous}')
+    
+    pragmas = [
+        f'PRAGMA busy_timeout = {int(config["SQLITE_BUSY_TIMEOUT_MS"])}',
+        f'PRAGMA synchronous = {synchronous}',
+        f'PRAGMA mmap_size = {int(config["SQLITE_MMAP_SIZE"])}',
+        f'PRAGMA cache_size = {int(config["SQLITE_CACHE_SIZE"])}',
+    ]
+    if read_only:
+        pragmas.append('PRAGMA query_only = ON')
+    else:
+        # Persistent in the file; only the writer needs to set it
+        pragmas.insert(0, f'PRAGMA journal_mode = {journal_mode}')
+    return pragmas
+
+def _on_connect(pragmas):
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+    return set_pragmas
+
+def configure_engines(app):
+    """Engine options for SQLite: pool sizing plus an optional read-only bind"""
+    for key, value in STORAGE_DEFAULTS.items():
+        app.config.setdefault(key, value)
+    
+    uri = app.config['SQLALCHEMY_DATABASE_URI']
+    if not _is_sqlite_file(uri):
+        return
+    
+    options = app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {})
+    options.setdefault('pool_size', int(app.config['DB_POOL_SIZE']))
+    options.setdefault('max_overflow', int(app.config['DB_MAX_OVERFLOW']))
+    options.setdefault('pool_timeout', int(app.config['DB_POOL_TIMEOUT']))
+    options.setdefault('connect_args', {})['check_same_thread'] = False
+    
+    if app.config['DB_READ_SPLIT']:
+        app.config.setdefault('SQLALCHEMY_BINDS', {})[READ_BIND] = {
+            'url': uri,
+            'pool_size': int(app.config['DB_READ_POOL_SIZE']),
+            'max_overflow': int(app.config['DB_READ_MAX_OVERFLOW']),
+            'pool_timeout': int(app.config['DB_POOL_TIMEOUT']),
+            'connect_args': {'check_same_thread': False},
+        }
 
 def init_db(app):
     """Initialize database with Flask app"""
+    configure_engines(app)
     db.init_app(app)
     
     with app.app_context():
+        if _is_sqlite_file(app.config['SQLALCHEMY_DATABASE_URI']):
+            event.listen(db.engine, 'connect', _on_connect(_sqlite_pragmas(app.config)))
+            if READ_BIND in db.engines:
+                event.listen(db.engines[READ_BIND], 'connect',
+                             _on_connect(_sqlite_pragmas(app.config, read_only=True)))
+        
         db.create_all()
+        migrate_schema()
+        ensure_summary()
+        ensure_rollups()
         print("Database initialized successfully!")
 
+def migrate_schema():
+    """Bring databases created by older versions up to the current schema.
+    
+    create_all() only creates missing tables, so nullable columns and indexes
+    added to existing tables are created here. checkfirst skips the indexes
+    that already exist.
+    """
+    inspector = inspect(db.engine)
+    with db.engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing and column.nullable:
+                    column_type = column.type.compile(dialect=db.engine.dialect)
+                    conn.exec_driver_sql(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}')
+                    print(f"Added column {table.name}.{column.name}")
+    
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=db.engine, checkfirst=True)
+
 def get_db_stats():
     """Get database statistics"""
     water_count = WaterSample.query.count()
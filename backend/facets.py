@@ -0,0 +1,180 @@
+import threading
+from bisect import bisect_left
+
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+from models import db, WaterSample, DiseaseAlert
+from versions import current_versions
+
+# Fields GET /api/facets can prefix-search
+FIELDS = ('state', 'district', 'location', 'disease')
+
+# table_versions entries the counts are derived from
+TABLES = ('water_samples', 'disease_alerts')
+
+class FacetIndex:
+    """In-memory counts behind the app's filter dropdowns.
+
+    Built from grouped queries at startup and then updated from committed
+    inserts, so GET /api/facets normally reads nothing but table_versions.
+    The index remembers the versions its counts reflect: each insert moves
+    them on by the bumps its own transaction made, and refresh() rebuilds
+    when the tables have moved some other way (another process wrote, or
+    local commits were applied out of order).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tree = {}      # state → district → location → [samples, alerts]
+        self._diseases = {}  # disease → alerts
+        self._names = {field: {} for field in FIELDS}  # field → name → count
+        self._sorted = {}    # field → sorted [(lowered name, name)], rebuilt lazily
+        self._versions = {}  # table → version the counts reflect
+        self._stale = True
+
+    def refresh(self, versions=None):
+        """Rebuild unless the counts reflect versions (default: the current table_versions)"""
+        if versions is None:
+            versions = current_versions(*TABLES)
+        with self._lock:
+            current = not self._stale and self._versions == versions
+        if not current:
+            self.rebuild()
+
+    def rebuild(self):
+        """Recount everything from the tables (startup / recovery)"""
+        # Read first: a write landing before the counts only costs another rebuild later
+        versions = current_versions(*TABLES)
+        water = db.session.query(
+            WaterSample.state, WaterSample.district, WaterSample.location, func.count()
+        ).group_by(WaterSample.state, WaterSample.district, WaterSample.location).all()
+        alerts = db.session.query(
+            DiseaseAlert.state, DiseaseAlert.district, DiseaseAlert.location, DiseaseAlert.disease, func.count()
+        ).group_by(DiseaseAlert.state, DiseaseAlert.district, DiseaseAlert.location, DiseaseAlert.disease).all()
+
+        with self._lock:
+            self._tree, self._diseases = {}, {}
+            self._names = {field: {} for field in FIELDS}
+            self._sorted = {}
+            for state, district, location, count in water:
+                self._add(state, district, location, samples=count)
+            for state, district, location, disease, count in alerts:
+                self._add(state, district, location, alerts=count, disease=disease)
+            self._versions = versions
+            self._stale = False
+
+    def apply(self, samples=(), alerts=(), versions=None):
+        """Count committed rows given as (state, district, location[, disease]) tuples.
+
+        versions maps each table the transaction bumped to (version before it,
+        version after it). The rows are only counted when the index is at the
+        before versions; otherwise a rebuild already has them, or the index is
+        marked stale and the next refresh() recounts.
+        """
+        with self._lock:
+            if versions:
+                if any(self._versions.get(table, 0) != before for table, (before, _) in versions.items()):
+                    if any(self._versions.get(table, 0) < after for table, (_, after) in versions.items()):
+                        self._stale = True
+                    return
+                self._versions.update({table: after for table, (_, after) in versions.items()})
+            for state, district, location in samples:
+                self._add(state, district, location, samples=1)
+            for state, district, location, disease in alerts:
+                self._add(state, district, location, alerts=1, disease=disease)
+
+    def _add(self, state, district, location, samples=0, alerts=0, disease=None):
+        counts = self._tree.setdefault(state, {}).setdefault(district, {}).setdefault(location, [0, 0])
+        counts[0] += samples
+        counts[1] += alerts
+        named = [('state', state), ('district', district), ('location', location)]
+        if disease is not None:
+            self._diseases[disease] = self._diseases.get(disease, 0) + alerts
+            named.append(('disease', disease))
+        for field, name in named:
+            names = self._names[field]
+            if name not in names:
+                names[name] = 0
+                self._sorted.pop(field, None)
+            names[name] += samples + alerts
+
+    def tree(self, state=None, district=None):
+        """Nested state → district → location counts, optionally narrowed"""
+        with self._lock:
+            states = []
+            for state_name in sorted(self._tree):
+                if state and state_name != state:
+                    continue
+                districts = []
+                for district_name in sorted(self._tree[state_name]):
+                    if district and district_name != district:
+                        continue
+                    locations = [
+                        {'name': name, 'samples': counts[0], 'alerts': counts[1]}
+                        for name, counts in sorted(self._tree[state_name][district_name].items())
+                    ]
+                    districts.append(_node(district_name, locations, 'locations'))
+                if districts:
+                    states.append(_node(state_name, districts, 'districts'))
+            diseases = [{'name': name, 'alerts': count} for name, count in sorted(self._diseases.items())]
+        return {'states': states, 'diseases': diseases}
+
+    def search(self, prefix, field=None, limit=10):
+        """Case-insensitive prefix matches across fields, most frequent first"""
+        prefix = prefix.lower()
+        matches = []
+        with self._lock:
+            for name_field in (field,) if field else FIELDS:
+                keys = self._sorted.get(name_field)
+                if keys is None:
+                    keys = self._sorted[name_field] = sorted((name.lower(), name) for name in self._names[name_field])
+                names = self._names[name_field]
+                for lowered, name in keys[bisect_left(keys, (prefix, '')):]:
+                    if not lowered.startswith(prefix):
+                        break
+                    matches.append({'field': name_field, 'value': name, 'count': names[name]})
+        matches.sort(key=lambda match: (-match['count'], match['value']))
+        return matches[:limit]
+
+def _field(record, name):
+    return record[name] if isinstance(record, dict) else getattr(record, name)
+
+def _node(name, children, key):
+    return {
+        'name': name,
+        'samples': sum(child['samples'] for child in children),
+        'alerts': sum(child['alerts'] for child in children),
+        key: children
+    }
+
+facet_index = FacetIndex()
+
+PENDING_KEY = 'pending_facets'
+
+def queue_for_facets(session, samples=(), alerts=(), versions=None):
+    """Count inserted rows (model objects or dicts) once the session's transaction commits.
+
+    versions is what bump_version() returned for the tables these rows changed.
+    """
+    pending = session.info.setdefault(PENDING_KEY, {'samples': [], 'alerts': [], 'versions': {}})
+    for table, version in (versions or {}).items():
+        # (first version this transaction bumped from, latest version it bumped to)
+        before, after = pending['versions'].get(table, (version - 1, version))
+        pending['versions'][table] = (before, max(after, version))
+    # Copy the values now; objects are expired by the time after_commit runs
+    pending['samples'].extend(
+        tuple(_field(sample, name) for name in ('state', 'district', 'location')) for sample in samples
+    )
+    pending['alerts'].extend(
+        tuple(_field(alert, name) for name in ('state', 'district', 'location', 'disease')) for alert in alerts
+    )
+
+@event.listens_for(Session, 'after_commit')
+def _apply_committed(session):
+    pending = session.info.pop(PENDING_KEY, None)
+    if pending:
+        facet_index.apply(pending['samples'], pending['alerts'], pending['versions'])
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_rolled_back(session):
+    session.info.pop(PENDING_KEY, None)
@@ -0,0 +1,173 @@
+"""
+Array-based evaluator for fitted sklearn tree ensembles.
+
+sklearn's predict_proba validates its input and dispatches every tree through
+joblib, which dominates the cost of scoring one row. FlatForest copies the
+fitted trees into contiguous node arrays once and walks all trees for all
+rows together with a handful of NumPy operations per tree level.
+
+The walk is vectorized over (row, tree) pairs, so it wins for single rows and
+small batches; sklearn's compiled per-tree loops stay faster for large ones.
+
+export_model writes the arrays next to a pickled model as plain .npy files
+(models/ai_model.flat/). Loading them with mmap_mode='r' lets every worker
+process share one page-cache copy of the forest instead of each unpickling
+its own:
+    python forest.py models/ai_model.pkl
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import argparse
+
+import joblib
+import numpy as np
+
+MANIFEST = 'manifest.json'
+ARRAYS = ('feature', 'threshold', 'left', 'right', 'value', 'roots')
+
+def flat_path(model_path):
+    """Directory holding the memory-mappable export of a model artifact"""
+    return os.path.splitext(model_path)[0] + '.flat'
+
+class FlatForest:
+    """Node arrays of every tree in an ensemble, concatenated.
+
+    Child indices are global offsets into the shared arrays. Leaves point both
+    children at themselves, which is how the walk recognises them.
+    """
+
+    def __init__(self, feature, threshold, left, right, value, roots, n_features):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.n_features = int(n_features)
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    @classmethod
+    def from_estimator(cls, model):
+        """Flatten a fitted single-output tree classifier or forest of them"""
+        trees = [e.tree_ for e in getattr(model, 'estimators_', [model])]
+        if not trees or not all(hasattr(tree, 'children_left') for tree in trees):
+            raise TypeError(f'{type(model).__name__} is not a fitted tree ensemble')
+        if any(tree.n_outputs != 1 for tree in trees):
+            raise TypeError('multi-output trees are not supported')
+
+        roots, offset = [], 0
+        features, thresholds, lefts, rights, values = [], [], [], [], []
+        for tree in trees:
+            nodes = np.arange(tree.node_count)
+            leaf = tree.children_left == -1
+            roots.append(offset)
+            features.append(np.where(leaf, 0, tree.feature))
+            thresholds.append(np.where(leaf, np.inf, tree.threshold))
+            lefts.append(np.where(leaf, nodes, tree.children_left) + offset)
+            rights.append(np.where(leaf, nodes, tree.children_right) + offset)
+            # value holds (weighted) class counts; each tree votes with its leaf's class proportions
+            counts = tree.value[:, 0, :]
+            totals = counts.sum(axis=1, keepdims=True)
+            values.append(np.divide(counts, totals, out=np.zeros_like(counts), where=totals > 0))
+            offset += tree.node_count
+
+        return cls(
+            feature=np.concatenate(features).astype(np.intp),
+            threshold=np.concatenate(thresholds).astype(np.float64),
+            left=np.concatenate(lefts).astype(np.intp),
+            right=np.concatenate(rights).astype(np.intp),
+            value=np.concatenate(values).astype(np.float64),
+            roots=np.asarray(roots, dtype=np.intp),
+            n_features=trees[0].n_features
+        )
+
+    def save(self, directory, **manifest):
+        """Write one .npy per node array plus a JSON manifest.
+
+        The export is built in a sibling directory and swapped in, so processes
+        that already mapped the old files keep reading them until they reload.
+        """
+        tmp_dir = f'{directory}.tmp-{os.getpid()}'
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        for name in ARRAYS:
+            np.save(os.path.join(tmp_dir, f'{name}.npy'), np.ascontiguousarray(getattr(self, name)))
+        manifest.update(n_features=self.n_features, n_trees=self.n_trees, n_nodes=self.n_nodes)
+        with open(os.path.join(tmp_dir, MANIFEST), 'w') as f:
+            json.dump(manifest, f, indent=2)
+        shutil.rmtree(directory, ignore_errors=True)
+        os.replace(tmp_dir, directory)
+
+    @classmethod
+    def load(cls, directory, mmap_mode='r'):
+        """Return (FlatForest, manifest); arrays are read-only file mappings by default"""
+        with open(os.path.join(directory, MANIFEST)) as f:
+            manifest = json.load(f)
+        # Plain ndarray views of the mappings skip np.memmap's per-operation overhead
+        arrays = {name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode=mmap_mode).view(np.ndarray)
+                  for name in ARRAYS}
+        return cls(n_features=manifest['n_features'], **arrays), manifest
+
+    def apply(self, X):
+        """Leaf index reached in every tree, shape (n_rows, n_trees)"""
+        # sklearn compares float32 inputs against float64 thresholds; rounding
+        # the same way keeps rows that sit on a threshold on the same side
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f'expected shape (n, {self.n_features}), got {X.shape}')
+        if not np.isfinite(X).all():
+            raise ValueError('input contains NaN or infinity')
+
+        n_rows, n_features = X.shape
+        flat = X.ravel()
+        # One walker per (row, tree); walkers drop out as they reach a leaf
+        node = np.tile(self.roots, n_rows)
+        row_offset = np.repeat(np.arange(n_rows, dtype=np.intp) * n_features, self.n_trees)
+        active = np.flatnonzero(self.left[node] != node)
+        while active.size:
+            current = node[active]
+            goes_left = flat[row_offset[active] + self.feature[current]] <= self.threshold[current]
+            current = np.where(goes_left, self.left[current], self.right[current])
+            node[active] = current
+            active = active[self.left[current] != current]
+        return node.reshape(n_rows, self.n_trees)
+
+    def predict_proba(self, X):
+        """Class probabilities averaged over trees, as RandomForestClassifier.predict_proba"""
+        return self.value[self.apply(X)].mean(axis=1)
+
+def export_model(model_path, model=None):
+    """Write the flattened arrays of a pickled forest next to it; returns the directory"""
+    if model is None:
+        model = joblib.load(model_path)
+    digest = hashlib.sha256()
+    with open(model_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+
+    fitted = getattr(model, 'feature_names_in_', None)
+    directory = flat_path(model_path)
+    FlatForest.from_estimator(model).save(
+        directory,
+        # The registry only maps an export whose source hash matches the pickle
+        source_sha256=digest.hexdigest(),
+        features=[str(f) for f in fitted] if fitted is not None else None,
+        classes=[str(c) for c in model.classes_]
+    )
+    return directory
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Export a pickled forest as memory-mappable arrays')
+    parser.add_argument('model', help='path to the joblib pickle, e.g. models/ai_model.pkl')
+    args = parser.parse_args()
+    print(f"Exported {args.model} → {export_model(args.model)}")
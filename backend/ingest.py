@@ -0,0 +1,236 @@
+import csv
+import io
+import json
+import math
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import insert
+from models import db, WaterSample
+from notifications import check_water_quality_alerts_batch
+from outbox import enqueue
+from prediction import rule_predict_batch
+from rollups import apply_water_rollups
+from facets import queue_for_facets
+from summary import apply_samples
+from versions import bump_version
+
+NUMERIC_FIELDS = ('ph', 'turbidity', 'bacterial_count', 'temperature')
+TEXT_FIELDS = ('location', 'state', 'district')
+
+# Fields POST /api/water/bulk accepts as query-string defaults for every row
+DEFAULT_FIELDS = TEXT_FIELDS + ('contamination_level',)
+
+# Lower-cased source headers (datasets/ exports and friends) → WaterSample fields
+COLUMN_ALIASES = {
+    'location': 'location',
+    'monitoring location': 'location',
+    'station': 'location',
+    'state': 'state',
+    'state name': 'state',
+    'country': 'state',
+    'district': 'district',
+    'region': 'district',
+    'ph': 'ph',
+    'ph level': 'ph',
+    'turbidity': 'turbidity',
+    'turbidity (ntu)': 'turbidity',
+    'bacterial_count': 'bacterial_count',
+    'bacteria count (cfu/ml)': 'bacterial_count',
+    'total coliform (mpn/100ml)': 'bacterial_count',
+    'temperature': 'temperature',
+    'temperature (°c)': 'temperature',
+    'temperature (c)': 'temperature',
+    'contamination_level': 'contamination_level',
+    'sample_date': 'sample_date',
+}
+
+# Rule-engine risk → contamination level, used when a row does not carry one
+CONTAMINATION_BY_RISK = {'High': 'High Risk', 'Medium': 'Moderate', 'Low': 'Safe'}
+
+class RowError(ValueError):
+    pass
+
+def _finite(name, value):
+    value = float(value)
+    if not math.isfinite(value):
+        raise ValueError(f'{name} must be finite')
+    return value
+
+def parse_water_sample(data):
+    """Validated WaterSample fields from a POST /api/water body; raises KeyError/ValueError"""
+    return {
+        'location': data['location'],
+        'state': data['state'],
+        'district': data['district'],
+        'ph': _finite('ph', data['ph']),
+        'turbidity': _finite('turbidity', data['turbidity']),
+        'bacterial_count': _finite('bacterial_count', data['bacterial_count']),
+        'temperature': _finite('temperature', data['temperature']),
+        'contamination_level': data['contamination_level']
+    }
+
+def stage_water_sample(fields):
+    """Add one sample and its derived writes to the current transaction (caller commits).
+    
+    Flushes so the sample has its id; alert evaluation is queued on the outbox.
+    """
+    sample = WaterSample(**fields)
+    db.session.add(sample)
+    apply_samples([sample])
+    versions = bump_version('water_samples')
+    db.session.flush()
+    # After the flush, which fills in the default sample_date
+    apply_water_rollups([sample])
+    queue_for_facets(db.session, samples=[sample], versions=versions)
+    enqueue('water_sample.alerts', {'sample_id': sample.id})
+    return sample
+
+def normalize_row(raw, defaults):
+    """Map one source row onto WaterSample fields; raises RowError"""
+    fields = dict(defaults)
+    ranges = {}
+    for key, value in raw.items():
+        if key is None or value is None or value == '':
+            continue
+        name = key.lower().strip()
+        # indian_water.csv style "<column> - min" / "<column> - max" pairs are averaged
+        for suffix in (' - min', ' - max'):
+            if name.endswith(suffix) and name[:-len(suffix)] in COLUMN_ALIASES:
+                ranges.setdefault(COLUMN_ALIASES[name[:-len(suffix)]], []).append(value)
+                break
+        else:
+            if name in COLUMN_ALIASES:
+                fields[COLUMN_ALIASES[name]] = value
+
+    for field, values in ranges.items():
+        if field not in fields:
+            try:
+                fields[field] = sum(float(v) for v in values) / len(values)
+            except (TypeError, ValueError):
+                raise RowError(f'{field} must be numeric')
+
+    row = {}
+    for field in TEXT_FIELDS:
+        value = fields.get(field)
+        if value is None or str(value).strip() == '':
+            raise RowError(f'missing field {field}')
+        row[field] = str(value).strip()
+
+    for field in NUMERIC_FIELDS:
+        if field not in fields:
+            raise RowError(f'missing field {field}')
+        try:
+            value = float(fields[field])
+        except (TypeError, ValueError):
+            raise RowError(f'{field} must be numeric')
+        if not math.isfinite(value):
+            raise RowError(f'{field} must be finite')
+        row[field] = value
+
+    row['contamination_level'] = fields.get('contamination_level') or None
+
+    if fields.get('sample_date'):
+        try:
+            sample_date = datetime.fromisoformat(str(fields['sample_date']))
+        except ValueError:
+            raise RowError('sample_date must be an ISO date')
+        # Stored naive in UTC like every other timestamp; SQLite would drop the offset
+        if sample_date.tzinfo is not None:
+            sample_date = sample_date.astimezone(timezone.utc).replace(tzinfo=None)
+        row['sample_date'] = sample_date
+    else:
+        row['sample_date'] = datetime.utcnow()
+
+    return row
+
+def iter_records(stream, fmt):
+    """Yield (line_number, raw_row) from a CSV or NDJSON byte stream without buffering it"""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if fmt == 'csv':
+        reader = csv.DictReader(text)
+        for raw in reader:
+            yield reader.line_num, raw
+    else:
+        for line_number, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                raw = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield line_number, RowError(f'invalid JSON: {e.msg}')
+                continue
+            yield line_number, raw if isinstance(raw, dict) else RowError('expected a JSON object')
+
+def insert_chunk(rows):
+    """Insert one validated chunk, evaluate its alerts in one pass and commit once"""
+    missing = [row for row in rows if row['contamination_level'] is None]
+    if missing:
+        risks, _ = rule_predict_batch(*([row[f] for row in missing] for f in NUMERIC_FIELDS))
+        for row, risk in zip(missing, risks):
+            row['contamination_level'] = CONTAMINATION_BY_RISK[risk]
+
+    db.session.execute(insert(WaterSample), rows)
+    apply_samples(rows)
+    apply_water_rollups(rows)
+    queue_for_facets(db.session, samples=rows, versions=bump_version('water_samples'))
+    check_water_quality_alerts_batch(rows, commit=False)
+    db.session.commit()
+
+def ingest_water_samples(stream, fmt, defaults=None, chunk_size=5000, max_errors=1000):
+    """Stream-parse CSV/NDJSON samples and insert them, committing once per chunk.
+
+    Invalid rows are skipped and reported by line number; the report also
+    carries the achieved rows/sec.
+    """
+    start = time.perf_counter()
+    defaults = defaults or {}
+    inserted = rejected = chunks = 0
+    errors = []
+    chunk = []
+
+    def flush():
+        nonlocal inserted, chunks
+        try:
+            insert_chunk(chunk)
+        except Exception:
+            db.session.rollback()
+            raise
+        inserted += len(chunk)
+        chunks += 1
+        chunk.clear()
+
+    try:
+        for line_number, raw in iter_records(stream, fmt):
+            try:
+                if isinstance(raw, RowError):
+                    raise raw
+                chunk.append(normalize_row(raw, defaults))
+            except RowError as e:
+                rejected += 1
+                if len(errors) < max_errors:
+                    errors.append({'line': line_number, 'error': str(e)})
+                continue
+            if len(chunk) >= chunk_size:
+                flush()
+        if chunk:
+            flush()
+        failure = None
+    except (UnicodeDecodeError, csv.Error) as e:
+        failure = f'could not parse input: {e}'
+    except Exception as e:
+        failure = f'chunk {chunks + 1} failed and was rolled back: {e}'
+
+    seconds = time.perf_counter() - start
+    report = {
+        'inserted': inserted,
+        'rejected': rejected,
+        'chunks': chunks,
+        'errors': errors,
+        'errors_truncated': rejected > len(errors),
+        'seconds': round(seconds, 3),
+        'rows_per_second': round(inserted / seconds, 1) if seconds > 0 else 0.0
+    }
+    if failure:
+        report['error'] = failure
+    return report
@@ -0,0 +1,281 @@
+"""
+Request, SQL and component metrics in the Prometheus text format.
+
+init_metrics(app) times every request and counts the SQL statements it runs
+(SQLAlchemy before/after_cursor_execute events on all engines) per route
+template; GET /api/metrics renders those together with the model registry,
+alert rule, pool, write buffer, outbox and password hasher figures.
+
+Recording is a perf_counter() pair and a few list increments under one lock
+per request; benchmarks/metrics_overhead.py measures what it costs. Like the
+other in-process state, each worker process reports only its own traffic.
+"""
+
+import time
+import threading
+from bisect import bisect_left
+
+from flask import current_app, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+PREFIX = 'health_monitor_'
+
+# Upper bounds in seconds / statement counts; +Inf is implied
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by a tuple of label values"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.series = {}  # labels → [bucket counts..., +Inf count, sum]
+
+    def observe(self, labels, value):
+        # Callers hold the registry lock
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def samples(self, name, label_names):
+        """(sample name, labels, value) rows with cumulative buckets, _sum and _count"""
+        rows = []
+        for labels, series in sorted(self.series.items()):
+            base = dict(zip(label_names, labels))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series):
+                cumulative += count
+                rows.append((f'{name}_bucket', {**base, 'le': _number(bound)}, cumulative))
+            rows.append((f'{name}_sum', base, series[-1]))
+            rows.append((f'{name}_count', base, cumulative))
+        return rows
+
+class RequestMetrics:
+    """Per-route request counts and latency / SQL histograms, plus SQL outside requests"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.requests = {}  # (method, route, status) → count
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.statements = Histogram(STATEMENT_BUCKETS)
+        self.sql_time = Histogram(LATENCY_BUCKETS)
+        # context ('request' / 'background') → [statements, seconds]
+        self.sql_totals = {'request': [0, 0.0], 'background': [0, 0.0]}
+
+    def start_request(self):
+        local = self._local
+        local.active = True
+        local.statements = 0
+        local.sql_seconds = 0.0
+        local.started = time.perf_counter()
+
+    def finish_request(self, method, route, status):
+        local = self._local
+        if not getattr(local, 'active', False):
+            return
+        elapsed = time.perf_counter() - local.started
+        local.active = False
+        labels = (method, route)
+        with self._lock:
+            key = (method, route, status)
+            self.requests[key] = self.requests.get(key, 0) + 1
+            self.latency.observe(labels, elapsed)
+            self.statements.observe(labels, local.statements)
+            self.sql_time.observe(labels, local.sql_seconds)
+            totals = self.sql_totals['request']
+            totals[0] += local.statements
+            totals[1] += local.sql_seconds
+
+    def record_statement(self, seconds):
+        local = self._local
+        if getattr(local, 'active', False):
+            local.statements += 1
+            local.sql_seconds += seconds
+        else:
+            # Outbox workers, write buffer flushes, streamed bodies after the response started
+            with self._lock:
+                totals = self.sql_totals['background']
+                totals[0] += 1
+                totals[1] += seconds
+
+    def samples(self):
+        with self._lock:
+            rows = [(f'{PREFIX}http_requests_total', {'method': m, 'route': r, 'status': str(s)}, count)
+                    for (m, r, s), count in sorted(self.requests.items())]
+            rows += self.latency.samples(f'{PREFIX}http_request_duration_seconds', ('method', 'route'))
+            rows += self.statements.samples(f'{PREFIX}db_statements_per_request', ('method', 'route'))
+            rows += self.sql_time.samples(f'{PREFIX}db_seconds_per_request', ('method', 'route'))
+            for context, (count, seconds) in sorted(self.sql_totals.items()):
+                rows.append((f'{PREFIX}db_statements_total', {'context': context}, count))
+                rows.append((f'{PREFIX}db_statement_seconds_total', {'context': context}, seconds))
+        return rows
+
+request_metrics = RequestMetrics()
+
+# name → (type, help) for everything render() may emit
+METRIC_HELP = {
+    'http_requests_total': ('counter', 'HTTP requests by method, route template and status'),
+    'http_request_duration_seconds': ('histogram', 'Time from request start to response (excludes streamed bodies)'),
+    'db_statements_per_request': ('histogram', 'SQL statements executed per request'),
+    'db_seconds_per_request': ('histogram', 'Time spent in SQL statements per request'),
+    'db_statements_total': ('counter', 'SQL statements executed, in requests or background threads'),
+    'db_statement_seconds_total': ('counter', 'Time spent in SQL statements'),
+    'db_pool_size': ('gauge', 'Configured connection pool size per bind'),
+    'db_pool_checked_out': ('gauge', 'Connections currently in use per bind'),
+    'db_pool_checked_in': ('gauge', 'Idle pooled connections per bind'),
+    'db_pool_overflow': ('gauge', 'Connections opened beyond pool_size per bind'),
+    'model_loaded': ('gauge', '1 when a compatible model is serving predictions'),
+    'model_load_seconds': ('gauge', 'Time the current model took to load'),
+    'model_reloads_total': ('counter', 'Times the model artifact was (re)loaded'),
+    'model_inference_calls_total': ('counter', 'predict_proba calls on the loaded model'),
+    'model_inference_rows_total': ('counter', 'Rows scored by the loaded model'),
+    'model_inference_failures_total': ('counter', 'Model calls that failed and fell back to rules'),
+    'model_inference_seconds_total': ('counter', 'Time spent in model inference'),
+    'notifications_created_total': ('counter', 'Notifications committed per alert rule'),
+    'write_buffer_queued': ('gauge', 'Water samples waiting for the next group commit'),
+    'write_buffer_rows_total': ('counter', 'Water samples committed by the write buffer'),
+    'write_buffer_batches_total': ('counter', 'Group commits by the write buffer'),
+    'write_buffer_rejected_total': ('counter', 'Samples rejected because the buffer was full'),
+    'write_buffer_failed_total': ('counter', 'Samples whose batch failed to commit'),
+    'write_buffer_cancelled_total': ('counter', 'Samples dropped unwritten because their request timed out'),
+    'outbox_processed_total': ('counter', 'Outbox events processed by this process'),
+    'outbox_failed_total': ('counter', 'Outbox event attempts that failed in this process'),
+    'outbox_events': ('gauge', 'Outbox events by status'),
+    'auth_hash_pending': ('gauge', 'Password hashes queued or running'),
+    'auth_hash_completed_total': ('counter', 'Password hashes computed'),
+    'auth_hash_rejected_total': ('counter', 'Logins turned away because the hash pool was full'),
+    'auth_hash_timeouts_total': ('counter', 'Logins that gave up waiting for a password hash'),
+    'auth_revoked_tokens': ('gauge', 'Revoked tokens that have not expired yet'),
+}
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def pool_samples(engines):
+    rows = []
+    for bind, engine in sorted(engines.items(), key=lambda item: str(item[0])):
+        pool = engine.pool
+        labels = {'bind': bind or 'default'}
+        for name, method in (('db_pool_size', 'size'), ('db_pool_checked_out', 'checkedout'),
+                             ('db_pool_checked_in', 'checkedin'), ('db_pool_overflow', 'overflow')):
+            if hasattr(pool, method):
+                # QueuePool.overflow() counts up from -pool_size until the pool is full
+                value = getattr(pool, method)()
+                rows.append((PREFIX + name, labels, max(value, 0) if method == 'overflow' else value))
+    return rows
+
+def model_samples(stats):
+    return [
+        (PREFIX + 'model_loaded', {}, bool(stats['loaded'] and stats['compatible'])),
+        (PREFIX + 'model_load_seconds', {}, (stats['load_ms'] or 0) / 1000),
+        (PREFIX + 'model_reloads_total', {}, stats['reloads']),
+        (PREFIX + 'model_inference_calls_total', {}, stats['inference_calls']),
+        (PREFIX + 'model_inference_rows_total', {}, stats['inference_rows']),
+        (PREFIX + 'model_inference_failures_total', {}, stats['inference_failures']),
+        (PREFIX + 'model_inference_seconds_total', {}, stats['inference_seconds']),
+    ]
+
+def collect():
+    """Every sample /api/metrics reports, read from the current app's components"""
+    from models import db
+    from notifications import alert_rules
+    from prediction import registry
+
+    rows = request_metrics.samples()
+    rows += pool_samples(db.engines)
+    rows += model_samples(registry.stats())
+    # Fed by an after_commit hook, so rolled-back batches and outbox retries are not counted
+    rows += [(PREFIX + 'notifications_created_total', {'rule': rule}, count)
+             for rule, count in sorted(alert_rules.notification_counts().items())]
+
+    extensions = current_app.extensions
+    if 'write_buffer' in extensions:
+        stats = extensions['write_buffer'].stats()
+        rows += [(PREFIX + 'write_buffer_queued', {}, stats['queued'])]
+        rows += [(f'{PREFIX}write_buffer_{key}_total', {}, stats[key])
+                 for key in ('rows', 'batches', 'rejected', 'failed', 'cancelled')]
+    if 'outbox_worker' in extensions:
+        stats = extensions['outbox_worker'].stats()
+        rows += [(PREFIX + 'outbox_processed_total', {}, stats['processed']),
+                 (PREFIX + 'outbox_failed_total', {}, stats['failed'])]
+        rows += [(PREFIX + 'outbox_events', {'status': status}, stats[status])
+                 for status in ('pending', 'processing', 'dead')]
+    if 'password_hasher' in extensions:
+        stats = extensions['password_hasher'].stats()
+        rows += [(PREFIX + 'auth_hash_pending', {}, stats['pending']),
+                 (PREFIX + 'auth_hash_completed_total', {}, stats['completed']),
+                 (PREFIX + 'auth_hash_rejected_total', {}, stats['rejected']),
+                 (PREFIX + 'auth_hash_timeouts_total', {}, stats['timed_out']),
+                 (PREFIX + 'auth_revoked_tokens', {}, len(extensions['auth_revocations']))]
+    return rows
+
+def _family(name):
+    family = name[len(PREFIX):]
+    for suffix in ('_bucket', '_sum', '_count'):
+        if family.endswith(suffix) and family[:-len(suffix)] in METRIC_HELP:
+            return family[:-len(suffix)]
+    return family
+
+def render(samples):
+    """Prometheus text exposition (format 0.0.4) of (name, labels, value) rows"""
+    # Each family's samples must be contiguous, under one HELP/TYPE header
+    families = {}
+    for sample in samples:
+        families.setdefault(_family(sample[0]), []).append(sample)
+
+    lines = []
+    for family, rows in families.items():
+        if family in METRIC_HELP:
+            kind, text = METRIC_HELP[family]
+            lines.append(f'# HELP {PREFIX}{family} {text}')
+            lines.append(f'# TYPE {PREFIX}{family} {kind}')
+        for name, labels, value in rows:
+            label_text = ','.join(f'{key}="{_escape(val)}"' for key, val in labels.items())
+            lines.append(f'{name}{{{label_text}}} {_number(value)}' if label_text else f'{name} {_number(value)}')
+    return '\n'.join(lines) + '\n'
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('metrics_started', []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get('metrics_started')
+    if started:
+        request_metrics.record_statement(time.perf_counter() - started.pop())
+
+def _handle_error(exception_context):
+    started = exception_context.connection.info.get('metrics_started') if exception_context.connection else None
+    if started:
+        request_metrics.record_statement(time.perf_counter() - started.pop())
+
+def init_metrics(app):
+    """Time requests and SQL statements unless METRICS_ENABLED is off"""
+    if not app.config['METRICS_ENABLED']:
+        return
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(Engine, 'handle_error', _handle_error)
+
+    @app.before_request
+    def start_timer():
+        request_metrics.start_request()
+
+    @app.after_request
+    def record_request(response):
+        rule = request.url_rule
+        request_metrics.finish_request(request.method, rule.rule if rule is not None else 'unmatched',
+                                       response.status_code)
+        return response
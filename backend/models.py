@@ -1,10 +1,19 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
+from utils.db_routing import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 class WaterSample(db.Model):
     __tablename__ = 'water_samples'
+    # GET /api/water filters on state and/or district plus a date range and
+    # sorts by (sample_date, id) desc. SQLite appends the rowid (id) to every
+    # index entry, so these also serve the id tie-break and keyset seeks.
+    __table_args__ = (
+        db.Index('ix_water_samples_sample_date', 'sample_date'),
+        db.Index('ix_water_samples_state_sample_date', 'state', 'sample_date'),
+        db.Index('ix_water_samples_district_sample_date', 'district', 'sample_date'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     location = db.Column(db.String(100), nullable=False)
@@ -31,8 +40,68 @@ class WaterSample(db.Model):
             'sample_date': self.sample_date.isoformat()
         }
 
+class WaterSummary(db.Model):
+    """Running aggregates of water_samples per contamination level.
+    
+    Maintained in the same transaction as each sample insert so /api/summary
+    reads a handful of rows instead of the whole table.
+    """
+    __tablename__ = 'water_summary'
+    
+    contamination_level = db.Column(db.String(20), primary_key=True)
+    sample_count = db.Column(db.Integer, nullable=False, default=0)
+    ph_sum = db.Column(db.Float, nullable=False, default=0.0)
+    turbidity_sum = db.Column(db.Float, nullable=False, default=0.0)
+
+class RegionDailyWater(db.Model):
+    """Daily water_samples aggregates per (state, district, contamination level).
+    
+    Maintained alongside each insert (see rollups.py) so /api/regions trends
+    read one row per region-day instead of every sample. The primary key
+    serves state filters and the extra index district filters.
+    """
+    __tablename__ = 'region_daily_water'
+    __table_args__ = (
+        db.Index('ix_region_daily_water_district_day', 'district', 'day'),
+    )
+    
+    state = db.Column(db.String(50), primary_key=True)
+    district = db.Column(db.String(50), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    contamination_level = db.Column(db.String(20), primary_key=True)
+    sample_count = db.Column(db.Integer, nullable=False, default=0)
+    ph_sum = db.Column(db.Float, nullable=False, default=0.0)
+    ph_min = db.Column(db.Float, nullable=False)
+    ph_max = db.Column(db.Float, nullable=False)
+    turbidity_sum = db.Column(db.Float, nullable=False, default=0.0)
+    turbidity_min = db.Column(db.Float, nullable=False)
+    turbidity_max = db.Column(db.Float, nullable=False)
+    bacterial_count_sum = db.Column(db.Float, nullable=False, default=0.0)
+    bacterial_count_min = db.Column(db.Float, nullable=False)
+    bacterial_count_max = db.Column(db.Float, nullable=False)
+
+class RegionDailyDisease(db.Model):
+    """Daily disease_alerts counts and case sums per (state, district, disease)"""
+    __tablename__ = 'region_daily_disease'
+    __table_args__ = (
+        db.Index('ix_region_daily_disease_district_day', 'district', 'day'),
+    )
+    
+    state = db.Column(db.String(50), primary_key=True)
+    district = db.Column(db.String(50), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    disease = db.Column(db.String(50), primary_key=True)
+    alert_count = db.Column(db.Integer, nullable=False, default=0)
+    case_sum = db.Column(db.Integer, nullable=False, default=0)
+
 class DiseaseAlert(db.Model):
     __tablename__ = 'disease_alerts'
+    # GET /api/alerts filters on disease and/or district, sorted by reported_at desc
+    __table_args__ = (
+        db.Index('ix_disease_alerts_reported_at', 'reported_at'),
+        db.Index('ix_disease_alerts_disease_reported_at', 'disease', 'reported_at'),
+        db.Index('ix_disease_alerts_district_reported_at', 'district', 'reported_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     disease = db.Column(db.String(50), nullable=False)
@@ -86,7 +155,7 @@ class User(db.Model):
     
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(50), unique=True, nullable=False)
-    password = db.Column(db.String(100), nullable=False)
+    password = db.Column(db.String(255), nullable=False)  # werkzeug hash (see auth.py)
     role = db.Column(db.String(20), nullable=False)
     
     def to_dict(self):
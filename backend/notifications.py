@@ -1,14 +1,39 @@
-from models import db
+import os
+import json
+import logging
+import operator
+import string
+import threading
+import time
+from collections import Counter, namedtuple
 from datetime import datetime
 
+import numpy as np
+from sqlalchemy import event, insert
+from sqlalchemy.orm import Session
+from models import db, WaterSample, DiseaseAlert
+from pubsub import queue_for_publish
+from versions import bump_version
+
+logger = logging.getLogger(__name__)
+
+ALERT_RULES_PATH = os.environ.get(
+    'ALERT_RULES_PATH', os.path.join(os.path.dirname(__file__), 'alert_rules.json')
+)
+
 class Notification(db.Model):
     __tablename__ = 'notifications'
+    # GET /api/notifications returns the latest rows by created_at
+    __table_args__ = (
+        db.Index('ix_notifications_created_at', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(100), nullable=False)
     message = db.Column(db.Text, nullable=False)
     type = db.Column(db.String(20), nullable=False)  # 'water', 'disease', 'system'
     user_id = db.Column(db.Integer, nullable=True)  # None for broadcast
+    severity = db.Column(db.String(20), nullable=True)  # 'info', 'warning', 'critical'
     read = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
@@ -18,65 +43,256 @@ class Notification(db.Model):
             'title': self.title,
             'message': self.message,
             'type': self.type,
+            'severity': self.severity,
             'read': self.read,
             'timestamp': self.created_at.isoformat()
         }
 
-def create_notification(title, message, notification_type, user_id=None):
-    """Create a new notification"""
-    notification = Notification(
-        title=title,
-        message=message,
-        type=notification_type,
-        user_id=user_id
+# Vectorized comparisons a rule may use; thresholds for range/set operators are lists
+OPERATORS = {
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+    '==': operator.eq,
+    '!=': operator.ne,
+    'in': lambda values, threshold: np.isin(values, threshold),
+    'not_in': lambda values, threshold: ~np.isin(values, threshold),
+    'between': lambda values, threshold: (values >= threshold[0]) & (values <= threshold[1]),
+    'outside': lambda values, threshold: (values < threshold[0]) | (values > threshold[1]),
+}
+
+NUMERIC_OPERATORS = ('<', '<=', '>', '>=', 'between', 'outside')
+
+# Record fields a rule (and its title/message placeholders) may refer to, per source
+SOURCE_FIELDS = {
+    'water': frozenset(WaterSample.__table__.columns.keys()),
+    'disease': frozenset(DiseaseAlert.__table__.columns.keys()),
+}
+
+AlertRule = namedtuple('AlertRule', [
+    'name', 'source', 'field', 'operator', 'threshold', 'severity', 'type', 'title', 'message', 'compare'
+])
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def _check_threshold(spec):
+    """Reject thresholds the operator cannot compare against, before they reach evaluate()"""
+    operator_name, threshold = spec['operator'], spec['threshold']
+    if operator_name in ('between', 'outside'):
+        if not (isinstance(threshold, list) and len(threshold) == 2 and all(map(_is_number, threshold))):
+            raise ValueError(f"rule {spec['name']} needs a [low, high] numeric threshold for {operator_name}")
+    elif operator_name in NUMERIC_OPERATORS:
+        if not _is_number(threshold):
+            raise ValueError(f"rule {spec['name']} needs a numeric threshold for {operator_name}")
+    elif operator_name in ('in', 'not_in'):
+        if not isinstance(threshold, list):
+            raise ValueError(f"rule {spec['name']} needs a list threshold for {operator_name}")
+
+def compile_rule(spec):
+    """Validate one rule definition and bind its comparison function"""
+    missing = [key for key in ('name', 'source', 'field', 'operator', 'threshold', 'title', 'message')
+               if key not in spec]
+    if missing:
+        raise ValueError(f"rule {spec.get('name', '?')} is missing {missing}")
+    if spec['operator'] not in OPERATORS:
+        raise ValueError(f"rule {spec['name']} has unknown operator {spec['operator']!r}")
+    _check_threshold(spec)
+    fields = SOURCE_FIELDS.get(spec['source'])
+    if fields is None:
+        raise ValueError(f"rule {spec['name']} has unknown source {spec['source']!r}")
+    if spec['field'] not in fields:
+        raise ValueError(f"rule {spec['name']} has unknown field {spec['field']!r}")
+    for key in ('title', 'message'):
+        try:
+            placeholders = [name for _, name, _, _ in string.Formatter().parse(spec[key]) if name is not None]
+        except ValueError as e:
+            raise ValueError(f"rule {spec['name']} has a malformed {key}: {e}")
+        for name in placeholders:
+            if name.split('.')[0].split('[')[0] not in fields:
+                raise ValueError(f"rule {spec['name']} {key} refers to unknown field {{{name}}}")
+
+    return AlertRule(
+        name=spec['name'],
+        source=spec['source'],
+        field=spec['field'],
+        operator=spec['operator'],
+        threshold=spec['threshold'],
+        severity=spec.get('severity', 'info'),
+        type=spec.get('type', spec['source']),
+        title=spec['title'],
+        message=spec['message'],
+        compare=OPERATORS[spec['operator']]
+    )
+
+class AlertRuleSet:
+    """Alert rules loaded from JSON, recompiled when the file changes on disk"""
+
+    def __init__(self, path=ALERT_RULES_PATH, check_interval=5.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._rules = ()
+        self._mtime = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+        self._counts_lock = threading.Lock()
+        self.counts = Counter()  # notifications committed per rule name
+
+    def load(self):
+        """(Re)compile the rule file; a broken file keeps the previous rules"""
+        with self._lock:
+            self._last_check = time.monotonic()
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+                if mtime == self._mtime:
+                    return self._rules
+                with open(self.path) as f:
+                    rules = tuple(compile_rule(spec) for spec in json.load(f))
+            except (OSError, ValueError) as e:
+                logger.error(f"Could not load alert rules from {self.path}: {e}")
+                return self._rules
+
+            self._rules = rules
+            self._mtime = mtime
+            logger.info(f"Loaded {len(rules)} alert rules from {self.path}")
+            return rules
+
+    def rules_for(self, source):
+        if time.monotonic() - self._last_check >= self.check_interval:
+            self.load()
+        return [rule for rule in self._rules if rule.source == source]
+
+    def notification_counts(self):
+        """Copy of the per-rule counts, safe to iterate while alerts are evaluated"""
+        with self._counts_lock:
+            return dict(self.counts)
+
+    def record(self, counts):
+        """Add committed notifications per rule name (from the after_commit hook)"""
+        with self._counts_lock:
+            self.counts.update(counts)
+
+    def evaluate(self, source, records):
+        """Return notification rows for every rule a batch of records trips.
+        
+        Each rule is one vectorized comparison over a column of the batch;
+        results come back in record order, then rule order. Each row names
+        its rule under 'rule', which the insert ignores.
+        """
+        rules = self.rules_for(source)
+        if not records or not rules:
+            return []
+
+        def value(record, field):
+            return record[field] if isinstance(record, dict) else getattr(record, field)
+
+        columns = {}
+        for rule in rules:
+            key = (rule.field, rule.operator in NUMERIC_OPERATORS)
+            if key not in columns:
+                dtype = np.float64 if key[1] else object
+                columns[key] = np.array([value(r, rule.field) for r in records], dtype=dtype)
+
+        hits = []
+        for rule_index, rule in enumerate(rules):
+            mask = rule.compare(columns[(rule.field, rule.operator in NUMERIC_OPERATORS)], rule.threshold)
+            hits.extend((int(i), rule_index) for i in np.flatnonzero(mask))
+        hits.sort()
+
+        now = datetime.utcnow()
+        notifications = []
+        for record_index, rule_index in hits:
+            rule = rules[rule_index]
+            record = records[record_index]
+            fields = record if isinstance(record, dict) else _Attributes(record)
+            notifications.append({
+                'title': rule.title.format_map(fields),
+                'message': rule.message.format_map(fields),
+                'type': rule.type,
+                'severity': rule.severity,
+                'user_id': None,
+                'read': False,
+                'created_at': now,
+                'rule': rule.name
+            })
+        return notifications
+
+class _Attributes:
+    """Mapping view over an ORM object for str.format_map"""
+
+    def __init__(self, obj):
+        self.obj = obj
+
+    def __getitem__(self, key):
+        return getattr(self.obj, key)
+
+alert_rules = AlertRuleSet()
+
+COUNTS_KEY = 'pending_rule_counts'
+
+def create_notification(title, message, notification_type, user_id=None, commit=True, severity='info'):
+    """Create a new notification; pass commit=False to leave it to the caller's transaction"""
+    return create_notifications([{
+        'title': title,
+        'message': message,
+        'type': notification_type,
+        'severity': severity,
+        'user_id': user_id,
+        'read': False,
+        'created_at': datetime.utcnow()
+    }], commit=commit)[0]
+
+def create_notifications(rows, commit=True):
+    """Insert many notifications with one statement; returns them as dicts with ids"""
+    if not rows:
+        return []
+
+    result = db.session.execute(
+        insert(Notification).returning(Notification.id, sort_by_parameter_order=True), rows
     )
-    db.session.add(notification)
-    db.session.commit()
-    return notification
+    created = []
+    for row, inserted in zip(rows, result):
+        created.append({
+            'id': inserted.id,
+            'title': row['title'],
+            'message': row['message'],
+            'type': row['type'],
+            'severity': row['severity'],
+            'read': row['read'],
+            'timestamp': row['created_at'].isoformat()
+        })
+    bump_version('notifications')
+    # Pushed to long-poll/SSE subscribers when the transaction commits
+    queue_for_publish(db.session, created)
+    # Counted once committed, so rolled-back batches and outbox retries are not
+    db.session.info.setdefault(COUNTS_KEY, Counter()).update(row['rule'] for row in rows if row.get('rule'))
+    if commit:
+        db.session.commit()
+    return created
 
-def check_water_quality_alerts(water_sample):
+@event.listens_for(Session, 'after_commit')
+def _count_committed(session):
+    counts = session.info.pop(COUNTS_KEY, None)
+    if counts:
+        alert_rules.record(counts)
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_rolled_back(session):
+    session.info.pop(COUNTS_KEY, None)
+
+def check_water_quality_alerts(water_sample, commit=True):
     """Check water sample and create alerts if needed"""
-    alerts = []
-    
-    # pH alerts
-    if water_sample.ph < 6.0 or water_sample.ph > 8.5:
-        alert = create_notification(
-            title="Critical pH Level",
-            message=f"pH level {water_sample.ph:.1f} detected at {water_sample.location}",
-            notification_type="water"
-        )
-        alerts.append(alert)
-    
-    # Turbidity alerts
-    if water_sample.turbidity > 5.0:
-        alert = create_notification(
-            title="High Turbidity Alert",
-            message=f"Turbidity {water_sample.turbidity:.1f} NTU at {water_sample.location}",
-            notification_type="water"
-        )
-        alerts.append(alert)
-    
-    # Contamination alerts
-    if water_sample.contamination_level == 'High Risk':
-        alert = create_notification(
-            title="Contamination Alert",
-            message=f"High risk contamination detected at {water_sample.location}",
-            notification_type="water"
-        )
-        alerts.append(alert)
-    
-    return alerts
+    return check_water_quality_alerts_batch([water_sample], commit=commit)
+
+def check_water_quality_alerts_batch(water_samples, commit=True):
+    """Evaluate the water rules over a batch of samples (objects or dicts) at once"""
+    return create_notifications(alert_rules.evaluate('water', water_samples), commit=commit)
 
-def check_disease_alerts(disease_alert):
+def check_disease_alerts(disease_alert, commit=True):
     """Check disease alert and create notifications if needed"""
-    alerts = []
-    
-    if disease_alert.risk_level in ['High', 'Critical']:
-        alert = create_notification(
-            title=f"{disease_alert.disease} Outbreak Alert",
-            message=f"{disease_alert.cases} cases reported in {disease_alert.district}",
-            notification_type="disease"
-        )
-        alerts.append(alert)
-    
-    return alerts
\ No newline at end of file
+    return check_disease_alerts_batch([disease_alert], commit=commit)
+
+def check_disease_alerts_batch(disease_alerts, commit=True):
+    """Evaluate the disease rules over a batch of alerts (objects or dicts) at once"""
+    return create_notifications(alert_rules.evaluate('disease', disease_alerts), commit=commit)
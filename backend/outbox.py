@@ -0,0 +1,242 @@
+"""
+Transactional outbox for post-write side effects.
+
+Write endpoints record the work they would otherwise do inline (alert
+evaluation today) as OutboxEvent rows in the same transaction as the
+primary insert, then return after that single commit. OutboxWorker threads
+drain the table in batches; an event's side effects and its deletion
+commit together, so a crash either leaves the event to be retried or
+leaves nothing behind.
+
+To drain it from a separate process instead, start the web app with
+FLASK_OUTBOX_WORKERS=0 and run run_outbox_worker.py. Notifications created
+there do not reach the web process's notification bus; its long-poll and
+SSE clients check the database every NOTIFICATION_POLL_SECONDS instead.
+"""
+
+import json
+import logging
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, or_, and_, select, update
+from sqlalchemy.orm import Session
+from models import db, WaterSample, DiseaseAlert
+from notifications import check_water_quality_alerts_batch, check_disease_alerts_batch
+
+logger = logging.getLogger(__name__)
+
+class OutboxEvent(db.Model):
+    __tablename__ = 'outbox_events'
+    # Workers claim the oldest due events by status
+    __table_args__ = (
+        db.Index('ix_outbox_events_status_available_at', 'status', 'available_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # 'pending', 'processing', 'failed'
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    available_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_by = db.Column(db.String(36), nullable=True)
+    locked_at = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+def _water_sample_alerts(payloads):
+    ids = [payload['sample_id'] for payload in payloads]
+    samples = WaterSample.query.filter(WaterSample.id.in_(ids)).order_by(WaterSample.id).all()
+    check_water_quality_alerts_batch(samples, commit=False)
+
+def _disease_alert_alerts(payloads):
+    ids = [payload['alert_id'] for payload in payloads]
+    alerts = DiseaseAlert.query.filter(DiseaseAlert.id.in_(ids)).order_by(DiseaseAlert.id).all()
+    check_disease_alerts_batch(alerts, commit=False)
+
+# Event kind → handler taking the payloads of one claimed batch; handlers must
+# not commit, the worker commits their effects together with the event deletion
+HANDLERS = {
+    'water_sample.alerts': _water_sample_alerts,
+    'disease_alert.alerts': _disease_alert_alerts,
+}
+
+WAKE_KEY = 'outbox_enqueued'
+
+def enqueue(kind, payload):
+    """Record a side effect in the current transaction (caller commits)"""
+    if kind not in HANDLERS:
+        raise ValueError(f'Unknown outbox event kind: {kind}')
+    db.session.add(OutboxEvent(kind=kind, payload=json.dumps(payload)))
+    db.session.info[WAKE_KEY] = True
+
+class OutboxWorker:
+    """Pool of threads draining outbox_events in batches with retries and backoff"""
+
+    def __init__(self, app, threads=2, batch_size=100, poll_interval=1.0,
+                 max_attempts=5, lease_seconds=60):
+        self.app = app
+        self.threads = threads
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+        self.processed = 0
+        self.failed = 0
+
+    def start(self):
+        for i in range(self.threads):
+            thread = threading.Thread(target=self._run, name=f'outbox-worker-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def wake(self):
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                with self.app.app_context():
+                    handled = self.run_once()
+            except Exception as e:
+                logger.error(f"Outbox worker iteration failed: {e}")
+                handled = 0
+            if handled < self.batch_size:
+                # Drained (or failing); sleep until new work is committed or the poll interval passes
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+
+    def claim(self):
+        """Atomically lease a batch of due events, including ones whose lease expired"""
+        token = str(uuid.uuid4())
+        now = datetime.utcnow()
+        expired = and_(OutboxEvent.status == 'processing',
+                       OutboxEvent.locked_at < now - timedelta(seconds=self.lease_seconds))
+        due = select(OutboxEvent.id).where(or_(
+            and_(OutboxEvent.status == 'pending', OutboxEvent.available_at <= now),
+            expired
+        )).order_by(OutboxEvent.id).limit(self.batch_size)
+
+        # Idle polls stay read-only instead of opening a write transaction
+        if not db.session.query(due.exists()).scalar():
+            db.session.rollback()
+            return []
+
+        # A lease that keeps expiring means the batch takes its worker down with
+        # it, so _retry_later never runs; give up once it has had every attempt
+        dead = db.session.execute(
+            update(OutboxEvent)
+            .where(expired, OutboxEvent.attempts >= self.max_attempts)
+            .values(status='failed', locked_by=None, locked_at=None,
+                    last_error=f'lease expired on all {self.max_attempts} attempts')
+            .execution_options(synchronize_session=False)
+        )
+        self.failed += dead.rowcount
+
+        db.session.execute(
+            update(OutboxEvent)
+            .where(OutboxEvent.id.in_(due.scalar_subquery()))
+            .values(status='processing', locked_by=token, locked_at=now,
+                    attempts=OutboxEvent.attempts + 1)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        return OutboxEvent.query.filter_by(locked_by=token, status='processing').order_by(OutboxEvent.id).all()
+
+    def run_once(self):
+        """Claim and process one batch; returns the number of events claimed"""
+        events = self.claim()
+        by_kind = {}
+        for outbox_event in events:
+            by_kind.setdefault(outbox_event.kind, []).append(outbox_event)
+
+        for kind, batch in by_kind.items():
+            ids = [outbox_event.id for outbox_event in batch]
+            payloads = [json.loads(outbox_event.payload) for outbox_event in batch]
+            try:
+                self._handle(kind, ids, payloads)
+            except Exception as e:
+                db.session.rollback()
+                if len(batch) == 1:
+                    logger.error(f"Outbox {kind} event {ids[0]} failed: {e}")
+                    self._retry_later(ids, str(e))
+                    continue
+                # Find the culprit: only events that fail on their own use up attempts
+                logger.warning(f"Outbox batch of {len(batch)} {kind} events failed ({e}); retrying one by one")
+                for event_id, payload in zip(ids, payloads):
+                    try:
+                        self._handle(kind, [event_id], [payload])
+                    except Exception as event_error:
+                        db.session.rollback()
+                        logger.error(f"Outbox {kind} event {event_id} failed: {event_error}")
+                        self._retry_later([event_id], str(event_error))
+        return len(events)
+
+    def _handle(self, kind, ids, payloads):
+        """Run the handler and delete its events in one commit"""
+        HANDLERS[kind](payloads)
+        OutboxEvent.query.filter(OutboxEvent.id.in_(ids)).delete(synchronize_session=False)
+        db.session.commit()
+        self.processed += len(ids)
+
+    def _retry_later(self, ids, error):
+        now = datetime.utcnow()
+        for outbox_event in OutboxEvent.query.filter(OutboxEvent.id.in_(ids)).all():
+            outbox_event.last_error = error
+            outbox_event.locked_by = None
+            outbox_event.locked_at = None
+            if outbox_event.attempts >= self.max_attempts:
+                outbox_event.status = 'failed'
+                self.failed += 1
+            else:
+                outbox_event.status = 'pending'
+                outbox_event.available_at = now + timedelta(seconds=2 ** outbox_event.attempts)
+        db.session.commit()
+
+    def stats(self):
+        counts = dict(db.session.query(OutboxEvent.status, db.func.count()).group_by(OutboxEvent.status).all())
+        return {
+            'threads': len(self._threads),
+            'processed': self.processed,
+            'failed': self.failed,
+            'pending': counts.get('pending', 0),
+            'processing': counts.get('processing', 0),
+            'dead': counts.get('failed', 0)
+        }
+
+_workers = []
+
+@event.listens_for(Session, 'after_commit')
+def _wake_workers(session):
+    if session.info.pop(WAKE_KEY, None):
+        for worker in _workers:
+            worker.wake()
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_enqueued(session):
+    session.info.pop(WAKE_KEY, None)
+
+def start_worker(app):
+    """Start the in-process worker pool configured by OUTBOX_* settings"""
+    worker = OutboxWorker(
+        app,
+        threads=int(app.config['OUTBOX_WORKERS']),
+        batch_size=int(app.config['OUTBOX_BATCH_SIZE']),
+        poll_interval=float(app.config['OUTBOX_POLL_INTERVAL']),
+        max_attempts=int(app.config['OUTBOX_MAX_ATTEMPTS']),
+        lease_seconds=int(app.config['OUTBOX_LEASE_SECONDS'])
+    )
+    _workers.append(worker)
+    return worker.start()
@@ -1,69 +1,382 @@
 import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+
 import joblib
+import numpy as np
+from sqlalchemy import insert
 from models import db, Prediction
+from forest import FlatForest, MANIFEST, flat_path
+from versions import bump_version
+from utils.memory import process_memory
+
+logger = logging.getLogger(__name__)
+
+MODEL_PATH = os.path.join(os.path.dirname(__file__), 'models', 'ai_model.pkl')
+
+# Inputs accepted by /api/predict, in the order the original model was called with
+SERVING_FEATURES = ('ph', 'turbidity', 'bacterial_count', 'temperature')
+
+LoadedModel = namedtuple('LoadedModel', [
+    'model', 'features', 'classes', 'fingerprint', 'sha256',
+    'load_seconds', 'loaded_at', 'compatible', 'error', 'evaluator'
+])
+
+# Matrices up to this many rows are scored by the flattened evaluator; larger
+# batches go to sklearn, whose compiled per-tree loops win at that size
+FLAT_MAX_ROWS = 256
+
+def metadata_path(model_path):
+    """Path of the JSON sidecar holding the feature schema for a model artifact"""
+    return os.path.splitext(model_path)[0] + '.meta.json'
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _fingerprint(path):
+    """(mtime, size) of the artifact, its export manifest and its schema sidecar.
+
+    train_model.py writes the pickle first and the other two after it, so a
+    load that lands in between is redone once they appear.
+    """
+    parts = []
+    for part in (path, os.path.join(flat_path(path), MANIFEST), metadata_path(path)):
+        try:
+            st = os.stat(part)
+        except FileNotFoundError:
+            parts.append(None)
+            continue
+        parts.append((st.st_mtime_ns, st.st_size))
+    return tuple(parts)
+
+def _usable(loaded):
+    return loaded.model is not None or loaded.evaluator is not None
+
+class ModelRegistry:
+    """Keeps the trained model resident and swaps it when the artifact changes.
+
+    Readers never take the lock: the current model is a single immutable
+    LoadedModel reference that is replaced in one assignment after a reload.
+    """
+
+    def __init__(self, path=MODEL_PATH, check_interval=2.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._current = None
+        self._lock = threading.Lock()
+        self._last_check = 0.0
+        self._stats_lock = threading.Lock()
+        self._calls = 0
+        self._rows = 0
+        self._failures = 0
+        self._inference_seconds = 0.0
+        self._last_inference_seconds = 0.0
+        self._reloads = 0
+
+    def load(self, force=False):
+        """Load the artifact if it is new or changed; returns the current model"""
+        with self._lock:
+            self._last_check = time.monotonic()
+            if not os.path.exists(self.path):
+                self._current = None
+                return None
+
+            fingerprint = _fingerprint(self.path)
+            current = self._current
+            if not force and current is not None and current.fingerprint == fingerprint:
+                return current
+
+            sha256 = _file_sha256(self.path)
+            if (not force and current is not None and current.sha256 == sha256
+                    and current.fingerprint[1:] == fingerprint[1:]):
+                # Touched but not rewritten; keep the resident copy
+                self._current = current._replace(fingerprint=fingerprint)
+                return self._current
+
+            loaded = self._load_flat(fingerprint, sha256) or self._load_artifact(fingerprint, sha256)
+            if not _usable(loaded) and current is not None and _usable(current):
+                # Likely a half-written file; keep serving the old model and retry later
+                return current
+            self._current = loaded
+            self._reloads += 1
+            return self._current
+
+    def _load_flat(self, fingerprint, sha256):
+        """Map the flattened export of the artifact instead of unpickling it.
+
+        Returns None (fall back to joblib) when there is no export, it was
+        built from a different pickle, or it does not fit the serving schema.
+        """
+        directory = flat_path(self.path)
+        if not os.path.exists(os.path.join(directory, MANIFEST)):
+            return None
+        start = time.perf_counter()
+        try:
+            evaluator, manifest = FlatForest.load(directory)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable model export {directory}: {e}")
+            return None
+        if manifest.get('source_sha256') != sha256:
+            logger.warning(f"Ignoring stale model export {directory}; re-run forest.py {self.path}")
+            return None
+
+        features, error = self._resolve_schema(manifest.get('features'), evaluator.n_features)
+        if error is not None:
+            return None
+
+        load_seconds = time.perf_counter() - start
+        logger.info(f"Mapped model {directory} in {load_seconds * 1000:.1f} ms "
+                    f"({evaluator.n_trees} trees, {evaluator.n_nodes} nodes; "
+                    f"features: {', '.join(features)})")
+        return LoadedModel(None, tuple(features), tuple(manifest['classes']), fingerprint, sha256,
+                           load_seconds, time.time(), True, None, evaluator)
+
+    def _load_artifact(self, fingerprint, sha256):
+        start = time.perf_counter()
+        try:
+            model = joblib.load(self.path)
+        except Exception as e:
+            logger.error(f"Failed to load model {self.path}: {e}")
+            return LoadedModel(None, (), (), fingerprint, sha256,
+                               time.perf_counter() - start, time.time(), False, str(e), None)
+
+        fitted = getattr(model, 'feature_names_in_', None)
+        features, error = self._resolve_schema(
+            [str(f) for f in fitted] if fitted is not None else None,
+            getattr(model, 'n_features_in_', None)
+        )
+        if features is not None and hasattr(model, 'feature_names_in_'):
+            # Names are checked here once; sklearn would otherwise warn on every
+            # ndarray call because the forest was fitted on a DataFrame.
+            del model.feature_names_in_
+
+        evaluator = None
+        if error is None:
+            try:
+                evaluator = FlatForest.from_estimator(model)
+            except TypeError as e:
+                logger.info(f"Serving {self.path} through sklearn only: {e}")
+
+        load_seconds = time.perf_counter() - start
+        compatible = error is None
+        if compatible:
+            logger.info(f"Loaded model {self.path} in {load_seconds * 1000:.1f} ms "
+                        f"(features: {', '.join(features)})")
+        else:
+            logger.warning(f"Model {self.path} not used for serving: {error}")
+
+        classes = tuple(str(c) for c in getattr(model, 'classes_', ()))
+        return LoadedModel(model, tuple(features or ()), classes, fingerprint, sha256,
+                           load_seconds, time.time(), compatible, error, evaluator)
+
+    def _resolve_schema(self, fitted, n_features):
+        """Return (features, error) after checking the sidecar schema against the model"""
+        schema_file = metadata_path(self.path)
+        features = None
+        if os.path.exists(schema_file):
+            with open(schema_file) as f:
+                features = json.load(f).get('features')
+            if fitted is not None and list(features) != fitted:
+                return features, f"schema features {features} do not match fitted features {fitted}"
+        elif fitted is not None:
+            features = fitted
+        elif n_features == len(SERVING_FEATURES):
+            features = list(SERVING_FEATURES)
+        else:
+            return None, "no feature schema found next to the model"
+
+        missing = [f for f in features if f not in SERVING_FEATURES]
+        if missing:
+            return features, f"model expects features not provided at serving time: {missing}"
+        return features, None
+
+    def get(self):
+        """Return the resident model, reloading if the artifact changed on disk"""
+        if time.monotonic() - self._last_check >= self.check_interval:
+            try:
+                self.load()
+            except OSError as e:
+                logger.error(f"Model reload check failed: {e}")
+        return self._current
+
+    def warm_up(self):
+        """Load the model and run one inference so the first request pays nothing"""
+        loaded = self.load()
+        if loaded is not None and loaded.compatible:
+            self.predict({name: 0.0 for name in SERVING_FEATURES}, record=False)
+            memory = process_memory(os.path.abspath(flat_path(self.path)))
+            if memory is not None:
+                logger.info(f"Worker {os.getpid()} memory: rss {memory['rss_mb']} MiB "
+                            f"(shared {memory['shared_mb']}, private {memory['private_mb']}); "
+                            f"mapped model {memory['mapped']['rss_mb']} MiB resident, "
+                            f"{memory['mapped']['shared_mb']} MiB shared")
+        return loaded
+
+    def predict(self, inputs, record=True):
+        """Return (label, probability) or None when no usable model is loaded"""
+        matrix = np.array([[inputs[name] for name in SERVING_FEATURES]], dtype=np.float64)
+        result = self.predict_matrix(matrix, record=record)
+        if result is None:
+            return None
+        labels, scores = result
+        return str(labels[0]), float(scores[0])
+
+    def predict_matrix(self, matrix, record=True):
+        """Score an (n, len(SERVING_FEATURES)) matrix with a single predict_proba call.
+
+        Small matrices use the flattened evaluator (forest.FlatForest) instead
+        of sklearn when the model could be flattened; a memory-mapped export
+        has no sklearn model and scores everything that way.
+
+        Labels are taken from the argmax of the same probabilities, so there is
+        no second predict pass. Returns (labels, scores) or None.
+        """
+        loaded = self.get()
+        if loaded is None or not loaded.compatible:
+            return None
+
+        start = time.perf_counter()
+        try:
+            columns = [SERVING_FEATURES.index(name) for name in loaded.features]
+            rows = matrix[:, columns]
+            if loaded.evaluator is not None and (loaded.model is None or len(rows) <= FLAT_MAX_ROWS):
+                proba = loaded.evaluator.predict_proba(rows)
+            else:
+                proba = loaded.model.predict_proba(rows)
+        except Exception as e:
+            logger.error(f"ML prediction failed: {e}")
+            with self._stats_lock:
+                self._failures += 1
+            return None
+        elapsed = time.perf_counter() - start
+
+        if record:
+            with self._stats_lock:
+                self._calls += 1
+                self._rows += len(matrix)
+                self._inference_seconds += elapsed
+                self._last_inference_seconds = elapsed
+
+        best = proba.argmax(axis=1)
+        labels = np.asarray(loaded.classes, dtype=object)[best]
+        scores = proba[np.arange(len(best)), best]
+        return labels, scores
+
+    def stats(self):
+        """Load and inference timings for the health endpoint"""
+        loaded = self._current
+        with self._stats_lock:
+            calls = self._calls
+            return {
+                'path': self.path,
+                'loaded': loaded is not None and _usable(loaded),
+                'mmap': bool(loaded and loaded.model is None and loaded.evaluator is not None),
+                'compatible': bool(loaded and loaded.compatible),
+                'error': loaded.error if loaded else None,
+                'features': list(loaded.features) if loaded else [],
+                'flat_nodes': loaded.evaluator.n_nodes if loaded and loaded.evaluator else None,
+                'sha256': loaded.sha256 if loaded else None,
+                'load_ms': round(loaded.load_seconds * 1000, 3) if loaded else None,
+                'reloads': self._reloads,
+                'inference_calls': calls,
+                'inference_rows': self._rows,
+                'inference_failures': self._failures,
+                'inference_seconds': self._inference_seconds,
+                'last_inference_ms': round(self._last_inference_seconds * 1000, 3),
+                'avg_inference_ms': round(self._inference_seconds / calls * 1000, 3) if calls else 0.0
+            }
+
+registry = ModelRegistry()
+
+# Score contributions shared by rule_predict and rule_predict_batch:
+# (feature, bin edges, points per bin, right). Edges follow np.digitize, where
+# right=True keeps a value equal to an edge in the lower bin ("x > edge" checks)
+# and right=False moves it to the upper bin ("x < edge" checks).
+RULE_BANDS = (
+    ('ph', (6.0, 6.5), (30, 15, 0), False),              # acidic (ideal: 6.5-8.5)
+    ('ph', (8.5, 9.0), (0, 15, 30), True),               # alkaline
+    ('turbidity', (1, 2, 5), (0, 5, 15, 25), True),      # ideal: <1 NTU
+    ('temperature', (30, 35), (0, 10, 20), True),
+    ('bacterial_count', (10, 100, 1000), (0, 5, 15, 25), True),
+)
+
+# Normalized score cut-offs (score >= edge moves up a level) and their labels
+RISK_EDGES = (0.4, 0.7)
+RISK_LABELS = ('Low', 'Medium', 'High')
 
 def rule_predict(ph, turbidity, bacterial_count, temperature):
     """Rule-based prediction logic"""
-    score = 0
-    
-    # pH risk (ideal: 6.5-8.5)
-    if ph < 6.0 or ph > 9.0:
-        score += 30
-    elif ph < 6.5 or ph > 8.5:
-        score += 15
+    values = {
+        'ph': ph,
+        'turbidity': turbidity,
+        'bacterial_count': bacterial_count,
+        'temperature': temperature
+    }
     
-    # Turbidity risk (ideal: <1 NTU)
-    if turbidity > 5:
-        score += 25
-    elif turbidity > 2:
-        score += 15
-    elif turbidity > 1:
-        score += 5
-    
-    # Temperature risk
-    if temperature > 35:
-        score += 20
-    elif temperature > 30:
-        score += 10
-    
-    # Bacterial count risk
-    if bacterial_count > 1000:
-        score += 25
-    elif bacterial_count > 100:
-        score += 15
-    elif bacterial_count > 10:
-        score += 5
+    score = 0
+    for feature, edges, points, right in RULE_BANDS:
+        value = values[feature]
+        if value != value:  # NaN fails every comparison, so it scores nothing
+            continue
+        band = bisect_left(edges, value) if right else bisect_right(edges, value)
+        score += points[band]
     
     # Normalize score to 0-1 range
     normalized_score = min(score / 100.0, 1.0)
     
-    # Determine risk category
-    if normalized_score >= 0.7:
-        risk = "High"
-    elif normalized_score >= 0.4:
-        risk = "Medium"
-    else:
-        risk = "Low"
+    return RISK_LABELS[bisect_right(RISK_EDGES, normalized_score)], normalized_score
+
+def rule_predict_batch(ph, turbidity, bacterial_count, temperature):
+    """Vectorized rule_predict over equal-length arrays; returns (risks, scores) arrays"""
+    values = {
+        'ph': np.asarray(ph, dtype=np.float64),
+        'turbidity': np.asarray(turbidity, dtype=np.float64),
+        'bacterial_count': np.asarray(bacterial_count, dtype=np.float64),
+        'temperature': np.asarray(temperature, dtype=np.float64)
+    }
+    
+    score = np.zeros(values['ph'].shape, dtype=np.int64)
+    for feature, edges, points, right in RULE_BANDS:
+        value = values[feature]
+        band = np.digitize(value, edges, right=right)
+        band_points = np.asarray(points, dtype=np.int64)[band]
+        score += np.where(np.isnan(value), 0, band_points)
+    
+    normalized_score = np.minimum(score / 100.0, 1.0)
+    risks = np.asarray(RISK_LABELS, dtype=object)[np.digitize(normalized_score, RISK_EDGES)]
     
-    return risk, normalized_score
+    return risks, normalized_score
 
 def ml_predict(ph, turbidity, bacterial_count, temperature):
-    """ML-based prediction if model exists"""
-    model_path = os.path.join(os.path.dirname(__file__), 'models', 'ai_model.pkl')
-    
-    if os.path.exists(model_path):
-        try:
-            model = joblib.load(model_path)
-            features = [[ph, turbidity, bacterial_count, temperature]]
-            prediction = model.predict(features)[0]
-            probability = model.predict_proba(features)[0].max()
-            
-            return prediction, probability
-        except Exception as e:
-            print(f"ML prediction failed: {e}")
-            return rule_predict(ph, turbidity, bacterial_count, temperature)
-    else:
+    """ML-based prediction if a compatible model is loaded"""
+    result = registry.predict({
+        'ph': ph,
+        'turbidity': turbidity,
+        'bacterial_count': bacterial_count,
+        'temperature': temperature
+    })
+    if result is None:
         return rule_predict(ph, turbidity, bacterial_count, temperature)
+    return result
+
+def ml_predict_batch(matrix):
+    """Predict risk for an (n, 4) matrix of ph, turbidity, bacterial_count, temperature"""
+    result = registry.predict_matrix(matrix)
+    if result is not None:
+        labels, scores = result
+        return [str(label) for label in labels], [float(score) for score in scores]
+
+    risks, scores = rule_predict_batch(*matrix.T)
+    return risks.tolist(), scores.tolist()
 
 def save_prediction(ph, turbidity, bacterial_count, temperature, location, risk, score):
     """Save prediction to database"""
@@ -78,6 +391,21 @@ def save_prediction(ph, turbidity, bacterial_count, temperature, location, risk,
     )
     
     db.session.add(prediction)
+    bump_version('predictions')
     db.session.commit()
     
-    return prediction.id
\ No newline at end of file
+    return prediction.id
+
+def save_predictions(records):
+    """Save many predictions with one bulk insert and a single commit"""
+    if not records:
+        return []
+
+    result = db.session.execute(
+        insert(Prediction).returning(Prediction.id, sort_by_parameter_order=True), records
+    )
+    ids = [row.id for row in result]
+    bump_version('predictions')
+    db.session.commit()
+
+    return ids
\ No newline at end of file
@@ -0,0 +1,110 @@
+import threading
+from bisect import bisect_left, bisect_right
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+class NotificationBus:
+    """In-process pub/sub for notifications created by this worker.
+
+    Keeps the most recent notifications in memory so waiting clients are
+    answered without a query. Subscribers block on a condition variable, so
+    idle long-poll and SSE clients cost no database work at all.
+    """
+
+    def __init__(self, history=1000):
+        self._cond = threading.Condition()
+        self._history = history
+        # Ordered by id; publishes from concurrent commits can arrive out of order
+        self._ids = []
+        self._recent = []
+        self._last_id = None
+
+    @property
+    def last_id(self):
+        return self._last_id
+
+    def prime(self, last_id):
+        """Record the highest id in the database (at startup, or found by polling).
+
+        Waiters wake if it moved; the ids it adds are not in the buffer, so they
+        are read from the database.
+        """
+        with self._cond:
+            if self._last_id is None or (last_id or 0) > self._last_id:
+                self._last_id = last_id or 0
+                self._cond.notify_all()
+
+    def publish(self, notifications):
+        """Make committed notifications visible and wake every waiting client.
+
+        Also fed with rows read back from the database, which fills the gaps
+        left by notifications this process did not publish itself.
+        """
+        if not notifications:
+            return
+        with self._cond:
+            for notification in notifications:
+                index = bisect_left(self._ids, notification['id'])
+                if index < len(self._ids) and self._ids[index] == notification['id']:
+                    continue
+                self._ids.insert(index, notification['id'])
+                self._recent.insert(index, notification)
+                self._last_id = max(self._last_id or 0, notification['id'])
+            excess = len(self._ids) - self._history
+            if excess > 0:
+                del self._ids[:excess]
+                del self._recent[:excess]
+            self._cond.notify_all()
+
+    def since(self, since_id, limit=None):
+        """Return (notifications newer than since_id, oldest first; complete).
+
+        complete is False when the buffer is missing any id between since_id
+        and the newest one known (it no longer reaches back that far, an
+        earlier commit has not been published yet, or the bus was never
+        primed) and the caller has to ask the database.
+        """
+        with self._cond:
+            return self._since(since_id, limit)
+
+    def _since(self, since_id, limit):
+        if self._last_id is None:
+            return [], False
+        if since_id >= self._last_id:
+            return [], True
+        wanted = self._last_id - since_id
+        if limit:
+            wanted = min(wanted, limit)
+        # Ids are unique and sorted, so the slice is gap-free when its last id is since_id + wanted
+        start = bisect_right(self._ids, since_id)
+        end = start + wanted
+        if end > len(self._ids) or self._ids[end - 1] != since_id + wanted:
+            return [], False
+        return self._recent[start:end], True
+
+    def wait(self, since_id, timeout, limit=None):
+        """Block until something newer than since_id is published or timeout expires"""
+        with self._cond:
+            self._cond.wait_for(
+                lambda: self._last_id is None or self._last_id > since_id, timeout
+            )
+            return self._since(since_id, limit)
+
+notification_bus = NotificationBus()
+
+PENDING_KEY = 'pending_notifications'
+
+def queue_for_publish(session, notifications):
+    """Publish notifications once the session's transaction commits"""
+    session.info.setdefault(PENDING_KEY, []).extend(notifications)
+
+@event.listens_for(Session, 'after_commit')
+def _publish_committed(session):
+    pending = session.info.pop(PENDING_KEY, None)
+    if pending:
+        notification_bus.publish(pending)
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_rolled_back(session):
+    session.info.pop(PENDING_KEY, None)
@@ -0,0 +1,222 @@
+from datetime import datetime
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from models import db, WaterSample, DiseaseAlert, RegionDailyWater, RegionDailyDisease
+from summary import CONTAMINATED_LEVELS
+from versions import bump_version
+
+# Sample measurements rolled up as sum/min/max per region-day
+MEASURES = ('ph', 'turbidity', 'bacterial_count')
+
+# /api/regions bucket → strftime format applied to the rollup day (None keeps days)
+BUCKETS = {'day': None, 'month': '%Y-%m', 'year': '%Y'}
+
+def _field(record, name):
+    return record[name] if isinstance(record, dict) else getattr(record, name)
+
+def _day(value):
+    return (value or datetime.utcnow()).date()
+
+def apply_water_rollups(samples):
+    """Fold new samples into the daily per-district rollups (caller commits).
+
+    Accepts WaterSample objects (flushed, so sample_date is set) or dicts;
+    one executemany upsert covers every region-day in the batch.
+    """
+    totals = {}
+    for sample in samples:
+        key = (_field(sample, 'state'), _field(sample, 'district'),
+               _day(_field(sample, 'sample_date')), _field(sample, 'contamination_level'))
+        row = totals.get(key)
+        if row is None:
+            row = totals[key] = dict(zip(('state', 'district', 'day', 'contamination_level'), key),
+                                     sample_count=0)
+            for measure in MEASURES:
+                row.update({f'{measure}_sum': 0.0, f'{measure}_min': float('inf'),
+                            f'{measure}_max': float('-inf')})
+        row['sample_count'] += 1
+        for measure in MEASURES:
+            value = _field(sample, measure)
+            row[f'{measure}_sum'] += value
+            row[f'{measure}_min'] = min(row[f'{measure}_min'], value)
+            row[f'{measure}_max'] = max(row[f'{measure}_max'], value)
+
+    if not totals:
+        return
+    stmt = sqlite_insert(RegionDailyWater)
+    set_ = {'sample_count': RegionDailyWater.sample_count + stmt.excluded.sample_count}
+    for measure in MEASURES:
+        current = {suffix: getattr(RegionDailyWater, f'{measure}_{suffix}') for suffix in ('sum', 'min', 'max')}
+        new = {suffix: getattr(stmt.excluded, f'{measure}_{suffix}') for suffix in ('sum', 'min', 'max')}
+        set_[f'{measure}_sum'] = current['sum'] + new['sum']
+        # SQLite's multi-argument min()/max() are scalar, not aggregates
+        set_[f'{measure}_min'] = func.min(current['min'], new['min'])
+        set_[f'{measure}_max'] = func.max(current['max'], new['max'])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[RegionDailyWater.state, RegionDailyWater.district,
+                        RegionDailyWater.day, RegionDailyWater.contamination_level],
+        set_=set_
+    )
+    db.session.execute(stmt, list(totals.values()))
+
+def apply_disease_rollups(alerts):
+    """Fold new disease alerts into the daily per-district rollups (caller commits)"""
+    totals = {}
+    for alert in alerts:
+        key = (_field(alert, 'state'), _field(alert, 'district'),
+               _day(_field(alert, 'reported_at')), _field(alert, 'disease'))
+        row = totals.setdefault(key, dict(zip(('state', 'district', 'day', 'disease'), key),
+                                          alert_count=0, case_sum=0))
+        row['alert_count'] += 1
+        row['case_sum'] += _field(alert, 'cases')
+
+    if not totals:
+        return
+    stmt = sqlite_insert(RegionDailyDisease)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[RegionDailyDisease.state, RegionDailyDisease.district,
+                        RegionDailyDisease.day, RegionDailyDisease.disease],
+        set_={
+            'alert_count': RegionDailyDisease.alert_count + stmt.excluded.alert_count,
+            'case_sum': RegionDailyDisease.case_sum + stmt.excluded.case_sum
+        }
+    )
+    db.session.execute(stmt, list(totals.values()))
+
+def _period(model, bucket):
+    fmt = BUCKETS[bucket]
+    return model.day if fmt is None else func.strftime(fmt, model.day)
+
+def _filtered(query, model, state=None, district=None, start=None, end=None):
+    if state:
+        query = query.where(model.state == state)
+    if district:
+        query = query.where(model.district == district)
+    if start:
+        query = query.where(model.day >= start)
+    if end:
+        query = query.where(model.day <= end)
+    return query
+
+def region_trends(state=None, district=None, start=None, end=None, bucket='month'):
+    """Per-district series of water quality and disease figures, one entry per bucket"""
+    regions = {}
+
+    def entry(state, district, period):
+        periods = regions.setdefault((state, district), {})
+        period = str(period)
+        if period not in periods:
+            periods[period] = {
+                'period': period,
+                'sample_count': 0,
+                'contamination_levels': {},
+                'alert_count': 0,
+                'cases': 0,
+                'cases_by_disease': {},
+                **{measure: None for measure in MEASURES}
+            }
+        return periods[period]
+
+    period = _period(RegionDailyWater, bucket).label('period')
+    water = select(
+        RegionDailyWater.state, RegionDailyWater.district, period,
+        RegionDailyWater.contamination_level,
+        func.sum(RegionDailyWater.sample_count).label('sample_count'),
+        *[aggregate(getattr(RegionDailyWater, f'{measure}_{suffix}')).label(f'{measure}_{suffix}')
+          for measure in MEASURES
+          for suffix, aggregate in (('sum', func.sum), ('min', func.min), ('max', func.max))]
+    ).group_by(RegionDailyWater.state, RegionDailyWater.district, period,
+               RegionDailyWater.contamination_level)
+    for row in db.session.execute(_filtered(water, RegionDailyWater, state, district, start, end)):
+        item = entry(row.state, row.district, row.period)
+        item['sample_count'] += row.sample_count
+        item['contamination_levels'][row.contamination_level] = row.sample_count
+        for measure in MEASURES:
+            low, high, total = (getattr(row, f'{measure}_{suffix}') for suffix in ('min', 'max', 'sum'))
+            stats = item[measure]
+            if stats is None:
+                item[measure] = {'min': low, 'max': high, 'sum': total}
+            else:
+                stats.update(min=min(stats['min'], low), max=max(stats['max'], high),
+                             sum=stats['sum'] + total)
+
+    period = _period(RegionDailyDisease, bucket).label('period')
+    disease = select(
+        RegionDailyDisease.state, RegionDailyDisease.district, period, RegionDailyDisease.disease,
+        func.sum(RegionDailyDisease.alert_count).label('alert_count'),
+        func.sum(RegionDailyDisease.case_sum).label('case_sum')
+    ).group_by(RegionDailyDisease.state, RegionDailyDisease.district, period,
+               RegionDailyDisease.disease)
+    for row in db.session.execute(_filtered(disease, RegionDailyDisease, state, district, start, end)):
+        item = entry(row.state, row.district, row.period)
+        item['alert_count'] += row.alert_count
+        item['cases'] += row.case_sum
+        item['cases_by_disease'][row.disease] = row.case_sum
+
+    result = []
+    for (state, district), periods in sorted(regions.items()):
+        series = [periods[key] for key in sorted(periods)]
+        for item in series:
+            count = item['sample_count']
+            contaminated = sum(item['contamination_levels'].get(level, 0) for level in CONTAMINATED_LEVELS)
+            item['contamination_index'] = round(contaminated / count * 100, 1) if count else None
+            for measure in MEASURES:
+                stats = item[measure]
+                if stats is not None:
+                    item[measure] = {
+                        'mean': round(stats['sum'] / count, 2),
+                        'min': stats['min'],
+                        'max': stats['max']
+                    }
+        result.append({'state': state, 'district': district, 'series': series})
+    return result
+
+def rebuild_rollups():
+    """Recompute both rollup tables from history (recovery / after bulk loads)"""
+    db.session.query(RegionDailyWater).delete()
+    db.session.query(RegionDailyDisease).delete()
+
+    water_day = func.date(WaterSample.sample_date)
+    aggregates = [func.count()]
+    for measure in MEASURES:
+        column = getattr(WaterSample, measure)
+        aggregates += [func.sum(column), func.min(column), func.max(column)]
+    db.session.execute(
+        insert(RegionDailyWater).from_select(
+            ['state', 'district', 'day', 'contamination_level', 'sample_count'] +
+            [f'{measure}_{suffix}' for measure in MEASURES for suffix in ('sum', 'min', 'max')],
+            select(WaterSample.state, WaterSample.district, water_day,
+                   WaterSample.contamination_level, *aggregates)
+            .group_by(WaterSample.state, WaterSample.district, water_day,
+                      WaterSample.contamination_level)
+        )
+    )
+
+    alert_day = func.date(DiseaseAlert.reported_at)
+    db.session.execute(
+        insert(RegionDailyDisease).from_select(
+            ['state', 'district', 'day', 'disease', 'alert_count', 'case_sum'],
+            select(DiseaseAlert.state, DiseaseAlert.district, alert_day, DiseaseAlert.disease,
+                   func.count(), func.sum(DiseaseAlert.cases))
+            .group_by(DiseaseAlert.state, DiseaseAlert.district, alert_day, DiseaseAlert.disease)
+        )
+    )
+    # Invalidate cached /api/regions responses
+    bump_version('water_samples', 'disease_alerts')
+    db.session.commit()
+
+def ensure_rollups():
+    """Build the rollups for databases created before they existed"""
+    if (db.session.query(RegionDailyWater.state).first() is None and
+            db.session.query(RegionDailyDisease.state).first() is None and
+            (WaterSample.query.first() is not None or DiseaseAlert.query.first() is not None)):
+        rebuild_rollups()
+        print("Regional rollups rebuilt from existing samples and alerts")
+
+if __name__ == '__main__':
+    from app import app
+    with app.app_context():
+        rebuild_rollups()
+        print(f"{db.session.query(RegionDailyWater).count()} water and "
+              f"{db.session.query(RegionDailyDisease).count()} disease region-days")
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Drain the transactional outbox in its own process.
+
+Start the web app with FLASK_OUTBOX_WORKERS=0 so it only enqueues, then:
+    python run_outbox_worker.py --threads 2
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+
+# Add the backend directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Drain the outbox in a separate process')
+    parser.add_argument('--threads', type=int, default=2)
+    args = parser.parse_args()
+
+    # Keep the imported app from starting its own in-process workers
+    os.environ['FLASK_OUTBOX_WORKERS'] = '0'
+    logging.basicConfig(level=logging.INFO)
+
+    from app import app
+    from outbox import start_worker
+
+    app.config['OUTBOX_WORKERS'] = args.threads
+    worker = start_worker(app)
+    print(f"Outbox worker running with {args.threads} threads (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        worker.stop()
@@ -0,0 +1,97 @@
+from sqlalchemy import func, insert, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from models import db, WaterSample, WaterSummary
+from versions import bump_version
+
+# Levels that count towards the contamination index
+CONTAMINATED_LEVELS = ('High Risk', 'Moderate')
+
+def apply_samples(samples):
+    """Add new samples to the running aggregates (caller commits).
+    
+    Accepts WaterSample objects or dicts with ph, turbidity and
+    contamination_level; one upsert is issued per level in the batch.
+    """
+    totals = {}
+    for sample in samples:
+        if isinstance(sample, dict):
+            level, ph, turbidity = sample['contamination_level'], sample['ph'], sample['turbidity']
+        else:
+            level, ph, turbidity = sample.contamination_level, sample.ph, sample.turbidity
+        count, ph_sum, turbidity_sum = totals.get(level, (0, 0.0, 0.0))
+        totals[level] = (count + 1, ph_sum + ph, turbidity_sum + turbidity)
+    
+    for level, (count, ph_sum, turbidity_sum) in totals.items():
+        stmt = sqlite_insert(WaterSummary).values(
+            contamination_level=level,
+            sample_count=count,
+            ph_sum=ph_sum,
+            turbidity_sum=turbidity_sum
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[WaterSummary.contamination_level],
+            set_={
+                'sample_count': WaterSummary.sample_count + stmt.excluded.sample_count,
+                'ph_sum': WaterSummary.ph_sum + stmt.excluded.ph_sum,
+                'turbidity_sum': WaterSummary.turbidity_sum + stmt.excluded.turbidity_sum
+            }
+        )
+        db.session.execute(stmt)
+
+def get_summary_stats():
+    """Summary statistics computed from the aggregates, independent of table size"""
+    sample_count = 0
+    ph_sum = turbidity_sum = 0.0
+    contaminated = 0
+    
+    for row in WaterSummary.query.all():
+        sample_count += row.sample_count
+        ph_sum += row.ph_sum
+        turbidity_sum += row.turbidity_sum
+        if row.contamination_level in CONTAMINATED_LEVELS:
+            contaminated += row.sample_count
+    
+    if sample_count == 0:
+        return {
+            'avg_ph': 0,
+            'avg_turbidity': 0,
+            'contamination_index': 0,
+            'sample_count': 0
+        }
+    
+    return {
+        'avg_ph': round(ph_sum / sample_count, 2),
+        'avg_turbidity': round(turbidity_sum / sample_count, 2),
+        'contamination_index': round(contaminated / sample_count * 100, 1),
+        'sample_count': sample_count
+    }
+
+def rebuild_summary():
+    """Recompute the aggregates from water_samples (recovery / after bulk loads)"""
+    db.session.query(WaterSummary).delete()
+    db.session.execute(
+        insert(WaterSummary).from_select(
+            ['contamination_level', 'sample_count', 'ph_sum', 'turbidity_sum'],
+            select(
+                WaterSample.contamination_level,
+                func.count(),
+                func.sum(WaterSample.ph),
+                func.sum(WaterSample.turbidity)
+            ).group_by(WaterSample.contamination_level)
+        )
+    )
+    # Invalidate cached /api/summary responses
+    bump_version('water_samples')
+    db.session.commit()
+
+def ensure_summary():
+    """Build the aggregates for databases created before they existed"""
+    if WaterSummary.query.first() is None and WaterSample.query.first() is not None:
+        rebuild_summary()
+        print("Water summary rebuilt from existing samples")
+
+if __name__ == '__main__':
+    from app import app
+    with app.app_context():
+        rebuild_summary()
+        print(get_summary_stats())
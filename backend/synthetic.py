@@ -0,0 +1,333 @@
+"""
+Synthetic water samples, disease alerts and predictions at production scale.
+
+The station list and parameter distributions are fitted from datasets/.
+Every monitoring location in indian_water.csv becomes a station whose
+temperature, pH and coliform ranges set its own mean, seasonal swing and
+spread. water_pollution.csv supplies the turbidity and disease case-rate
+distributions the Indian export lacks. Readings follow an annual cycle, a
+monsoon bump and a slowly drifting AR(1) term per station, so each
+location's series looks like monitoring data rather than white noise.
+
+Rows are generated with NumPy a chunk at a time, in time order, written
+with executemany, and the summary, rollups and facet index are rebuilt once
+at the end. Run from the backend folder:
+    python synthetic.py --samples 10000000 --alerts 200000 --predictions 1000000
+"""
+
+import os
+import time
+import argparse
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from models import db, WaterSample, DiseaseAlert, Prediction
+from ingest import CONTAMINATION_BY_RISK
+from prediction import ml_predict_batch, rule_predict_batch
+from versions import bump_version
+
+DATASETS_DIR = os.path.join(os.path.dirname(__file__), 'datasets')
+INDIAN_WATER = os.path.join(DATASETS_DIR, 'indian_water.csv')
+WATER_POLLUTION = os.path.join(DATASETS_DIR, 'water_pollution.csv')
+
+# Placeholders seen in monitoring exports ("BDL" = below detection limit)
+NA_VALUES = ['BDL', 'ND', 'NA', 'N/A', '-', '--']
+
+# water_pollution.csv case-rate columns (per 100,000 people) → alert disease
+DISEASE_COLUMNS = {
+    'Diarrheal Cases per 100,000 people': 'Diarrhoea',
+    'Typhoid Cases per 100,000 people': 'Typhoid',
+    'Cholera Cases per 100,000 people': 'Cholera',
+}
+
+# People served per alerting location; turns case rates into case counts
+CATCHMENT = 20_000
+
+# Seasonality: temperatures peak before the monsoon, turbidity, bacteria and
+# waterborne disease with it (days of the year; width in days)
+TEMPERATURE_PEAK_DAY = 140
+MONSOON_PEAK_DAY, MONSOON_WIDTH = 213, 45
+
+# Day-to-day persistence of each station's drift, and its size in standard deviations
+AR_COEFFICIENT = 0.97
+DRIFT_SCALE = 0.5
+
+DEFAULT_CHUNK_SIZE = 100_000
+
+Stations = namedtuple('Stations', [
+    'location', 'state', 'district',
+    'temperature_mean', 'temperature_swing',
+    'ph_mean', 'ph_sd',
+    'turbidity_log_mean', 'turbidity_log_sd',
+    'bacteria_log_mean', 'bacteria_log_sd',
+])
+
+# Disease name, share of alerts and lognormal fit of its case rate
+DiseaseFit = namedtuple('DiseaseFit', ['names', 'shares', 'log_mean', 'log_sd'])
+
+def _district(location, state):
+    """Best guess at a district: the last comma-separated part of a station name"""
+    parts = [part.strip() for part in location.split(',')]
+    candidate = parts[-1].split('(')[0].strip() if len(parts) > 1 else ''
+    if not candidate or len(candidate.split()) > 3 or any(ch.isdigit() for ch in candidate):
+        return state
+    return candidate.title()
+
+def _log_fit(values):
+    values = np.asarray(values, dtype=np.float64)
+    logs = np.log(values[np.isfinite(values) & (values > 0)])
+    return float(logs.mean()), float(logs.std())
+
+def _range(frame, low, high, default_mean, default_spread):
+    """(mid-point, half-width) of a min/max column pair, gaps filled with defaults"""
+    lo = frame[low].fillna(frame[high])
+    hi = frame[high].fillna(frame[low])
+    mid = ((lo + hi) / 2).fillna(default_mean).to_numpy()
+    half = ((hi - lo).abs() / 2).fillna(default_spread).to_numpy()
+    return mid, half
+
+def fit_stations(indian_path=INDIAN_WATER, pollution_path=WATER_POLLUTION):
+    """Fit per-station parameters and disease case-rate distributions from the datasets"""
+    frame = pd.read_csv(indian_path, na_values=NA_VALUES)
+    frame['Monitoring Location'] = frame['Monitoring Location'].str.strip()
+    # Stations reported for several years are averaged into one
+    frame = frame.groupby(['Monitoring Location', 'State Name'], as_index=False).mean(numeric_only=True)
+
+    pollution = pd.read_csv(pollution_path)
+    india = pollution[pollution['Country'] == 'India']
+    reference = india if len(india) >= 30 else pollution
+
+    temperature_mean, temperature_swing = _range(frame, 'Temperature (C) - Min', 'Temperature (C) - Max',
+                                                 reference['Temperature (°C)'].mean(), 4.0)
+    ph_mean, ph_half = _range(frame, 'pH - Min', 'pH - Max', reference['pH Level'].mean(), 0.4)
+
+    bacteria = frame[['Total Coliform (MPN/100ml) - Min', 'Total Coliform (MPN/100ml) - Max']].copy()
+    for bound in ('Min', 'Max'):
+        bacteria[f'Total Coliform (MPN/100ml) - {bound}'] = bacteria[f'Total Coliform (MPN/100ml) - {bound}'] \
+            .fillna(frame[f'Fecal Coliform (MPN/100ml) - {bound}'])
+    bacteria = np.log(bacteria.clip(lower=1))
+    default_mean, default_sd = _log_fit(reference['Bacteria Count (CFU/mL)'])
+    bacteria_log_mean, bacteria_half = _range(bacteria, 'Total Coliform (MPN/100ml) - Min',
+                                              'Total Coliform (MPN/100ml) - Max', default_mean, default_sd)
+
+    # No turbidity in the Indian export: stations scatter around the reference fit
+    turbidity_mean, turbidity_sd = _log_fit(reference['Turbidity (NTU)'])
+    offsets = np.random.default_rng(len(frame)).standard_normal(len(frame))
+
+    locations = frame['Monitoring Location'].str.slice(0, 100).to_numpy(dtype=object)
+    states = frame['State Name'].str.title().to_numpy(dtype=object)
+    stations = Stations(
+        location=locations,
+        state=states,
+        district=np.array([_district(loc, state) for loc, state in zip(locations, states)], dtype=object),
+        temperature_mean=temperature_mean,
+        temperature_swing=temperature_swing,
+        ph_mean=ph_mean,
+        ph_sd=np.maximum(ph_half / 2, 0.05),
+        turbidity_log_mean=turbidity_mean + 0.5 * turbidity_sd * offsets,
+        turbidity_log_sd=np.full(len(frame), 0.5 * turbidity_sd),
+        bacteria_log_mean=bacteria_log_mean,
+        bacteria_log_sd=np.maximum(bacteria_half / 2, 0.1),
+    )
+
+    fits = [_log_fit(reference[column]) for column in DISEASE_COLUMNS]
+    rates = np.array([reference[column].mean() for column in DISEASE_COLUMNS])
+    diseases = DiseaseFit(
+        names=np.array(list(DISEASE_COLUMNS.values()), dtype=object),
+        shares=rates / rates.sum(),
+        log_mean=np.array([mean for mean, _ in fits]),
+        log_sd=np.array([sd for _, sd in fits]),
+    )
+    return stations, diseases
+
+def station_drift(rng, n_stations, n_days):
+    """AR(1) series per (station, day) with unit stationary variance"""
+    noise = rng.standard_normal((n_days, n_stations)) * np.sqrt(1 - AR_COEFFICIENT ** 2)
+    drift = np.empty_like(noise)
+    drift[0] = rng.standard_normal(n_stations)
+    for day in range(1, n_days):
+        drift[day] = AR_COEFFICIENT * drift[day - 1] + noise[day]
+    return drift.T
+
+def _times(rng, size, low, high, start, span_seconds):
+    """size sorted timestamps between fractions low and high of the span, with their day index"""
+    seconds = ((low + np.sort(rng.random(size)) * (high - low)) * span_seconds).astype(np.int64)
+    return start + seconds.astype('timedelta64[s]'), seconds // 86400
+
+def _day_of_year(timestamps):
+    return (timestamps - timestamps.astype('datetime64[Y]')).astype('timedelta64[D]').astype(np.int64)
+
+def _monsoon(day_of_year):
+    return np.exp(-((day_of_year - MONSOON_PEAK_DAY) / MONSOON_WIDTH) ** 2)
+
+def _readings(stations, rng, station, day, day_of_year, drift):
+    """ph / turbidity / bacterial_count / temperature arrays for the given stations and days"""
+    size = len(station)
+    wander = DRIFT_SCALE * drift[station, day]
+    monsoon = _monsoon(day_of_year)
+    season = np.cos(2 * np.pi * (day_of_year - TEMPERATURE_PEAK_DAY) / 365.25)
+
+    temperature = (stations.temperature_mean[station] + stations.temperature_swing[station] * season
+                   + wander + rng.standard_normal(size))
+    ph = stations.ph_mean[station] + stations.ph_sd[station] * (wander + rng.standard_normal(size))
+    turbidity = np.exp(stations.turbidity_log_mean[station] + 0.5 * monsoon
+                       + stations.turbidity_log_sd[station] * rng.standard_normal(size))
+    bacteria = np.exp(stations.bacteria_log_mean[station] + monsoon
+                      + stations.bacteria_log_sd[station] * (wander + rng.standard_normal(size)))
+    return {
+        'ph': np.clip(ph, 0, 14).round(2),
+        'turbidity': turbidity.round(2),
+        'bacterial_count': bacteria.round(),
+        'temperature': temperature.round(1),
+    }
+
+def water_sample_chunks(stations, rng, n, start, end, drift, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield dicts of column arrays for n samples between start and end, oldest first"""
+    start, span = np.datetime64(start, 's'), int((end - start).total_seconds())
+    for offset in range(0, n, chunk_size):
+        size = min(chunk_size, n - offset)
+        sample_date, day = _times(rng, size, offset / n, (offset + size) / n, start, span)
+        station = rng.integers(0, len(stations.location), size)
+        readings = _readings(stations, rng, station, day, _day_of_year(sample_date), drift)
+        risks, _ = rule_predict_batch(readings['ph'], readings['turbidity'],
+                                      readings['bacterial_count'], readings['temperature'])
+        yield {
+            'location': stations.location[station],
+            'state': stations.state[station],
+            'district': stations.district[station],
+            **readings,
+            'contamination_level': np.vectorize(CONTAMINATION_BY_RISK.get, otypes=[object])(risks),
+            'sample_date': sample_date,
+        }
+
+def disease_alert_chunks(stations, diseases, rng, n, start, end, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield dicts of column arrays for n alerts, concentrated in the monsoon and at dirtier stations"""
+    start, span = np.datetime64(start, 's'), int((end - start).total_seconds())
+    weight = stations.bacteria_log_mean - stations.bacteria_log_mean.min() + 1
+    weight = weight / weight.sum()
+    for offset in range(0, n, chunk_size):
+        size = min(chunk_size, n - offset)
+        # Thin uniform times by the monsoon curve, keeping the chunk's time slice
+        kept = np.empty(0, dtype='datetime64[s]')
+        while len(kept) < size:
+            candidates, _ = _times(rng, size * 3, offset / n, (offset + size) / n, start, span)
+            accept = rng.random(len(candidates)) < (0.4 + 0.6 * _monsoon(_day_of_year(candidates)))
+            kept = np.concatenate([kept, candidates[accept]])
+        reported_at = np.sort(rng.choice(kept, size, replace=False))
+
+        station = rng.choice(len(weight), size, p=weight)
+        disease = rng.choice(len(diseases.names), size, p=diseases.shares)
+        rate = np.exp(diseases.log_mean[disease] + diseases.log_sd[disease] * rng.standard_normal(size))
+        cases = np.maximum(1, np.round(rate * CATCHMENT / 100_000)).astype(np.int64)
+        yield {
+            'disease': diseases.names[disease],
+            'cases': cases,
+            'risk_level': np.select([cases > 100, cases > 50], ['High', 'Medium'], 'Low').astype(object),
+            'location': stations.location[station],
+            'state': stations.state[station],
+            'district': stations.district[station],
+            'reported_at': reported_at,
+        }
+
+def prediction_chunks(stations, rng, n, start, end, drift, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield dicts of column arrays for n scored predictions"""
+    start, span = np.datetime64(start, 's'), int((end - start).total_seconds())
+    for offset in range(0, n, chunk_size):
+        size = min(chunk_size, n - offset)
+        created_at, day = _times(rng, size, offset / n, (offset + size) / n, start, span)
+        station = rng.integers(0, len(stations.location), size)
+        readings = _readings(stations, rng, station, day, _day_of_year(created_at), drift)
+        matrix = np.column_stack([readings[name] for name in ('ph', 'turbidity', 'bacterial_count', 'temperature')])
+        risks, scores = ml_predict_batch(matrix)
+        yield {
+            **readings,
+            'location': stations.location[station],
+            'risk': np.asarray(risks, dtype=object),
+            'score': np.asarray(scores, dtype=np.float64),
+            'created_at': created_at,
+        }
+
+def _sqlite_datetimes(values):
+    # SQLAlchemy's SQLite DateTime storage format, so these sort with app-written rows
+    return np.char.replace(np.datetime_as_string(values.astype('datetime64[us]'), unit='us'), 'T', ' ')
+
+def insert_chunks(model, chunks):
+    """executemany each chunk into the model's table; returns (rows, seconds)"""
+    rows, started = 0, time.perf_counter()
+    for chunk in chunks:
+        columns = list(chunk)
+        values = [
+            (_sqlite_datetimes(array) if np.issubdtype(array.dtype, np.datetime64) else array).tolist()
+            for array in chunk.values()
+        ]
+        db.session.connection().exec_driver_sql(
+            f"INSERT INTO {model.__tablename__} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+            list(zip(*values))
+        )
+        db.session.commit()
+        rows += len(values[0])
+        elapsed = time.perf_counter() - started
+        print(f"  {model.__tablename__}: {rows:,} rows ({rows / elapsed:,.0f} rows/s)", end='\r', flush=True)
+    if rows:
+        print()
+    return rows, time.perf_counter() - started
+
+def populate(samples=0, alerts=0, predictions=0, seed=42, days=730, end=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Append synthetic rows and rebuild the derived tables; returns rows and rows/s per table"""
+    from facets import facet_index
+    from rollups import rebuild_rollups
+    from summary import rebuild_summary
+
+    end = end or datetime.utcnow().replace(microsecond=0)
+    start = end - timedelta(days=days)
+    stations, diseases = fit_stations()
+    drift_rng, sample_rng, alert_rng, prediction_rng = (
+        np.random.default_rng(child) for child in np.random.SeedSequence(seed).spawn(4)
+    )
+    drift = station_drift(drift_rng, len(stations.location), days + 1)
+
+    report = {}
+    for model, count, chunks in (
+        (WaterSample, samples,
+         lambda: water_sample_chunks(stations, sample_rng, samples, start, end, drift, chunk_size)),
+        (DiseaseAlert, alerts,
+         lambda: disease_alert_chunks(stations, diseases, alert_rng, alerts, start, end, chunk_size)),
+        (Prediction, predictions,
+         lambda: prediction_chunks(stations, prediction_rng, predictions, start, end, drift, chunk_size)),
+    ):
+        if count:
+            rows, seconds = insert_chunks(model, chunks())
+            report[model.__tablename__] = {'rows': rows, 'seconds': round(seconds, 1),
+                                           'rows_per_second': round(rows / seconds) if seconds else None}
+
+    if predictions:
+        bump_version('predictions')
+        db.session.commit()
+    started = time.perf_counter()
+    rebuild_summary()
+    rebuild_rollups()
+    facet_index.rebuild()
+    report['rebuild_seconds'] = round(time.perf_counter() - started, 1)
+    return report
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Append synthetic rows fitted from datasets/')
+    parser.add_argument('--samples', type=int, default=1_000_000)
+    parser.add_argument('--alerts', type=int, default=20_000)
+    parser.add_argument('--predictions', type=int, default=100_000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--days', type=int, default=730, help='history length ending now')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    from app import app
+    with app.app_context():
+        report = populate(args.samples, args.alerts, args.predictions, args.seed, args.days,
+                          chunk_size=args.chunk_size)
+    for table, stats in report.items():
+        if isinstance(stats, dict):
+            print(f"{table}: {stats['rows']:,} rows in {stats['seconds']}s ({stats['rows_per_second']:,} rows/s)")
+    print(f"Summary, rollups and facets rebuilt in {report['rebuild_seconds']}s")
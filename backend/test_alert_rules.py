@@ -0,0 +1,150 @@
+import json
+from datetime import datetime
+from itertools import product
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import outbox
+from app import app
+from models import db
+from notifications import (ALERT_RULES_PATH, AlertRuleSet, OPERATORS, alert_rules, compile_rule,
+                           create_notifications)
+
+SPEC = {
+    'name': 'acidic', 'source': 'water', 'field': 'ph', 'operator': '<', 'threshold': 6.0,
+    'title': 'Acidic water', 'message': 'pH {ph:.1f} at {location}'
+}
+
+def test_compile_rule_defaults():
+    rule = compile_rule(SPEC)
+    assert (rule.severity, rule.type) == ('info', 'water')
+    assert rule.compare is OPERATORS['<']
+
+@pytest.mark.parametrize('change, error', [
+    ({'operator': '=~'}, "unknown operator '=~'"),
+    ({'source': 'air'}, "unknown source 'air'"),
+    ({'field': 'salinity'}, "unknown field 'salinity'"),
+    ({'message': 'pH {salinity} at {location}'}, 'message refers to unknown field {salinity}'),
+    ({'title': 'Acidic {ph'}, 'malformed title'),
+    ({'operator': 'between', 'threshold': 6.0}, r'\[low, high\] numeric threshold for between'),
+    ({'operator': 'outside', 'threshold': [6.0]}, r'\[low, high\] numeric threshold for outside'),
+    ({'operator': 'outside', 'threshold': [6.0, 'high']}, r'\[low, high\] numeric threshold for outside'),
+    ({'operator': '>', 'threshold': '5'}, 'numeric threshold for >'),
+    ({'operator': '<=', 'threshold': [5.0]}, 'numeric threshold for <='),
+    ({'operator': '<', 'threshold': True}, 'numeric threshold for <'),
+    ({'field': 'contamination_level', 'operator': 'in', 'threshold': 'High Risk'}, 'list threshold for in'),
+    ({'field': 'contamination_level', 'operator': 'not_in', 'threshold': None}, 'list threshold for not_in'),
+])
+def test_compile_rule_rejects_bad_specs(change, error):
+    with pytest.raises(ValueError, match=error):
+        compile_rule(dict(SPEC, **change))
+
+def test_compile_rule_requires_keys():
+    with pytest.raises(ValueError, match=r"missing \['threshold'\]"):
+        compile_rule({key: value for key, value in SPEC.items() if key != 'threshold'})
+
+@pytest.mark.parametrize('typo', [
+    {'field': 'phh'},
+    {'operator': 'between', 'threshold': 6.0},
+])
+def test_broken_rule_file_keeps_the_previous_rules(tmp_path, typo):
+    path = tmp_path / 'rules.json'
+    path.write_text(json.dumps([SPEC]))
+    rules = AlertRuleSet(path=str(path))
+    assert [rule.name for rule in rules.load()] == ['acidic']
+
+    path.write_text(json.dumps([SPEC, dict(SPEC, name='typo', **typo)]))
+    assert [rule.name for rule in rules.load()] == ['acidic']
+    # Still evaluates with the rules it kept
+    assert len(rules.evaluate('water', [{'ph': 5.0, 'location': 'Well 3'}])) == 1
+
+@pytest.mark.parametrize('operator, threshold, expected', [
+    ('<', 6.0, [1, 0, 0, 0]),
+    ('<=', 6.0, [1, 1, 0, 0]),
+    ('>', 8.5, [0, 0, 0, 1]),
+    ('>=', 8.5, [0, 0, 1, 1]),
+    ('==', 6.0, [0, 1, 0, 0]),
+    ('!=', 6.0, [1, 0, 1, 1]),
+    ('between', [6.0, 8.5], [0, 1, 1, 0]),
+    ('outside', [6.0, 8.5], [1, 0, 0, 1]),
+])
+def test_numeric_operators(operator, threshold, expected):
+    values = np.array([5.0, 6.0, 8.5, 9.0])
+    assert OPERATORS[operator](values, threshold).astype(int).tolist() == expected
+
+def test_set_operators():
+    values = np.array(['Low', 'High', 'Critical'], dtype=object)
+    assert OPERATORS['in'](values, ['High', 'Critical']).tolist() == [False, True, True]
+    assert OPERATORS['not_in'](values, ['High', 'Critical']).tolist() == [True, False, False]
+
+def legacy_water_alerts(sample):
+    """The checks hard-coded in notifications.py before alert_rules.json"""
+    alerts = []
+    if sample.ph < 6.0 or sample.ph > 8.5:
+        alerts.append(("Critical pH Level", f"pH level {sample.ph:.1f} detected at {sample.location}", "water"))
+    if sample.turbidity > 5.0:
+        alerts.append(("High Turbidity Alert", f"Turbidity {sample.turbidity:.1f} NTU at {sample.location}", "water"))
+    if sample.contamination_level == 'High Risk':
+        alerts.append(("Contamination Alert", f"High risk contamination detected at {sample.location}", "water"))
+    return alerts
+
+def legacy_disease_alerts(alert):
+    if alert.risk_level in ['High', 'Critical']:
+        return [(f"{alert.disease} Outbreak Alert", f"{alert.cases} cases reported in {alert.district}", "disease")]
+    return []
+
+def test_default_rules_match_the_old_hard_coded_checks():
+    rules = AlertRuleSet(path=ALERT_RULES_PATH)
+    rules.load()
+
+    samples = [SimpleNamespace(ph=ph, turbidity=turbidity, contamination_level=level, location='Well 7')
+               for ph, turbidity, level in product([5.99, 6.0, 7.2, 8.5, 8.51], [4.9, 5.0, 5.01],
+                                                   ['Safe', 'Moderate', 'High Risk'])]
+    expected = [alert for sample in samples for alert in legacy_water_alerts(sample)]
+    actual = [(row['title'], row['message'], row['type']) for row in rules.evaluate('water', samples)]
+    assert actual == expected
+
+    alerts = [SimpleNamespace(disease='Cholera', cases=cases, risk_level=level, district='Puri')
+              for cases, level in product([1, 40], ['Low', 'Medium', 'High', 'Critical'])]
+    expected = [alert for disease_alert in alerts for alert in legacy_disease_alerts(disease_alert)]
+    actual = [(row['title'], row['message'], row['type']) for row in rules.evaluate('disease', alerts)]
+    assert actual == expected
+
+def row(rule):
+    return {'title': 'Counted', 'message': 'rule counts test', 'type': 'water', 'severity': 'info',
+            'user_id': None, 'read': False, 'created_at': datetime.utcnow(), 'rule': rule}
+
+def test_rule_counts_only_include_committed_notifications():
+    before = alert_rules.notification_counts().get('count_test', 0)
+    with app.app_context():
+        create_notifications([row('count_test')] * 2, commit=False)
+        db.session.rollback()
+        assert alert_rules.notification_counts().get('count_test', 0) == before
+
+        create_notifications([row('count_test')] * 2)
+        assert alert_rules.notification_counts()['count_test'] == before + 2
+
+def test_outbox_retries_do_not_recount(monkeypatch):
+    calls = []
+
+    def notify_then_fail(payloads):
+        create_notifications([row('retry_test')], commit=False)
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError('first attempt fails')
+
+    monkeypatch.setitem(outbox.HANDLERS, 'water_sample.alerts', notify_then_fail)
+    worker = outbox.OutboxWorker(app, threads=0)
+    with app.app_context():
+        outbox.OutboxEvent.query.delete()
+        outbox.enqueue('water_sample.alerts', {'sample_id': -1})
+        db.session.commit()
+        worker.run_once()
+        outbox.OutboxEvent.query.update({'available_at': datetime.utcnow()})
+        db.session.commit()
+        worker.run_once()
+
+    assert len(calls) == 2
+    assert alert_rules.notification_counts()['retry_test'] == 1
@@ -0,0 +1,64 @@
+import pytest
+
+from app import app
+from auth import hash_password
+from models import db, User
+
+@pytest.fixture(scope='module')
+def client():
+    with app.app_context():
+        db.session.add_all([
+            User(username='auth-hashed', password=hash_password('s3cret'), role='officer'),
+            User(username='auth-legacy', password='plain-old', role='worker'),
+        ])
+        db.session.commit()
+    return app.test_client()
+
+def login(client, username, password):
+    return client.post('/api/login', json={'username': username, 'password': password})
+
+def bearer(token):
+    return {'Authorization': f'Bearer {token}'}
+
+def test_login_issues_a_token_carrying_id_and_role(client):
+    response = login(client, 'auth-hashed', 's3cret')
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['role'] == 'officer' and body['token'] and body['expires_in'] > 0
+
+    assert login(client, 'auth-hashed', 'wrong').status_code == 401
+    assert login(client, 'auth-nobody', 's3cret').status_code == 401
+
+def test_legacy_plaintext_password_is_rehashed_on_login(client):
+    assert login(client, 'auth-legacy', 'plain-old').status_code == 200
+    with app.app_context():
+        stored = User.query.filter_by(username='auth-legacy').one().password
+    assert stored != 'plain-old' and stored.startswith('scrypt:')
+    assert login(client, 'auth-legacy', 'plain-old').status_code == 200
+
+def test_bad_tokens_are_rejected_and_logout_revokes(client):
+    token = login(client, 'auth-hashed', 's3cret').get_json()['token']
+
+    assert client.post('/api/logout').status_code == 401
+    assert client.get('/api/facets', headers=bearer(token + 'x')).status_code == 401
+    assert client.get('/api/facets', headers={'Authorization': 'Basic abc'}).status_code == 401
+
+    assert client.post('/api/logout', headers=bearer(token)).status_code == 200
+    response = client.get('/api/facets', headers=bearer(token))
+    assert response.status_code == 401
+    assert response.get_json()['error'] == 'Token revoked'
+
+def test_expired_tokens_are_rejected(client, monkeypatch):
+    token = login(client, 'auth-hashed', 's3cret').get_json()['token']
+    monkeypatch.setitem(app.config, 'AUTH_TOKEN_TTL', -1)
+    response = client.get('/api/facets', headers=bearer(token))
+    assert response.status_code == 401
+    assert response.get_json()['error'] == 'Token expired'
+
+def test_hasher_timeout_is_reported_as_unavailable(client, monkeypatch):
+    hasher = app.extensions['password_hasher']
+    monkeypatch.setattr(hasher, 'timeout', 0.0001)
+    response = login(client, 'auth-hashed', 's3cret')
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+    assert hasher.stats()['timed_out'] >= 1
@@ -0,0 +1,97 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import insert
+
+from app import app
+from facets import FacetIndex, facet_index
+from models import db, WaterSample
+from versions import bump_version
+
+@pytest.fixture(scope='module')
+def client():
+    client = app.test_client()
+    for location in ('Kumarakom Jetty', 'Kumarakom Jetty', 'Kuttanad Canal'):
+        client.post('/api/water', json={
+            'location': location, 'state': 'Kerala', 'district': 'Kottayam',
+            'ph': 7.0, 'turbidity': 1.0, 'bacterial_count': 5, 'temperature': 25,
+            'contamination_level': 'Safe'
+        })
+    client.post('/api/alerts', json={
+        'disease': 'Leptospirosis', 'cases': 3, 'risk_level': 'Low',
+        'location': 'Kuttanad Canal', 'state': 'Kerala', 'district': 'Kottayam'
+    })
+    # A rolled-back insert must not be counted
+    client.post('/api/water', json={'location': 'Nowhere', 'state': 'Kerala'})
+    return client
+
+def test_tree_counts_committed_inserts(client):
+    response = client.get('/api/facets?state=Kerala&district=Kottayam')
+    assert response.status_code == 200
+    [state] = response.get_json()['states']
+    [district] = state['districts']
+    locations = {location['name']: location for location in district['locations']}
+
+    assert locations['Kumarakom Jetty']['samples'] >= 2
+    assert locations['Kuttanad Canal']['alerts'] >= 1
+    assert 'Nowhere' not in locations
+    assert district['samples'] == sum(location['samples'] for location in district['locations'])
+    assert {'name': 'Leptospirosis', 'alerts': 1} in response.get_json()['diseases']
+
+def test_prefix_search(client):
+    matches = client.get('/api/facets?q=kumar').get_json()['matches']
+    assert matches[0]['field'] == 'location' and matches[0]['value'] == 'Kumarakom Jetty'
+    assert client.get('/api/facets?q=lepto&field=disease').get_json()['matches'] == [
+        {'field': 'disease', 'value': 'Leptospirosis', 'count': 1}
+    ]
+    assert client.get('/api/facets?q=a&field=colour').status_code == 400
+
+def test_incremental_counts_match_a_rebuild(client):
+    rebuilt = FacetIndex()
+    with app.app_context():
+        rebuilt.rebuild()
+    assert rebuilt.tree() == facet_index.tree()
+
+def test_local_inserts_do_not_trigger_a_rebuild(client, monkeypatch):
+    client.get('/api/facets')
+    rebuilds = []
+    monkeypatch.setattr(facet_index, 'rebuild', lambda: rebuilds.append(1))
+    client.post('/api/water', json={
+        'location': 'Kumarakom Jetty', 'state': 'Kerala', 'district': 'Kottayam',
+        'ph': 7.0, 'turbidity': 1.0, 'bacterial_count': 5, 'temperature': 25,
+        'contamination_level': 'Safe'
+    })
+    assert client.get('/api/facets?q=kumar').status_code == 200
+    assert rebuilds == []
+
+def test_inserts_from_another_process_are_picked_up(client):
+    etag = client.get('/api/facets?q=vembanad').headers['ETag']
+    assert client.get('/api/facets?q=vembanad').get_json()['matches'] == []
+    with app.app_context():
+        # Committed without queue_for_facets, as another worker process would
+        db.session.execute(insert(WaterSample), [{
+            'location': 'Vembanad Lake', 'state': 'Goa', 'district': 'North Goa', 'ph': 7.0,
+            'turbidity': 1.0, 'bacterial_count': 5, 'temperature': 25,
+            'contamination_level': 'Safe', 'sample_date': datetime.utcnow()
+        }])
+        bump_version('water_samples')
+        db.session.commit()
+
+    response = client.get('/api/facets?q=vembanad', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.get_json()['matches'] == [{'field': 'location', 'value': 'Vembanad Lake', 'count': 1}]
+
+def test_out_of_order_commits_mark_the_index_stale():
+    index = FacetIndex()
+    with app.app_context():
+        index.rebuild()
+        version = index._versions['water_samples']
+        # Two local commits whose after_commit hooks ran in reverse order
+        index.apply([('Kerala', 'Kottayam', 'Later')], versions={'water_samples': (version + 1, version + 2)})
+        index.apply([('Kerala', 'Kottayam', 'Earlier')], versions={'water_samples': (version, version + 1)})
+        assert index._stale
+        # A commit a rebuild already counted is not counted again
+        index.rebuild()
+        before = index.tree()
+        index.apply([('Kerala', 'Kottayam', 'Earlier')], versions={'water_samples': (version - 1, version)})
+        assert index.tree() == before and not index._stale
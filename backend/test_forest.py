@@ -0,0 +1,123 @@
+import os
+import warnings
+
+import joblib
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.tree import DecisionTreeClassifier
+
+from forest import FlatForest, export_model
+from prediction import MODEL_PATH, ModelRegistry, SERVING_FEATURES
+
+def make_data(n=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    X = np.column_stack([
+        rng.uniform(4.0, 11.0, n),
+        rng.exponential(3.0, n),
+        rng.lognormal(4.0, 2.0, n),
+        rng.uniform(10.0, 45.0, n)
+    ])
+    y = np.where((X[:, 0] < 6.5) | (X[:, 1] > 5) | (rng.random(n) < 0.1), 'Unsafe', 'Safe')
+    return X, y
+
+def threshold_rows(model, n_features):
+    """Rows whose values sit exactly on fitted thresholds, where float32 rounding matters"""
+    rows = []
+    for estimator in getattr(model, 'estimators_', [model]):
+        tree = estimator.tree_
+        for node in np.flatnonzero(tree.children_left != -1)[:5]:
+            row = np.full(n_features, 1.0)
+            row[tree.feature[node]] = tree.threshold[node]
+            rows.append(row)
+    return np.array(rows)
+
+@pytest.mark.parametrize('model', [
+    RandomForestClassifier(n_estimators=30, random_state=0),
+    RandomForestClassifier(n_estimators=10, max_depth=4, min_samples_leaf=5, random_state=1),
+    DecisionTreeClassifier(random_state=0),
+])
+def test_matches_sklearn_probabilities(model):
+    X, y = make_data()
+    model.fit(X, y)
+    flat = FlatForest.from_estimator(model)
+
+    test_X, _ = make_data(500, seed=1)
+    test_X = np.vstack([test_X, threshold_rows(model, X.shape[1])])
+    np.testing.assert_allclose(flat.predict_proba(test_X), model.predict_proba(test_X), rtol=0, atol=1e-12)
+    np.testing.assert_allclose(flat.predict_proba(test_X[:1]), model.predict_proba(test_X[:1]), rtol=0, atol=1e-12)
+
+def test_matches_shipped_model():
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        model = joblib.load(MODEL_PATH)
+        X, _ = make_data(1000)
+        X = np.vstack([X[:, :3], threshold_rows(model, 3)])
+        expected = model.predict_proba(X)
+    np.testing.assert_allclose(FlatForest.from_estimator(model).predict_proba(X), expected, rtol=0, atol=1e-12)
+
+def test_rejects_non_finite_input():
+    X, y = make_data(200)
+    flat = FlatForest.from_estimator(RandomForestClassifier(n_estimators=3, random_state=0).fit(X, y))
+    with pytest.raises(ValueError):
+        flat.predict_proba(np.array([[7.0, np.nan, 1.0, 20.0]]))
+    with pytest.raises(ValueError):
+        flat.predict_proba(np.array([[7.0, 1.0, 20.0]]))
+
+def test_registry_serves_small_matrices_from_flat_arrays(tmp_path):
+    X, y = make_data()
+    model = RandomForestClassifier(n_estimators=20, random_state=0).fit(X, y)
+    path = os.path.join(tmp_path, 'model.pkl')
+    joblib.dump(model, path)
+
+    registry = ModelRegistry(path)
+    loaded = registry.load()
+    assert loaded.compatible and loaded.evaluator is not None
+    assert registry.stats()['flat_nodes'] == loaded.evaluator.n_nodes
+
+    labels, scores = registry.predict_matrix(X[:10])
+    proba = model.predict_proba(X[:10])
+    assert list(labels) == list(model.classes_[proba.argmax(axis=1)])
+    np.testing.assert_allclose(scores, proba.max(axis=1), rtol=0, atol=1e-12)
+    assert registry.predict(dict(zip(SERVING_FEATURES, X[0])))[0] == labels[0]
+
+def test_registry_maps_the_flattened_export(tmp_path):
+    X, y = make_data()
+    model = RandomForestClassifier(n_estimators=20, random_state=0).fit(X, y)
+    path = os.path.join(tmp_path, 'model.pkl')
+    joblib.dump(model, path)
+    directory = export_model(path)
+
+    registry = ModelRegistry(path)
+    loaded = registry.load()
+    assert loaded.model is None and registry.stats()['mmap']
+    assert isinstance(loaded.evaluator.threshold.base, np.memmap)
+    assert loaded.classes == tuple(model.classes_)
+
+    # Without a sklearn model even large batches are scored from the mapping
+    labels, scores = registry.predict_matrix(X)
+    np.testing.assert_allclose(scores, model.predict_proba(X).max(axis=1), rtol=0, atol=1e-12)
+
+    # An export built from a different pickle is ignored
+    joblib.dump(RandomForestClassifier(n_estimators=5, random_state=1).fit(X, y), path)
+    assert registry.load(force=True).model is not None
+    assert os.path.isdir(directory)
+
+def test_registry_switches_to_the_export_written_after_the_pickle(tmp_path):
+    X, y = make_data()
+    model = RandomForestClassifier(n_estimators=10, random_state=0).fit(X, y)
+    path = os.path.join(tmp_path, 'model.pkl')
+    joblib.dump(RandomForestClassifier(n_estimators=5, random_state=1).fit(X, y), path)
+    export_model(path)
+    registry = ModelRegistry(path)
+    assert registry.load().model is None
+
+    # Retraining: the new pickle lands first and a load sees the old export beside it
+    joblib.dump(model, path)
+    assert registry.load().model is not None
+
+    # The export (and schema sidecar) written afterwards are picked up without a restart
+    export_model(path, model)
+    loaded = registry.load()
+    assert loaded.model is None and loaded.evaluator.n_trees == 10
+    assert registry.load() is loaded
@@ -0,0 +1,111 @@
+import json
+from datetime import datetime
+
+import pytest
+
+import ingest
+from app import app
+from models import WaterSample
+
+@pytest.fixture(scope='module')
+def client():
+    return app.test_client()
+
+def ndjson(rows):
+    return '\n'.join(row if isinstance(row, str) else json.dumps(row) for row in rows) + '\n'
+
+def sample(location, **fields):
+    return dict({'location': location, 'state': 'Assam', 'district': 'Jorhat', 'ph': 7.2,
+                 'turbidity': 1.1, 'bacterial_count': 12, 'temperature': 24}, **fields)
+
+def stored(location):
+    with app.app_context():
+        return WaterSample.query.filter_by(location=location).order_by(WaterSample.id).all()
+
+def test_csv_headers_aliases_and_ranges(client):
+    body = ('Monitoring Location,State Name,Region,pH - Min,pH - Max,Turbidity (NTU),'
+            'Total Coliform (MPN/100ml),Temperature (°C)\n'
+            'Csv Ghat,Assam,Jorhat,6.5,7.5,3.0,150,27\n')
+    response = client.post('/api/water/bulk', data=body.encode(), content_type='text/csv')
+    assert response.status_code == 201
+    assert response.get_json()['inserted'] == 1
+    [row] = stored('Csv Ghat')
+    assert (row.ph, row.turbidity, row.bacterial_count, row.temperature) == (7.0, 3.0, 150, 27)
+    # Filled in by the rule engine when the upload carries no level
+    assert row.contamination_level in ('Safe', 'Moderate', 'High Risk')
+
+def test_ndjson_with_query_string_defaults(client):
+    rows = [{'location': 'Ndjson Tank', 'ph': 7.0, 'turbidity': 1, 'bacterial_count': 5, 'temperature': 22}]
+    response = client.post('/api/water/bulk?state=Assam&district=Majuli&contamination_level=Safe',
+                           data=ndjson(rows), content_type='application/x-ndjson')
+    assert response.status_code == 201
+    [row] = stored('Ndjson Tank')
+    assert (row.state, row.district, row.contamination_level) == ('Assam', 'Majuli', 'Safe')
+
+def test_chunk_boundaries(client):
+    rows = [sample('Chunked Pond') for _ in range(5)]
+    response = client.post('/api/water/bulk?chunk_size=2', data=ndjson(rows),
+                           content_type='application/x-ndjson')
+    report = response.get_json()
+    assert (report['inserted'], report['chunks']) == (5, 3)
+    assert len(stored('Chunked Pond')) == 5
+
+def test_bad_rows_are_reported_by_line(client):
+    rows = [
+        sample('Partial Well'),
+        '{not json',
+        sample('Partial Well', ph='acidic'),
+        sample('Partial Well', turbidity='nan'),
+        {key: value for key, value in sample('Partial Well').items() if key != 'district'},
+        sample('Partial Well', sample_date='yesterday'),
+        '[1, 2]',
+        sample('Partial Well'),
+    ]
+    response = client.post('/api/water/bulk', data=ndjson(rows), content_type='application/x-ndjson')
+    assert response.status_code == 201
+    report = response.get_json()
+    assert (report['inserted'], report['rejected']) == (2, 6)
+    assert [error['line'] for error in report['errors']] == [2, 3, 4, 5, 6, 7]
+    assert report['errors'][0]['error'].startswith('invalid JSON')
+    assert report['errors'][1:] == [
+        {'line': 3, 'error': 'ph must be numeric'},
+        {'line': 4, 'error': 'turbidity must be finite'},
+        {'line': 5, 'error': 'missing field district'},
+        {'line': 6, 'error': 'sample_date must be an ISO date'},
+        {'line': 7, 'error': 'expected a JSON object'},
+    ]
+    assert len(stored('Partial Well')) == 2
+
+def test_failed_chunk_keeps_the_chunks_before_it(client, monkeypatch):
+    calls = []
+    check = ingest.check_water_quality_alerts_batch
+
+    def fail_second_chunk(rows, commit=True):
+        calls.append(len(rows))
+        if len(calls) == 2:
+            raise RuntimeError('disk full')
+        return check(rows, commit=commit)
+
+    monkeypatch.setattr(ingest, 'check_water_quality_alerts_batch', fail_second_chunk)
+    rows = [sample('Half Loaded') for _ in range(4)]
+    response = client.post('/api/water/bulk?chunk_size=2', data=ndjson(rows),
+                           content_type='application/x-ndjson')
+    assert response.status_code == 201
+    report = response.get_json()
+    assert (report['inserted'], report['chunks']) == (2, 1)
+    assert report['error'] == 'chunk 2 failed and was rolled back: disk full'
+    assert len(stored('Half Loaded')) == 2
+
+def test_offsets_are_stored_as_utc(client):
+    rows = [sample('Offset Well', sample_date='2025-01-01T10:00:00+05:30'),
+            sample('Offset Well', sample_date='2025-01-01T04:30:00')]
+    client.post('/api/water/bulk', data=ndjson(rows), content_type='application/x-ndjson')
+    assert [row.sample_date for row in stored('Offset Well')] == [datetime(2025, 1, 1, 4, 30)] * 2
+
+def test_rejected_requests(client):
+    assert client.post('/api/water/bulk', json=[sample('Nope')]).status_code == 415
+    response = client.post('/api/water/bulk?chunk_size=0', data=ndjson([sample('Nope')]),
+                           content_type='application/x-ndjson')
+    assert response.status_code == 400
+    response = client.post('/api/water/bulk', data=ndjson(['{oops']), content_type='application/x-ndjson')
+    assert response.status_code == 400 and response.get_json()['inserted'] == 0
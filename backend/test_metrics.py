@@ -0,0 +1,74 @@
+import re
+
+import pytest
+
+from app import app
+from models import db
+from notifications import check_water_quality_alerts_batch
+
+@pytest.fixture(scope='module')
+def client():
+    return app.test_client()
+
+SAMPLE = re.compile(r'^(\w+)(?:\{(.*)\})? (\S+)$')
+
+def scrape(client):
+    response = client.get('/api/metrics')
+    assert response.status_code == 200
+    assert response.headers['Content-Type'].startswith('text/plain; version=0.0.4')
+    samples = {}
+    for line in response.get_data(as_text=True).splitlines():
+        if line.startswith('#'):
+            continue
+        name, labels, value = SAMPLE.match(line).groups()
+        samples[(name, labels or '')] = float(value)
+    return response.get_data(as_text=True), samples
+
+def test_requests_and_sql_are_counted_per_route(client):
+    _, before = scrape(client)
+    route = 'method="GET",route="/api/water"'
+    for _ in range(3):
+        assert client.get('/api/water?district=Metricsville&limit=5').status_code == 200
+    client.get('/api/does-not-exist')
+
+    _, after = scrape(client)
+    count = ('health_monitor_http_requests_total', route + ',status="200"')
+    assert after[count] - before.get(count, 0) == 3
+    assert after[('health_monitor_http_requests_total', 'method="GET",route="unmatched",status="404"')] >= 1
+
+    requests = ('health_monitor_http_request_duration_seconds_count', route)
+    assert after[requests] - before.get(requests, 0) == 3
+    assert after[('health_monitor_http_request_duration_seconds_bucket', route + ',le="+Inf"')] == after[requests]
+    statements = ('health_monitor_db_statements_per_request_sum', route)
+    assert after[statements] - before.get(statements, 0) >= 3
+    assert after[('health_monitor_db_statements_total', 'context="request"')] > 0
+
+def test_component_metrics_are_exposed(client):
+    text, samples = scrape(client)
+    assert ('health_monitor_db_pool_size', 'bind="default"') in samples
+    assert ('health_monitor_model_loaded', '') in samples
+    assert ('health_monitor_auth_hash_pending', '') in samples
+
+    # One HELP/TYPE header per family, with its samples directly below
+    helps = re.findall(r'^# HELP (\w+) ', text, re.M)
+    assert len(helps) == len(set(helps))
+    families = []
+    for line in text.splitlines():
+        if line.startswith('# HELP'):
+            families.append(line.split()[2])
+        elif not line.startswith('#') and families:
+            assert line.startswith(families[-1])
+
+def test_notifications_per_rule_count_committed_rows_only(client):
+    rule = 'rule="high_turbidity"'
+    _, before = scrape(client)
+    sample = {'location': 'Metrics Ghat', 'state': 'Kerala', 'district': 'Thrissur', 'ph': 7.0,
+              'turbidity': 9.0, 'bacterial_count': 5, 'temperature': 25, 'contamination_level': 'Safe'}
+    with app.app_context():
+        check_water_quality_alerts_batch([sample], commit=False)
+        db.session.rollback()
+        check_water_quality_alerts_batch([sample])
+
+    _, after = scrape(client)
+    key = ('health_monitor_notifications_created_total', rule)
+    assert after[key] - before.get(key, 0) == 1
@@ -0,0 +1,117 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import outbox
+from app import app
+from models import db
+from outbox import OutboxEvent, OutboxWorker, enqueue
+
+@pytest.fixture
+def worker():
+    with app.app_context():
+        # Start from an empty outbox; nothing drains it in tests (FLASK_OUTBOX_WORKERS=0)
+        OutboxEvent.query.delete()
+        db.session.commit()
+        yield OutboxWorker(app, threads=0, batch_size=10, max_attempts=3, lease_seconds=60)
+        db.session.rollback()
+
+def add_events(count):
+    for i in range(count):
+        enqueue('water_sample.alerts', {'sample_id': -1 - i})
+    db.session.commit()
+
+def expire_leases():
+    OutboxEvent.query.filter_by(status='processing').update(
+        {'locked_at': datetime.utcnow() - timedelta(seconds=120)})
+    db.session.commit()
+
+def test_claim_leases_a_batch_once(worker):
+    add_events(3)
+    events = worker.claim()
+    assert len(events) == 3
+    assert {(event.status, event.attempts) for event in events} == {('processing', 1)}
+    assert len({event.locked_by for event in events}) == 1
+    # Leased events are not handed to another worker
+    assert worker.claim() == []
+
+def test_failed_batch_is_retried_with_backoff(worker, monkeypatch):
+    def fail(payloads):
+        raise RuntimeError('handler broke')
+    monkeypatch.setitem(outbox.HANDLERS, 'water_sample.alerts', fail)
+    add_events(1)
+
+    start = datetime.utcnow()
+    assert worker.run_once() == 1
+    event = OutboxEvent.query.one()
+    assert (event.status, event.attempts, event.locked_by) == ('pending', 1, None)
+    assert event.last_error == 'handler broke'
+    assert event.available_at >= start + timedelta(seconds=2)
+    # Not due until the backoff passes
+    assert worker.claim() == []
+
+    event.available_at = datetime.utcnow()
+    db.session.commit()
+    assert worker.run_once() == 1
+    assert OutboxEvent.query.one().available_at >= start + timedelta(seconds=4)
+
+def test_batch_is_dead_lettered_after_max_attempts(worker, monkeypatch):
+    def fail(payloads):
+        raise RuntimeError('handler broke')
+    monkeypatch.setitem(outbox.HANDLERS, 'water_sample.alerts', fail)
+    add_events(1)
+
+    for _ in range(3):
+        OutboxEvent.query.update({'available_at': datetime.utcnow()})
+        db.session.commit()
+        worker.run_once()
+    event = OutboxEvent.query.one()
+    assert (event.status, event.attempts) == ('failed', 3)
+    assert worker.failed == 1
+    assert worker.claim() == []
+
+def test_expired_lease_is_reclaimed(worker):
+    add_events(2)
+    first = [(event.id, event.locked_by) for event in worker.claim()]
+    expire_leases()
+    second = [(event.id, event.locked_by, event.attempts) for event in worker.claim()]
+    assert [event[0] for event in second] == [event[0] for event in first]
+    assert {event[2] for event in second} == {2}
+    assert second[0][1] != first[0][1]
+
+def test_expired_lease_is_dead_lettered_after_max_attempts(worker):
+    # Each claim's worker "crashes": the lease simply runs out
+    add_events(1)
+    for attempt in range(1, 4):
+        [event] = worker.claim()
+        assert event.attempts == attempt
+        expire_leases()
+    assert worker.claim() == []
+    event = OutboxEvent.query.one()
+    assert (event.status, event.locked_by) == ('failed', None)
+    assert 'lease expired' in event.last_error
+    assert worker.failed == 1
+    assert worker.stats()['dead'] == 1
+
+def test_one_bad_event_does_not_fail_its_batch(worker, monkeypatch):
+    handled = []
+
+    def fail_on_bad(payloads):
+        if any(payload['sample_id'] == -2 for payload in payloads):
+            raise RuntimeError('bad sample')
+        handled.extend(payload['sample_id'] for payload in payloads)
+    monkeypatch.setitem(outbox.HANDLERS, 'water_sample.alerts', fail_on_bad)
+    add_events(4)
+
+    assert worker.run_once() == 4
+    assert sorted(handled) == [-4, -3, -1]
+    assert worker.processed == 3
+    event = OutboxEvent.query.one()
+    assert (event.payload, event.status, event.attempts) == ('{"sample_id": -2}', 'pending', 1)
+
+    for _ in range(2):
+        OutboxEvent.query.update({'available_at': datetime.utcnow()})
+        db.session.commit()
+        worker.run_once()
+    assert OutboxEvent.query.one().status == 'failed'
+    assert worker.failed == 1 and sorted(handled) == [-4, -3, -1]
@@ -1,22 +1,18 @@
 import requests
 import json
 
-# Test data
+# Test data: the fields POST /api/predict reads
 test_data = {
     "ph": 7.2,
-    "hardness": 120,
-    "solids": 30000,
-    "chloramines": 3.5,
-    "sulfate": 250,
-    "conductivity": 400,
-    "organic_carbon": 10,
-    "trihalomethanes": 60,
-    "turbidity": 3.0
+    "turbidity": 3.0,
+    "bacterial_count": 150,
+    "temperature": 26.5,
+    "location": "Test Well"
 }
 
 try:
-    response = requests.post('http://127.0.0.1:5000/predict', json=test_data)
+    response = requests.post('http://127.0.0.1:5000/api/predict', json=test_data)
     print(f"Status: {response.status_code}")
     print(f"Response: {json.dumps(response.json(), indent=2)}")
 except Exception as e:
-    print(f"Error: {e}")
\ No newline at end of file
+    print(f"Error: {e}")
@@ -0,0 +1,62 @@
+import pytest
+
+from app import app
+from models import Prediction
+
+ROW = {'ph': 7.1, 'turbidity': 2.0, 'bacterial_count': 40, 'temperature': 26, 'location': 'Batch Well'}
+
+@pytest.fixture(scope='module')
+def client():
+    return app.test_client()
+
+def test_json_array_and_rows_object(client):
+    for body in ([ROW, dict(ROW, ph=5.2)], {'rows': [ROW, dict(ROW, ph=5.2)]}):
+        response = client.post('/api/predict/batch', json=body)
+        assert response.status_code == 200
+        payload = response.get_json()
+        assert payload['count'] == 2 and payload['errors'] == []
+        assert [result['row'] for result in payload['results']] == [0, 1]
+        assert all(result['risk'] in ('Low', 'Medium', 'High') for result in payload['results'])
+
+    with app.app_context():
+        ids = [result['id'] for result in payload['results']]
+        assert Prediction.query.filter(Prediction.id.in_(ids)).count() == 2
+
+def test_csv_body(client):
+    body = 'location,ph,turbidity,bacterial_count,temperature\nCSV Well,7.0,1.5,10,24\nCSV Tank,6.1,9,900,31\n'
+    response = client.post('/api/predict/batch', data=body, content_type='text/csv')
+    assert response.status_code == 200
+    assert [result['row'] for result in response.get_json()['results']] == [0, 1]
+
+def test_bad_rows_are_reported_without_failing_the_batch(client):
+    rows = [
+        ROW,
+        {key: value for key, value in ROW.items() if key != 'turbidity'},
+        dict(ROW, ph='acidic'),
+        dict(ROW, temperature='nan'),
+        dict(ROW, bacterial_count='inf'),
+        dict(ROW, location=''),
+        ROW,
+    ]
+    response = client.post('/api/predict/batch', json=rows)
+    assert response.status_code == 200
+    payload = response.get_json()
+    assert [result['row'] for result in payload['results']] == [0, 6]
+    errors = {error['row']: error['error'] for error in payload['errors']}
+    assert errors[1] == "missing field 'turbidity'"
+    assert 'acidic' in errors[2]
+    assert errors[3] == 'temperature must be finite'
+    assert errors[4] == 'bacterial_count must be finite'
+    assert errors[5] == 'location is required'
+
+def test_no_valid_rows_is_a_bad_request(client):
+    response = client.post('/api/predict/batch', json=[dict(ROW, ph='nan')])
+    assert response.status_code == 400
+    assert response.get_json()['count'] == 0
+    assert client.post('/api/predict/batch', json={'rows': 'nope'}).status_code == 400
+
+def test_max_rows(client, monkeypatch):
+    monkeypatch.setitem(app.config, 'PREDICT_BATCH_MAX_ROWS', 2)
+    response = client.post('/api/predict/batch', json=[ROW] * 3)
+    assert response.status_code == 413
+    assert client.post('/api/predict/batch', json=[ROW] * 2).status_code == 200
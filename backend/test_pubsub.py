@@ -0,0 +1,101 @@
+import json
+from datetime import datetime
+
+import pytest
+from sqlalchemy import insert
+
+from app import app
+from models import db
+from notifications import Notification, create_notifications
+from pubsub import NotificationBus, notification_bus
+
+@pytest.fixture(scope='module')
+def client():
+    return app.test_client()
+
+def notify(count):
+    """Commit count notifications; returns their ids"""
+    with app.app_context():
+        created = create_notifications([{
+            'title': f'Test {i}', 'message': 'pubsub test', 'type': 'test',
+            'severity': 'low', 'read': False, 'created_at': datetime.utcnow()
+        } for i in range(count)])
+    return [notification['id'] for notification in created]
+
+def events(response, count):
+    """The first count SSE messages of a streamed response"""
+    messages, buffer = [], ''
+    for chunk in response.response:
+        buffer += chunk.decode() if isinstance(chunk, bytes) else chunk
+        *complete, buffer = buffer.split('\n\n')
+        messages += [message for message in complete if not message.startswith('retry:')]
+        if len(messages) >= count:
+            break
+    response.close()
+    return messages[:count]
+
+def test_out_of_order_publish_is_not_served_with_a_gap():
+    bus = NotificationBus()
+    bus.prime(10)
+    bus.publish([{'id': 11}])
+    # 13 committed after 12 but its after_commit hook ran first
+    bus.publish([{'id': 13}])
+    assert bus.since(10) == ([], False)
+    assert bus.since(12) == ([{'id': 13}], True)
+    bus.publish([{'id': 12}])
+    assert bus.since(10) == ([{'id': 11}, {'id': 12}, {'id': 13}], True)
+    assert bus.since(10, limit=2) == ([{'id': 11}, {'id': 12}], True)
+
+def test_gaps_are_read_from_the_database(client):
+    first, second, third = notify(3)
+    # Drop the second from the buffer as if its publish had not happened yet
+    index = notification_bus._ids.index(second)
+    del notification_bus._ids[index], notification_bus._recent[index]
+    assert notification_bus.since(first) == ([], False)
+
+    response = client.get(f'/api/notifications?since_id={first}&timeout=0')
+    assert [n['id'] for n in response.get_json()['notifications']] == [third, second]
+    # The database read refilled the buffer
+    assert [n['id'] for n in notification_bus.since(first)[0]] == [second, third]
+
+def test_long_poll_resumes_after_since_id(client):
+    first, second, third = notify(3)
+    response = client.get(f'/api/notifications?since_id={first}&timeout=1')
+    body = response.get_json()
+    assert [n['id'] for n in body['notifications']] == [third, second]
+    assert body['last_id'] == third
+
+def test_long_poll_times_out_empty(client):
+    with app.app_context():
+        latest = db.session.query(db.func.max(Notification.id)).scalar()
+    response = client.get(f'/api/notifications?since_id={latest}&timeout=0.05')
+    assert response.get_json() == {'notifications': [], 'last_id': latest}
+
+def test_sse_resumes_after_last_event_id(client):
+    first, second, third = notify(3)
+    response = client.get('/api/notifications/stream', headers={'Last-Event-ID': str(first)},
+                          buffered=False)
+    assert response.mimetype == 'text/event-stream'
+    messages = events(response, 2)
+    assert [message.splitlines()[0] for message in messages] == [f'id: {second}', f'id: {third}']
+    assert json.loads(messages[1].splitlines()[2][len('data: '):])['id'] == third
+
+def test_sse_sends_keep_alive_on_timeout(client, monkeypatch):
+    monkeypatch.setitem(app.config, 'SSE_HEARTBEAT_SECONDS', 0.05)
+    response = client.get('/api/notifications/stream', buffered=False)
+    assert events(response, 1) == [': keep-alive']
+
+def test_long_poll_sees_notifications_from_another_process(client, monkeypatch):
+    monkeypatch.setitem(app.config, 'NOTIFICATION_POLL_SECONDS', 0.05)
+    with app.app_context():
+        latest = db.session.query(db.func.max(Notification.id)).scalar()
+        # Committed without publishing, as run_outbox_worker.py would
+        db.session.execute(insert(Notification), [{
+            'title': 'Elsewhere', 'message': 'outbox worker process', 'type': 'test',
+            'severity': 'low', 'read': False, 'created_at': datetime.utcnow()
+        }])
+        db.session.commit()
+    assert notification_bus.last_id == latest
+
+    response = client.get(f'/api/notifications?since_id={latest}&timeout=1')
+    assert [n['title'] for n in response.get_json()['notifications']] == ['Elsewhere']
@@ -0,0 +1,109 @@
+import re
+
+import pytest
+from sqlalchemy import event
+
+from app import app
+from models import db
+
+# A bare "SCAN <table>" reads every row; "USING ... INDEX" scans are ordered walks
+FULL_SCAN = re.compile(r'^SCAN \w+$')
+
+ENDPOINTS = [
+    ('/api/water', False),
+    ('/api/water?state=Kerala', True),
+    ('/api/water?district=Kochi', True),
+    ('/api/water?state=Kerala&district=Kochi', True),
+    ('/api/water?start_date=2024-01-01T00:00:00', True),
+    ('/api/water?state=Kerala&start_date=2024-01-01T00:00:00&end_date=2024-12-31T00:00:00', True),
+    ('/api/water?limit=2', False),
+    ('/api/water?district=Kochi&limit=2', True),
+    ('/api/water?stream=1&state=Kerala', True),
+    ('/api/alerts', False),
+    ('/api/alerts?disease=Cholera', True),
+    ('/api/alerts?district=Kochi', True),
+    ('/api/alerts?disease=Cholera&district=Kochi', True),
+    ('/api/alerts?disease=Cholera&limit=2', True),
+    ('/api/notifications', False),
+]
+
+@pytest.fixture(scope='module')
+def client():
+    client = app.test_client()
+    for i in range(5):
+        client.post('/api/water', json={
+            'location': f'Well {i}', 'state': 'Kerala', 'district': 'Kochi',
+            'ph': 5.0, 'turbidity': 7.0, 'bacterial_count': 10, 'temperature': 25,
+            'contamination_level': 'High Risk'
+        })
+        client.post('/api/alerts', json={
+            'disease': 'Cholera', 'cases': 40, 'risk_level': 'High',
+            'location': f'Ward {i}', 'state': 'Kerala', 'district': 'Kochi'
+        })
+    return client
+
+def captured_selects(client, url):
+    """Run one request and return the SELECT statements it issued"""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            statements.append((statement, parameters))
+
+    # GET requests read through the 'read' bind; listen on every engine
+    with app.app_context():
+        engines = set(db.engines.values())
+    for engine in engines:
+        event.listen(engine, 'before_cursor_execute', capture)
+    try:
+        response = client.get(url)
+        response.get_data()  # drain streamed responses
+    finally:
+        for engine in engines:
+            event.remove(engine, 'before_cursor_execute', capture)
+
+    assert response.status_code == 200
+    return statements
+
+def query_plan(statement, parameters):
+    with app.app_context():
+        with db.engine.connect() as conn:
+            rows = conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters)
+            return [row[3] for row in rows]
+
+@pytest.mark.parametrize('url,filtered', ENDPOINTS)
+def test_endpoint_queries_use_indexes(client, url, filtered):
+    statements = captured_selects(client, url)
+    assert statements
+
+    for statement, parameters in statements:
+        plan = query_plan(statement, parameters)
+        detail = f'{url}: {plan}'
+        assert not any(FULL_SCAN.match(step) for step in plan), 'full table scan ' + detail
+        assert not any('TEMP B-TREE' in step for step in plan), 'temp B-tree sort ' + detail
+        if filtered:
+            assert any(step.startswith('SEARCH') for step in plan), 'filter not indexed ' + detail
+
+@pytest.mark.parametrize('url', [
+    '/api/regions?state=Kerala',
+    '/api/regions?district=Kochi&bucket=day',
+    '/api/regions?state=Kerala&start_date=2024-01-01&end_date=2024-12-31',
+])
+def test_region_rollups_are_searched(client, url):
+    # Grouping months of rollup rows may sort; reading them must not scan
+    for statement, parameters in captured_selects(client, url):
+        plan = query_plan(statement, parameters)
+        assert any(step.startswith('SEARCH') for step in plan), f'{url}: {plan}'
+
+def test_migrate_schema_adds_missing_indexes(client):
+    from database import migrate_schema
+
+    with app.app_context():
+        db.session.execute(db.text('DROP INDEX ix_water_samples_state_sample_date'))
+        db.session.commit()
+        migrate_schema()
+        names = {row[0] for row in db.session.execute(
+            db.text("SELECT name FROM sqlite_master WHERE type = 'index'")
+        )}
+
+    assert 'ix_water_samples_state_sample_date' in names
@@ -0,0 +1,50 @@
+import pytest
+
+from app import app
+from rollups import rebuild_rollups, region_trends
+
+SAMPLES = [
+    ('Kerala', 'Alappuzha', 5.0, 7.0, 50, 'High Risk'),
+    ('Kerala', 'Alappuzha', 7.0, 1.0, 5, 'Safe'),
+    ('Kerala', 'Alappuzha', 8.0, 3.0, 500, 'Moderate'),
+    ('Kerala', 'Thrissur', 6.5, 2.0, 20, 'Safe'),
+]
+
+@pytest.fixture(scope='module')
+def client():
+    client = app.test_client()
+    for state, district, ph, turbidity, bacteria, level in SAMPLES:
+        client.post('/api/water', json={
+            'location': 'Rollup Well', 'state': state, 'district': district,
+            'ph': ph, 'turbidity': turbidity, 'bacterial_count': bacteria, 'temperature': 25,
+            'contamination_level': level
+        })
+    for cases in (12, 30):
+        client.post('/api/alerts', json={
+            'disease': 'Typhoid', 'cases': cases, 'risk_level': 'Medium',
+            'location': 'Ward 1', 'state': 'Kerala', 'district': 'Alappuzha'
+        })
+    return client
+
+def test_regions_endpoint_aggregates_by_month(client):
+    response = client.get('/api/regions?state=Kerala&district=Alappuzha')
+    assert response.status_code == 200
+    [region] = response.get_json()['regions']
+    [month] = region['series']
+
+    assert month['sample_count'] == 3
+    assert month['ph'] == {'mean': 6.67, 'min': 5.0, 'max': 8.0}
+    assert month['bacterial_count']['max'] == 500
+    assert month['contamination_levels'] == {'High Risk': 1, 'Moderate': 1, 'Safe': 1}
+    assert month['contamination_index'] == 66.7
+    assert month['alert_count'] == 2
+    assert month['cases_by_disease'] == {'Typhoid': 42}
+
+def test_incremental_rollups_match_a_rebuild(client):
+    with app.app_context():
+        incremental = region_trends(state='Kerala', bucket='day')
+        rebuild_rollups()
+        assert region_trends(state='Kerala', bucket='day') == incremental
+
+def test_rejects_unknown_bucket(client):
+    assert client.get('/api/regions?bucket=week').status_code == 400
@@ -0,0 +1,99 @@
+import math
+
+import numpy as np
+import pytest
+
+from prediction import rule_predict, rule_predict_batch, RULE_BANDS
+
+def legacy_rule_predict(ph, turbidity, bacterial_count, temperature):
+    """The original if/elif chain, kept to pin the table-driven rules"""
+    score = 0
+    if ph < 6.0 or ph > 9.0:
+        score += 30
+    elif ph < 6.5 or ph > 8.5:
+        score += 15
+    if turbidity > 5:
+        score += 25
+    elif turbidity > 2:
+        score += 15
+    elif turbidity > 1:
+        score += 5
+    if temperature > 35:
+        score += 20
+    elif temperature > 30:
+        score += 10
+    if bacterial_count > 1000:
+        score += 25
+    elif bacterial_count > 100:
+        score += 15
+    elif bacterial_count > 10:
+        score += 5
+    normalized_score = min(score / 100.0, 1.0)
+    if normalized_score >= 0.7:
+        return "High", normalized_score
+    if normalized_score >= 0.4:
+        return "Medium", normalized_score
+    return "Low", normalized_score
+
+def edge_values(feature):
+    """Every threshold, its float neighbours and a few specials for one feature"""
+    values = [-math.inf, math.inf, math.nan, 0.0, -1.0]
+    for name, edges, _, _ in RULE_BANDS:
+        if name == feature:
+            for edge in edges:
+                values += [edge, np.nextafter(edge, -np.inf), np.nextafter(edge, np.inf)]
+    return values
+
+def random_samples(n, seed):
+    rng = np.random.default_rng(seed)
+    columns = {
+        'ph': rng.uniform(4.0, 11.0, n),
+        'turbidity': rng.exponential(3.0, n),
+        'bacterial_count': rng.lognormal(4.0, 2.0, n),
+        'temperature': rng.uniform(10.0, 45.0, n)
+    }
+    # Snap a share of each column onto its thresholds and specials
+    for feature, column in columns.items():
+        specials = np.array(edge_values(feature))
+        mask = rng.random(n) < 0.3
+        column[mask] = rng.choice(specials, mask.sum())
+    return columns
+
+def assert_parity(columns):
+    risks, scores = rule_predict_batch(
+        columns['ph'], columns['turbidity'], columns['bacterial_count'], columns['temperature']
+    )
+    for i in range(len(scores)):
+        expected = rule_predict(
+            float(columns['ph'][i]), float(columns['turbidity'][i]),
+            float(columns['bacterial_count'][i]), float(columns['temperature'][i])
+        )
+        assert (risks[i], float(scores[i])) == expected
+
+def test_scalar_matches_original_rules():
+    columns = random_samples(20000, seed=1)
+    for i in range(20000):
+        args = [float(columns[name][i]) for name in ('ph', 'turbidity', 'bacterial_count', 'temperature')]
+        assert rule_predict(*args) == legacy_rule_predict(*args)
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_batch_matches_scalar_on_random_samples(seed):
+    assert_parity(random_samples(20000, seed))
+
+def test_batch_matches_scalar_on_every_threshold_combination():
+    grids = np.meshgrid(
+        edge_values('ph'), edge_values('turbidity'),
+        edge_values('bacterial_count'), edge_values('temperature'),
+        indexing='ij'
+    )
+    columns = dict(zip(('ph', 'turbidity', 'bacterial_count', 'temperature'),
+                       (grid.ravel() for grid in grids)))
+    assert_parity(columns)
+
+def test_batch_accepts_lists_and_empty_input():
+    risks, scores = rule_predict_batch([7.0, 5.0], [0.5, 6.0], [5, 2000], [25, 40])
+    assert risks.tolist() == ['Low', 'High']
+    assert scores.tolist() == [0.0, 1.0]
+
+    risks, scores = rule_predict_batch([], [], [], [])
+    assert len(risks) == 0 and len(scores) == 0
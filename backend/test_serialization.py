@@ -0,0 +1,82 @@
+import gzip
+import json
+import zlib
+
+import pytest
+from flask.json.provider import DefaultJSONProvider
+
+from app import app, WATER_SAMPLE_COLUMNS
+from models import WaterSample
+from utils import serialization
+
+@pytest.fixture(scope='module')
+def client():
+    client = app.test_client()
+    for i in range(20):
+        client.post('/api/water', json={
+            'location': f'Serialized Well {i}', 'state': 'Kerala', 'district': 'Wayanad',
+            'ph': 7.0, 'turbidity': 1.5, 'bacterial_count': i, 'temperature': 24,
+            'contamination_level': 'Safe'
+        })
+    return client
+
+URL = '/api/water?district=Wayanad'
+
+def test_columnar_matches_rows(client):
+    rows = client.get(URL).get_json()
+    columns = client.get(URL + '&format=columnar').get_json()
+    assert set(columns) == set(rows[0])
+    assert [dict(zip(columns, values)) for values in zip(*columns.values())] == rows
+
+    page = client.get(URL + '&format=columnar&limit=5').get_json()
+    assert page['items']['id'] == [row['id'] for row in rows[:5]]
+    assert page['next_cursor']
+
+def test_row_tuples_match_to_dict(client, monkeypatch):
+    serialize_rows = serialization.row_serializer(WATER_SAMPLE_COLUMNS)
+    with app.app_context():
+        query = WaterSample.query.filter_by(district='Wayanad').order_by(WaterSample.id)
+        expected = [sample.to_dict() for sample in query]
+        rows = query.with_entities(*WATER_SAMPLE_COLUMNS).all()
+    assert json.loads(serialization.dumps(serialize_rows(rows))) == expected
+    streamed = client.get(URL + '&stream=1').get_json()
+    assert sorted(streamed, key=lambda row: row['id']) == expected
+
+    # Without orjson the dates are formatted up front, per batch
+    monkeypatch.setattr(serialization, 'orjson', None)
+    assert serialize_rows(rows) == expected
+
+@pytest.mark.parametrize('coding,decompress', [('gzip', gzip.decompress), ('deflate', zlib.decompress)])
+def test_negotiated_compression(client, coding, decompress):
+    plain = client.get(URL)
+    response = client.get(URL, headers={'Accept-Encoding': coding})
+    assert response.headers['Content-Encoding'] == coding
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert json.loads(decompress(response.data)) == plain.get_json()
+
+    streamed = client.get(URL + '&stream=1', headers={'Accept-Encoding': coding})
+    assert json.loads(decompress(streamed.data)) == plain.get_json()
+
+def test_small_and_unwanted_responses_stay_identity(client):
+    assert 'Content-Encoding' not in client.get(URL + '&limit=1', headers={'Accept-Encoding': 'gzip'}).headers
+    assert 'Content-Encoding' not in client.get(URL, headers={'Accept-Encoding': 'gzip;q=0'}).headers
+
+def test_msgpack_negotiation(client):
+    response = client.get(URL, headers={'Accept': 'application/msgpack'})
+    if serialization.msgpack is None:
+        assert response.status_code == 406
+        # Falls back to JSON when the client also accepts it
+        fallback = client.get(URL, headers={'Accept': 'application/msgpack, application/json;q=0.5'})
+        assert fallback.mimetype == 'application/json'
+    else:
+        assert response.mimetype == 'application/msgpack'
+        assert serialization.msgpack.unpackb(response.data) == client.get(URL).get_json()
+
+def test_debug_mode_pretty_prints_like_the_default_provider(monkeypatch):
+    payload = {'status': 'ok', 'counts': [1, 2], 'nested': {'b': None, 'a': 1.5}}
+    with app.app_context():
+        compact = app.json.response(payload).data
+        monkeypatch.setitem(app.config, 'DEBUG', True)
+        pretty = app.json.response(payload).data
+        assert pretty == DefaultJSONProvider(app).response(payload).data
+    assert b'\n' not in compact and json.loads(pretty) == json.loads(compact)
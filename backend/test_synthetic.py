@@ -0,0 +1,58 @@
+from datetime import datetime
+
+import numpy as np
+
+from app import app
+from models import db, WaterSample, DiseaseAlert, Prediction
+from summary import get_summary_stats
+from synthetic import (disease_alert_chunks, fit_stations, populate, station_drift,
+                       water_sample_chunks)
+
+START, END = datetime(2024, 1, 1), datetime(2025, 1, 1)
+
+def _samples(seed, n=2500, chunk_size=1000):
+    stations, _ = fit_stations()
+    rng = np.random.default_rng(seed)
+    drift = station_drift(rng, len(stations.location), 367)
+    return list(water_sample_chunks(stations, rng, n, START, END, drift, chunk_size))
+
+def test_stations_are_fitted_from_the_datasets():
+    stations, diseases = fit_stations()
+    assert len(stations.location) > 100
+    assert set(stations.state) >= {'Assam', 'Himachal Pradesh', 'Jharkhand'}
+    for name in ('temperature_mean', 'ph_mean', 'ph_sd', 'bacteria_log_mean', 'turbidity_log_mean'):
+        assert np.isfinite(getattr(stations, name)).all(), name
+    assert abs(diseases.shares.sum() - 1) < 1e-9
+
+def test_water_samples_are_reproducible_and_time_ordered():
+    first, second = _samples(7), _samples(7)
+    assert [len(chunk['ph']) for chunk in first] == [1000, 1000, 500]
+    for a, b in zip(first, second):
+        for column in a:
+            assert np.array_equal(a[column], b[column]), column
+
+    dates = np.concatenate([chunk['sample_date'] for chunk in first])
+    assert (np.diff(dates) >= np.timedelta64(0, 's')).all()
+    assert dates[0] >= np.datetime64(START) and dates[-1] <= np.datetime64(END)
+    ph = np.concatenate([chunk['ph'] for chunk in first])
+    assert 0 <= ph.min() and ph.max() <= 14
+    assert set(np.concatenate([chunk['contamination_level'] for chunk in first])) <= {'Safe', 'Moderate', 'High Risk'}
+
+def test_alerts_peak_in_the_monsoon():
+    stations, diseases = fit_stations()
+    chunk = next(disease_alert_chunks(stations, diseases, np.random.default_rng(3), 4000, START, END))
+    months = chunk['reported_at'].astype('datetime64[M]').astype(int) % 12 + 1
+    assert (np.isin(months, [7, 8])).mean() > 2 / 12
+    assert (chunk['cases'] >= 1).all()
+
+def test_populate_inserts_rows_and_rebuilds_summary():
+    with app.app_context():
+        before = {model: model.query.count() for model in (WaterSample, DiseaseAlert, Prediction)}
+        report = populate(samples=300, alerts=20, predictions=30, seed=11, days=30)
+        assert report['water_samples']['rows'] == 300
+        assert WaterSample.query.count() == before[WaterSample] + 300
+        assert DiseaseAlert.query.count() == before[DiseaseAlert] + 20
+        assert Prediction.query.count() == before[Prediction] + 30
+        assert get_summary_stats()['sample_count'] == WaterSample.query.count()
+        newest = db.session.query(db.func.max(WaterSample.sample_date)).scalar()
+        assert isinstance(newest, datetime)
@@ -0,0 +1,37 @@
+import numpy as np
+
+import train_model
+
+def test_features_are_extracted_and_cached(tmp_path, monkeypatch):
+    monkeypatch.setattr(train_model, 'CACHE_DIR', str(tmp_path / 'cache'))
+    path = tmp_path / 'export.csv'
+    path.write_text(
+        'Station,pH - Min,pH - Max,Dissolved - Min,Dissolved - Max,Notes\n'
+        'A,6.0,7.0,4,6,x\n'
+        'B,7.5,8.5,BDL,5,y\n'
+    )
+
+    matrix = train_model.load_features(str(path))
+    expected = np.array([[6.5, 5.0, np.nan], [8.0, np.nan, np.nan]])
+    assert np.array_equal(matrix, expected, equal_nan=True)
+
+    # A second run is served from the cache without touching the parser
+    monkeypatch.setattr(train_model, 'extract_features', None)
+    assert np.array_equal(train_model.load_features(str(path)), expected, equal_nan=True)
+
+    # Any change to the source produces a new cache key
+    path.write_text('pH Level,Turbidity (NTU)\n7.2,3.0\n')
+    monkeypatch.undo()
+    monkeypatch.setattr(train_model, 'CACHE_DIR', str(tmp_path / 'cache'))
+    assert train_model.load_features(str(path)).tolist() == [[7.2, 7.0, 3.0]]
+    assert len(list((tmp_path / 'cache').iterdir())) == 1
+
+def test_bad_value_after_the_first_chunk_is_coerced_once(tmp_path):
+    path = tmp_path / 'export.csv'
+    rows = [f'{7 + i / 10:.1f},{i}' for i in range(10)] + ['abc,10']
+    path.write_text('pH Level,Turbidity (NTU)\n' + '\n'.join(rows) + '\n')
+
+    matrix = train_model.extract_features(str(path), chunk_rows=4)
+    assert matrix.shape == (11, 3)
+    assert matrix[:10, 0].tolist() == [7 + i / 10 for i in range(10)]
+    assert np.isnan(matrix[10, 0]) and matrix[10, 2] == 10
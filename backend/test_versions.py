@@ -0,0 +1,41 @@
+import pytest
+
+from app import app
+
+ALERT = {'disease': 'Typhoid', 'cases': 2, 'risk_level': 'Low',
+         'location': 'Etag Ward', 'state': 'Bihar', 'district': 'Gaya'}
+
+@pytest.fixture(scope='module')
+def client():
+    return app.test_client()
+
+def test_unchanged_table_answers_304(client):
+    response = client.get('/api/alerts?district=Gaya')
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+    assert etag.startswith('W/"') and response.headers['Cache-Control'] == 'no-cache'
+
+    response = client.get('/api/alerts?district=Gaya', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.headers['ETag'] == etag
+    assert response.get_data() == b''
+
+def test_etag_depends_on_the_query_string(client):
+    first = client.get('/api/alerts?district=Gaya').headers['ETag']
+    assert client.get('/api/alerts?district=Patna').headers['ETag'] != first
+
+def test_write_changes_the_etag(client):
+    etag = client.get('/api/alerts?district=Gaya').headers['ETag']
+    assert client.post('/api/alerts', json=ALERT).status_code == 201
+
+    response = client.get('/api/alerts?district=Gaya', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert any(alert['location'] == 'Etag Ward' for alert in response.get_json())
+
+def test_write_to_another_table_keeps_the_etag(client):
+    etag = client.get('/api/alerts?district=Gaya').headers['ETag']
+    client.post('/api/water', json={'location': 'Etag Well', 'state': 'Bihar', 'district': 'Gaya',
+                                    'ph': 7.0, 'turbidity': 1.0, 'bacterial_count': 5,
+                                    'temperature': 25, 'contamination_level': 'Safe'})
+    assert client.get('/api/alerts?district=Gaya', headers={'If-None-Match': etag}).status_code == 304
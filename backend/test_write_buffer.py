@@ -0,0 +1,92 @@
+import threading
+
+import pytest
+
+from app import app
+from ingest import parse_water_sample
+from models import WaterSample
+from write_buffer import BufferFull, WriteBuffer
+
+SAMPLE = {
+    'location': 'Buffered Well', 'state': 'Kerala', 'district': 'Alappuzha',
+    'ph': 7.0, 'turbidity': 1.0, 'bacterial_count': 5, 'temperature': 25,
+    'contamination_level': 'Safe'
+}
+
+def test_concurrent_submits_are_group_committed():
+    buffer = WriteBuffer(app, flush_interval_ms=20, flush_rows=16).start()
+    results = []
+
+    def submit():
+        for _ in range(10):
+            results.append(buffer.submit(parse_water_sample(SAMPLE), durable=True))
+
+    threads = [threading.Thread(target=submit) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    buffer.stop()
+
+    ids = [result['id'] for result in results]
+    assert len(set(ids)) == 40
+    assert buffer.rows == 40
+    assert buffer.batches < 40
+    with app.app_context():
+        assert WaterSample.query.filter(WaterSample.id.in_(ids)).count() == 40
+
+def test_full_queue_is_rejected():
+    # Never started, so nothing drains the single slot
+    buffer = WriteBuffer(app, max_queue=1, timeout=0.01)
+    with pytest.raises(TimeoutError):
+        buffer.submit(parse_water_sample(SAMPLE))
+    with pytest.raises(BufferFull):
+        buffer.submit(parse_water_sample(SAMPLE))
+    assert buffer.rejected == 1
+
+def test_failed_sample_does_not_take_its_batch_with_it():
+    buffer = WriteBuffer(app, flush_interval_ms=200, flush_rows=16).start()
+    results, errors = [], []
+
+    def submit(fields):
+        try:
+            results.append(buffer.submit(fields, durable=True))
+        except Exception as e:
+            errors.append(e)
+
+    # A NULL location gets past the queue but not the NOT NULL constraint
+    samples = [SAMPLE, dict(SAMPLE, location=None), SAMPLE]
+    threads = [threading.Thread(target=submit, args=(parse_water_sample(sample),)) for sample in samples]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    buffer.stop()
+
+    assert len(results) == 2 and len(errors) == 1
+    assert buffer.batches == 1 and buffer.failed == 1
+    ids = [result['id'] for result in results]
+    with app.app_context():
+        assert WaterSample.query.filter(WaterSample.id.in_(ids)).count() == 2
+
+def test_non_finite_values_are_rejected_before_queueing():
+    for value in ('nan', 'inf', float('-inf')):
+        with pytest.raises(ValueError, match='ph must be finite'):
+            parse_water_sample(dict(SAMPLE, ph=value))
+
+def test_timed_out_sample_is_never_written():
+    # Not started yet, so the first request gives up before the flusher sees it
+    buffer = WriteBuffer(app, flush_interval_ms=20, timeout=0.01)
+    with pytest.raises(TimeoutError):
+        buffer.submit(parse_water_sample(dict(SAMPLE, location='Abandoned Well')))
+    assert buffer.cancelled == 1
+
+    buffer.timeout = 5.0
+    buffer.start()
+    retried = buffer.submit(parse_water_sample(dict(SAMPLE, location='Abandoned Well')), durable=True)
+    buffer.stop()
+
+    assert buffer.rows == 1
+    with app.app_context():
+        rows = WaterSample.query.filter_by(location='Abandoned Well').all()
+        assert [row.id for row in rows] == [retried['id']]
@@ -1,61 +1,127 @@
 import pandas as pd
 import numpy as np
 import os
+import glob
+import json
+import hashlib
+import argparse
+import io
+import itertools
+import time
+import warnings
 import logging
+from datetime import datetime
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import accuracy_score, classification_report
-from joblib import dump
+from joblib import Parallel, delayed, dump
+
+from forest import export_model
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def load_datasets():
+# Bump whenever FEATURE_SOURCES or the extraction below changes; cached
+# matrices from an older version are then ignored and rebuilt.
+PIPELINE_VERSION = 1
+FEATURES = ["ph", "dissolved_oxygen", "turbidity"]
+CACHE_DIR = os.path.join("datasets", ".cache")
+CHUNK_ROWS = 100_000
+
+# Feature → lower-cased source columns in order of preference; a (min, max)
+# pair is averaged. Features with no matching column get the default.
+FEATURE_SOURCES = {
+    "ph": (["ph level", ("ph - min", "ph - max")], 7.0),
+    "dissolved_oxygen": (["dissolved oxygen (mg/l)", ("dissolved - min", "dissolved - max")], 7.0),
+    "turbidity": (["turbidity (ntu)"], np.nan),
+}
+
+# Placeholders seen in monitoring exports ("BDL" = below detection limit)
+NA_VALUES = ["BDL", "ND", "NA", "N/A", "-", "--"]
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def plan_columns(path):
+    """Map each feature to the source column(s) it is built from, reading only the header"""
+    header = pd.read_csv(path, nrows=0).columns
+    by_name = {c.lower().strip(): c for c in header}
+    plan = {}
+    for feature, (candidates, default) in FEATURE_SOURCES.items():
+        plan[feature] = default
+        for candidate in candidates:
+            names = candidate if isinstance(candidate, tuple) else (candidate,)
+            if all(name in by_name for name in names):
+                plan[feature] = [by_name[name] for name in names]
+                break
+    return plan
+
+def _read_chunks(path, columns, chunk_rows):
+    """Yield float64 chunks of only the needed columns"""
+    for chunk in pd.read_csv(path, usecols=columns, chunksize=chunk_rows, na_values=NA_VALUES):
+        # Unknown placeholders leave a column as strings in this chunk only; coerce
+        # them to NaN like pd.to_numeric without re-reading the chunks already yielded
+        text = [c for c in columns if chunk[c].dtype == object]
+        if text:
+            logger.warning(f"{path} has non-numeric values in {text}; coercing them to NaN")
+            chunk[text] = chunk[text].apply(pd.to_numeric, errors="coerce")
+        yield chunk.astype(np.float64)
+
+def extract_features(path, chunk_rows=CHUNK_ROWS):
+    """Build the (n, len(FEATURES)) float64 matrix for one CSV, chunk by chunk"""
+    plan = plan_columns(path)
+    columns = sorted({c for source in plan.values() if isinstance(source, list) for c in source})
+    if not columns:
+        logger.warning(f"{path} has none of the feature columns; skipping")
+        return np.empty((0, len(FEATURES)))
+
+    parts = []
+    for chunk in _read_chunks(path, columns, chunk_rows):
+        part = np.empty((len(chunk), len(FEATURES)))
+        for i, feature in enumerate(FEATURES):
+            source = plan[feature]
+            if isinstance(source, list):
+                part[:, i] = chunk[source].to_numpy().mean(axis=1)
+            else:
+                part[:, i] = source
+        parts.append(part)
+    return np.concatenate(parts) if parts else np.empty((0, len(FEATURES)))
+
+def load_features(path, use_cache=True):
+    """Feature matrix for one CSV, cached as .npy keyed by file hash and PIPELINE_VERSION"""
+    name = os.path.splitext(os.path.basename(path))[0]
+    cache_path = os.path.join(CACHE_DIR, f"{name}-{file_sha256(path)[:16]}-v{PIPELINE_VERSION}.npy")
+    if use_cache and os.path.exists(cache_path):
+        matrix = np.load(cache_path)
+        logger.info(f"Loaded {name} features from cache: {matrix.shape[0]} rows")
+        return matrix
+
+    matrix = extract_features(path)
+    logger.info(f"Extracted {name} features: {matrix.shape[0]} rows")
+    if use_cache:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        for stale in glob.glob(os.path.join(CACHE_DIR, f"{name}-*.npy")):
+            os.remove(stale)
+        # Write then rename so an interrupted run never leaves a truncated cache
+        tmp_path = cache_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, matrix)
+        os.replace(tmp_path, cache_path)
+    return matrix
+
+def load_datasets(use_cache=True):
+    """Feature frame over every CSV in datasets/"""
     base = "datasets"
-    paths = {
-        "indian": os.path.join(base, "indian_water.csv"),
-        "pollution": os.path.join(base, "water_pollution.csv")
-    }
-    datasets = {}
-    for name, path in paths.items():
-        if os.path.exists(path):
-            df = pd.read_csv(path)
-            df.columns = [c.lower().strip() for c in df.columns]
-            datasets[name] = df
-            logger.info(f"Loaded {name}: {df.shape[0]} rows, {df.shape[1]} columns")
-        else:
-            logger.warning(f"{path} not found.")
-    return datasets
-
-def extract_features(df):
-    df.columns = [c.lower().strip() for c in df.columns]
-
-    if "pH level".lower() in df.columns:
-        df["ph"] = pd.to_numeric(df["pH level".lower()], errors="coerce")
-    elif "pH - min".lower() in df.columns and "pH - max".lower() in df.columns:
-        df["ph"] = (
-            pd.to_numeric(df["pH - min".lower()], errors="coerce") +
-            pd.to_numeric(df["pH - max".lower()], errors="coerce")
-        ) / 2
-    else:
-        df["ph"] = 7
-
-    if "dissolved oxygen (mg/l)".lower() in df.columns:
-        df["dissolved_oxygen"] = pd.to_numeric(df["dissolved oxygen (mg/l)".lower()], errors="coerce")
-    elif "dissolved - min" in df.columns and "dissolved - max" in df.columns:
-        df["dissolved_oxygen"] = (
-            pd.to_numeric(df["dissolved - min"], errors="coerce") +
-            pd.to_numeric(df["dissolved - max"], errors="coerce")
-        ) / 2
-    else:
-        df["dissolved_oxygen"] = 7
-
-    if "turbidity (ntu)" in df.columns:
-        df["turbidity"] = pd.to_numeric(df["turbidity (ntu)"], errors="coerce")
-    else:
-        df["turbidity"] = np.nan
-
-    return df[["ph", "dissolved_oxygen", "turbidity"]]
+    paths = sorted(glob.glob(os.path.join(base, "*.csv")))
+    if not paths:
+        logger.warning(f"No CSV files found in {base}/.")
+        return None
+    matrix = np.concatenate([load_features(path, use_cache) for path in paths])
+    return pd.DataFrame(matrix, columns=FEATURES)
 
 def create_target(df):
     df["Water_Quality"] = (
@@ -69,29 +135,100 @@ def create_target(df):
     )
     return df
 
-def train_model():
+# Candidate forests for model selection; kept small enough to search in seconds
+SEARCH_GRID = {
+    "n_estimators": [25, 50, 100, 200],
+    "max_depth": [None, 8, 12, 16],
+    "min_samples_leaf": [1, 5],
+}
+ACCURACY_TOLERANCE = 0.005
+LATENCY_REPEATS = 50
+
+def _fit_candidate(params, X_train, y_train, X_val, y_val):
+    model = RandomForestClassifier(random_state=42, **params)
+    model.fit(X_train, y_train)
+    return model, accuracy_score(y_val, model.predict(X_val))
+
+def _median_ms(fn, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return round(float(np.median(timings)) * 1000, 4)
+
+def measure_candidate(model, X_val):
+    """Serving cost of one fitted candidate: latency as /api/predict sees it, and pickle size"""
+    # Serving passes bare float arrays (see prediction.ModelRegistry)
+    rows = X_val.to_numpy(dtype=np.float64)
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", message="X does not have valid feature names")
+        single_ms = _median_ms(lambda: model.predict_proba(rows[:1]), LATENCY_REPEATS)
+        batch_ms = _median_ms(lambda: model.predict_proba(rows), max(LATENCY_REPEATS // 10, 3))
+    buffer = io.BytesIO()
+    dump(model, buffer)
+    return {
+        "single_row_ms": single_ms,
+        "batch_ms": batch_ms,
+        "batch_rows": len(rows),
+        "model_bytes": buffer.getbuffer().nbytes,
+        "nodes": int(sum(tree.tree_.node_count for tree in model.estimators_)),
+    }
+
+def select_model(X_train, y_train, X_val, y_val, tolerance=ACCURACY_TOLERANCE, n_jobs=-1):
+    """Search SEARCH_GRID in parallel and keep the smallest model within tolerance of the best.
+
+    Returns (model, params, candidates) where candidates holds the accuracy,
+    latency and size of every configuration tried.
+    """
+    grid = [dict(zip(SEARCH_GRID, values)) for values in itertools.product(*SEARCH_GRID.values())]
+    fitted = Parallel(n_jobs=n_jobs)(
+        delayed(_fit_candidate)(params, X_train, y_train, X_val, y_val) for params in grid
+    )
+
+    candidates = []
+    # Latency is timed serially so candidates do not compete for cores
+    for params, (model, accuracy) in zip(grid, fitted):
+        candidates.append({"params": params, "accuracy": round(float(accuracy), 4),
+                           **measure_candidate(model, X_val)})
+
+    best_accuracy = max(c["accuracy"] for c in candidates)
+    eligible = [i for i, c in enumerate(candidates) if c["accuracy"] >= best_accuracy - tolerance]
+    chosen = min(eligible, key=lambda i: (candidates[i]["model_bytes"], candidates[i]["single_row_ms"]))
+    for i, candidate in enumerate(candidates):
+        candidate["selected"] = i == chosen
+        logger.info(
+            f"{'*' if i == chosen else ' '} {candidate['params']}: acc {candidate['accuracy']:.4f}, "
+            f"1 row {candidate['single_row_ms']:.3f} ms, {candidate['batch_rows']} rows "
+            f"{candidate['batch_ms']:.3f} ms, {candidate['model_bytes'] / 1024:.0f} KiB"
+        )
+    return fitted[chosen][0], grid[chosen], candidates
+
+def train_model(use_cache=True, tolerance=ACCURACY_TOLERANCE, n_jobs=-1):
     logger.info("=== TRAINING STARTED ===")
 
-    data = load_datasets()
-    if not data:
+    df = load_datasets(use_cache)
+    if df is None or df.empty:
         logger.error("No datasets found. Cannot train.")
         return
 
-    df = pd.concat(data.values(), ignore_index=True)
     logger.info(f"Combined dataset size: {df.shape}")
 
-    df = extract_features(df)
     df = create_target(df)
 
-    X = df[["ph", "dissolved_oxygen", "turbidity"]].fillna(2)
+    X = df[FEATURES].fillna(2)
     y = df["Water_Quality"]
 
     X_train, X_test, y_train, y_test = train_test_split(
         X, y, test_size=0.2, random_state=42
     )
+    # Candidates are compared on a validation split so the test score stays unbiased
+    X_fit, X_val, y_fit, y_val = train_test_split(
+        X_train, y_train, test_size=0.2, random_state=42
+    )
 
-    model = RandomForestClassifier(n_estimators=200, random_state=42)
-    model.fit(X_train, y_train)
+    model, params, candidates = select_model(X_fit, y_fit, X_val, y_val, tolerance, n_jobs)
+    logger.info(f"Selected {params} (tolerance {tolerance})")
 
     preds = model.predict(X_test)
     acc = accuracy_score(y_test, preds)
@@ -101,9 +238,40 @@ def train_model():
     os.makedirs("models", exist_ok=True)
     dump(model, "models/ai_model.pkl")
     logger.info("Model saved → models/ai_model.pkl")
+    # Node arrays the serving workers memory-map and share (see forest.py)
+    logger.info(f"Flattened export saved → {export_model('models/ai_model.pkl', model)}")
+
+    # Feature schema checked by prediction.ModelRegistry at load time, plus
+    # the selection record explaining why this model was chosen
+    selected = next(c for c in candidates if c["selected"])
+    metadata = {
+        "features": list(X.columns),
+        "classes": [str(c) for c in model.classes_],
+        "accuracy": round(float(acc), 4),
+        "params": params,
+        "single_row_ms": selected["single_row_ms"],
+        "batch_ms": selected["batch_ms"],
+        "model_bytes": selected["model_bytes"],
+        "selection": {
+            "accuracy_tolerance": tolerance,
+            "validation_rows": len(X_val),
+            "candidates": candidates
+        },
+        "trained_at": datetime.utcnow().isoformat()
+    }
+    with open("models/ai_model.meta.json", "w") as f:
+        json.dump(metadata, f, indent=2)
+    logger.info("Schema saved → models/ai_model.meta.json")
 
     logger.info("=== TRAINING COMPLETE ===")
     return model, acc
 
 if __name__ == "__main__":
-    train_model()
+    parser = argparse.ArgumentParser(description="Train the water quality model")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="re-parse the CSVs instead of using datasets/.cache")
+    parser.add_argument("--tolerance", type=float, default=ACCURACY_TOLERANCE,
+                        help="accuracy a smaller model may give up against the best candidate")
+    parser.add_argument("--jobs", type=int, default=-1, help="parallel fits during the search")
+    args = parser.parse_args()
+    train_model(use_cache=not args.no_cache, tolerance=args.tolerance, n_jobs=args.jobs)
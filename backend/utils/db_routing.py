@@ -0,0 +1,21 @@
+from flask import has_request_context, request
+from flask_sqlalchemy.session import Session
+
+# SQLALCHEMY_BINDS key of the read-only engine configured by database.init_db
+READ_BIND = 'read'
+
+class RoutingSession(Session):
+    """Session that sends queries made while serving GET/HEAD to the read bind.
+
+    Dashboard reads then draw from their own connection pool and never queue
+    behind ingest requests holding the writer connections. Anything flushing,
+    and all work outside a read-only request (POSTs, scripts, background
+    threads), stays on the default engine so it sees its own writes.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing
+                and READ_BIND in self._db.engines
+                and has_request_context() and request.method in ('GET', 'HEAD')):
+            return self._db.engines[READ_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
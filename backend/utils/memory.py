@@ -0,0 +1,47 @@
+"""Resident vs. shared memory of the current process, read from /proc (Linux only)."""
+
+SMAPS = '/proc/self/smaps'
+
+# smaps fields summed per mapping, all in kB
+FIELDS = ('Rss', 'Pss', 'Shared_Clean', 'Shared_Dirty', 'Private_Clean', 'Private_Dirty')
+
+def process_memory(path_prefix=None):
+    """Return MiB totals for the process and for file mappings under path_prefix.
+
+    "shared" pages are also mapped by another process (e.g. a second worker
+    reading the same model files); Pss splits them evenly between those
+    processes. Returns None where /proc/self/smaps is not available.
+    """
+    totals = dict.fromkeys(FIELDS, 0)
+    mapped = dict.fromkeys(FIELDS, 0)
+    in_prefix = False
+    try:
+        with open(SMAPS) as f:
+            for line in f:
+                parts = line.split(None, 5)
+                if not parts:
+                    continue
+                if not parts[0].endswith(':'):
+                    # Mapping header: "start-end perms offset dev inode [path]"
+                    path = parts[5].strip() if len(parts) > 5 else ''
+                    in_prefix = bool(path_prefix) and path.startswith(path_prefix)
+                elif parts[0][:-1] in totals:
+                    field, kb = parts[0][:-1], int(parts[1])
+                    totals[field] += kb
+                    if in_prefix:
+                        mapped[field] += kb
+    except OSError:
+        return None
+
+    def summarize(kb):
+        return {
+            'rss_mb': round(kb['Rss'] / 1024, 1),
+            'pss_mb': round(kb['Pss'] / 1024, 1),
+            'shared_mb': round((kb['Shared_Clean'] + kb['Shared_Dirty']) / 1024, 1),
+            'private_mb': round((kb['Private_Clean'] + kb['Private_Dirty']) / 1024, 1)
+        }
+
+    report = summarize(totals)
+    if path_prefix:
+        report['mapped'] = summarize(mapped)
+    return report
@@ -0,0 +1,68 @@
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import tuple_
+from utils.serialization import dumps
+
+def encode_cursor(sort_value, row_id):
+    """Opaque cursor pointing just after (sort_value, row_id) in descending order"""
+    raw = json.dumps([sort_value.isoformat(), row_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor; raises ValueError on anything malformed"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(sort_value), int(row_id)
+    except (TypeError, ValueError, json.JSONDecodeError) as e:
+        raise ValueError(f'Invalid cursor: {cursor}') from e
+
+def parse_limit(value, default, maximum):
+    """Validate a ?limit= argument"""
+    if value is None:
+        return default
+    limit = int(value)
+    if limit < 1 or limit > maximum:
+        raise ValueError(f'limit must be between 1 and {maximum}')
+    return limit
+
+def keyset_page(query, sort_column, id_column, limit, cursor=None):
+    """Return (rows, next_cursor) for one page ordered by (sort_column, id) descending.
+
+    Seeks past the cursor with a row-value comparison instead of OFFSET, so
+    every page costs the same regardless of how deep the client has scrolled.
+    """
+    if cursor:
+        sort_value, row_id = decode_cursor(cursor)
+        query = query.filter(tuple_(sort_column, id_column) < tuple_(sort_value, row_id))
+
+    rows = query.order_by(sort_column.desc(), id_column.desc()).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, sort_column.key), getattr(last, id_column.key))
+    return rows, next_cursor
+
+def stream_json_array(query, serialize_rows, chunk_size=1000):
+    """Yield a JSON array in chunks, fetching rows from a server-side cursor.
+
+    serialize_rows turns one batch of fetched rows into JSON-ready values, so
+    only about chunk_size rows are alive at a time and each chunk is encoded
+    with a single dumps() call.
+    """
+    yield '['
+    first = True
+    buffer = []
+    for row in query.yield_per(chunk_size):
+        buffer.append(row)
+        if len(buffer) >= chunk_size:
+            yield ('' if first else ',') + dumps(serialize_rows(buffer))[1:-1]
+            first = False
+            buffer = []
+    if buffer:
+        yield ('' if first else ',') + dumps(serialize_rows(buffer))[1:-1]
+    yield ']'
@@ -0,0 +1,159 @@
+"""
+Response encoding: a faster JSON provider, optional MessagePack and
+gzip/deflate negotiation.
+
+orjson and msgpack are optional (pip install orjson msgpack). Without orjson
+the stdlib encoder is used with the same output; without msgpack requests
+that only accept it get 406.
+"""
+
+import json
+import zlib
+from datetime import date, datetime
+
+from flask import request
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import types as sa_types
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - depends on the environment
+    msgpack = None
+
+JSON_MIMETYPE = 'application/json'
+MSGPACK_MIMETYPES = ('application/msgpack', 'application/x-msgpack')
+
+# Responses worth compressing; tiny bodies cost more in headers and CPU than they save
+COMPRESSIBLE_MIMETYPES = {'application/json', 'application/msgpack', 'text/csv', 'text/plain'}
+
+def _default(value):
+    # Dates go out as ISO 8601, the format every to_dict() already uses
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if hasattr(value, 'tolist'):  # numpy scalars and arrays
+        return value.tolist()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_SORT_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def dumps_bytes(obj, pretty=False):
+        option = _ORJSON_OPTIONS | orjson.OPT_INDENT_2 if pretty else _ORJSON_OPTIONS
+        return orjson.dumps(obj, default=_default, option=option)
+else:
+    def dumps_bytes(obj, pretty=False):
+        layout = {'indent': 2} if pretty else {'separators': (',', ':')}
+        return json.dumps(obj, default=_default, sort_keys=True, **layout).encode()
+
+def dumps(obj):
+    return dumps_bytes(obj).decode()
+
+def row_serializer(columns):
+    """Return a function turning a batch of row tuples into to_dict()-shaped dicts.
+
+    Keys are resolved once from the selected columns. orjson writes datetimes
+    as the same ISO strings to_dict() builds, so they pass through untouched;
+    the stdlib fallback formats each date column once per batch instead.
+    """
+    names = tuple(column.key for column in columns)
+    date_positions = tuple(
+        i for i, column in enumerate(columns) if isinstance(column.type, (sa_types.Date, sa_types.DateTime))
+    )
+
+    def serialize_rows(rows):
+        if orjson is None and date_positions and rows:
+            values = list(zip(*rows))
+            for i in date_positions:
+                values[i] = [value.isoformat() if value is not None else None for value in values[i]]
+            rows = zip(*values)
+        return [dict(zip(names, row)) for row in rows]
+
+    return serialize_rows
+
+class FastJSONProvider(DefaultJSONProvider):
+    """jsonify() through orjson when it is installed; keys stay sorted as before.
+
+    Like the default provider, responses are indented in debug mode or when
+    compact is set to False.
+    """
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return dumps(obj)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            return self._app.response_class(dumps_bytes(obj, pretty=True) + b'\n', mimetype=self.mimetype)
+        return self._app.response_class(dumps_bytes(obj), mimetype=self.mimetype)
+
+def wants_msgpack():
+    """True when the client prefers MessagePack over JSON"""
+    accept = request.accept_mimetypes
+    return max(accept[m] for m in MSGPACK_MIMETYPES) > accept[JSON_MIMETYPE]
+
+def msgpack_available():
+    return msgpack is not None
+
+def msgpack_bytes(obj):
+    return msgpack.packb(obj, default=_default, use_bin_type=True, datetime=False)
+
+def choose_encoding(accept_encodings):
+    """Pick gzip or deflate from Accept-Encoding (gzip wins ties); None for identity"""
+    best, best_quality = None, 0
+    for coding in ('gzip', 'deflate'):
+        quality = accept_encodings[coding]
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+def _compressor(coding, level):
+    # wbits 31 = gzip container, 15 = zlib stream (what HTTP calls "deflate")
+    return zlib.compressobj(level, zlib.DEFLATED, 31 if coding == 'gzip' else 15)
+
+def _compress_stream(chunks, coding, level):
+    compressor = _compressor(coding, level)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode() if isinstance(chunk, str) else chunk)
+        # Sync-flush so streamed rows reach the client as they are produced
+        data += compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
+
+def init_compression(app):
+    """Compress eligible responses according to the request's Accept-Encoding.
+
+    COMPRESS_MIN_BYTES skips small bodies, COMPRESS_LEVEL trades CPU for size.
+    Streamed responses are compressed chunk by chunk.
+    """
+    @app.after_request
+    def compress_response(response):
+        if (response.status_code < 200 or response.status_code >= 300 or response.status_code == 204
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+            return response
+        response.vary.add('Accept-Encoding')
+
+        coding = choose_encoding(request.accept_encodings)
+        if coding is None:
+            return response
+        level = int(app.config['COMPRESS_LEVEL'])
+
+        if response.is_streamed:
+            response.response = _compress_stream(response.response, coding, level)
+            response.headers.pop('Content-Length', None)
+        else:
+            body = response.get_data()
+            if len(body) < int(app.config['COMPRESS_MIN_BYTES']):
+                return response
+            compressor = _compressor(coding, level)
+            response.set_data(compressor.compress(body) + compressor.flush())
+        response.headers['Content-Encoding'] = coding
+        return response
@@ -0,0 +1,73 @@
+import hashlib
+from functools import wraps
+
+from flask import Response, make_response, request
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from models import db
+from utils.serialization import wants_msgpack
+
+class TableVersion(db.Model):
+    """Monotonic change counter per table, bumped in the writer's transaction"""
+    __tablename__ = 'table_versions'
+    
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+def bump_version(*tables):
+    """Increment the version of each table (caller commits); returns {table: new version}"""
+    versions = {}
+    for table in tables:
+        stmt = sqlite_insert(TableVersion).values(name=table, version=1)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[TableVersion.name],
+            set_={'version': TableVersion.version + 1}
+        ).returning(TableVersion.version)
+        versions[table] = db.session.execute(stmt).scalar_one()
+    return versions
+
+def current_versions(*tables):
+    """Current version of each table; tables never written to report 0"""
+    rows = db.session.query(TableVersion.name, TableVersion.version).filter(
+        TableVersion.name.in_(tables)
+    ).all()
+    versions = dict.fromkeys(tables, 0)
+    versions.update(rows)
+    return versions
+
+def make_etag(versions, path, args, variant=''):
+    """Weak validator from table versions plus the normalized query string.
+    
+    variant distinguishes representations negotiated from headers (Accept).
+    """
+    parts = [path, variant]
+    parts += [f'{table}={versions[table]}' for table in sorted(versions)]
+    parts += [f'{key}={value}' for key, value in sorted(args.items(multi=True))]
+    return hashlib.sha1('&'.join(parts).encode()).hexdigest()
+
+def conditional_get(*tables, skip=None):
+    """Answer If-None-Match with 304 when none of the tables changed.
+    
+    The ETag is checked before the view runs, so a 304 costs one primary-key
+    lookup on table_versions and never reaches the query or the serializer.
+    skip(request) can opt a request out (e.g. long polls).
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if skip is not None and skip(request):
+                return view(*args, **kwargs)
+            
+            variant = 'msgpack' if wants_msgpack() else ''
+            etag = make_etag(current_versions(*tables), request.path, request.args, variant)
+            if request.if_none_match.contains_weak(etag):
+                response = Response(status=304)
+                response.set_etag(etag, weak=True)
+                return response
+            
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                response.set_etag(etag, weak=True)
+                response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return wrapper
+    return decorator
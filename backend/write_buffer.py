@@ -0,0 +1,218 @@
+"""
+Group-commit write buffer for single-sample POST /api/water requests.
+
+With WATER_WRITE_MODE='buffered', request threads validate the body and hand
+the fields to one flusher thread, which stages each sample in a shared
+transaction (assigning its id straight away) and commits every
+WRITE_BUFFER_FLUSH_MS milliseconds or WRITE_BUFFER_FLUSH_ROWS rows, whichever
+comes first. One fsync then covers the whole batch instead of one per request.
+Each sample is staged under its own savepoint, so one that fails only fails
+its own request.
+
+A sample acknowledged before its batch commits is accepted, not durable:
+if that commit fails the rows are lost and logged. Callers that need
+durability wait for the commit with ?durable=1.
+
+A request that times out before the flusher picks its sample up cancels
+it, so a client retrying the error cannot end up with two rows.
+"""
+
+import logging
+import queue
+import threading
+import time
+
+from models import db
+from ingest import stage_water_sample
+
+logger = logging.getLogger(__name__)
+
+class BufferFull(Exception):
+    """Raised when the queue is at WRITE_BUFFER_MAX_QUEUE; callers should retry"""
+
+class NotYetDurable(Exception):
+    """A durable submit timed out after its sample was staged; it is accepted, the commit is pending"""
+
+    def __init__(self, sample):
+        super().__init__('accepted, not yet durable')
+        self.sample = sample
+
+class _Pending:
+    __slots__ = ('fields', 'assigned', 'durable', 'result', 'error', 'claimed', 'cancelled')
+
+    def __init__(self, fields):
+        self.fields = fields
+        self.assigned = threading.Event()
+        self.durable = threading.Event()
+        self.result = None
+        self.error = None
+        self.claimed = False    # the flusher has started staging it
+        self.cancelled = False  # the caller gave up first; never written
+
+    def fail(self, error):
+        self.error = error
+        self.assigned.set()
+        self.durable.set()
+
+class WriteBuffer:
+    """Bounded queue of pending samples drained by a single group-committing thread"""
+
+    def __init__(self, app, max_queue=10000, flush_interval_ms=50, flush_rows=500, timeout=5.0):
+        self.app = app
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.flush_rows = flush_rows
+        self.timeout = timeout
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._thread = None
+        # Settles whether a timed-out sample is cancelled or claimed by the flusher
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.rows = 0
+        self.rejected = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.last_batch_rows = 0
+        self.last_commit_ms = 0.0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='water-write-buffer', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=5.0):
+        """Stop accepting work and flush whatever is still queued"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def submit(self, fields, durable=False):
+        """Queue validated sample fields; returns the sample dict once it has an id.
+
+        With durable=True this waits for the batch commit instead. Raises
+        BufferFull when the queue is full and TimeoutError when the flusher
+        does not get to the sample within WRITE_BUFFER_TIMEOUT seconds (the
+        sample is then cancelled, never written). A durable submit whose
+        sample was staged but not yet committed in time raises NotYetDurable.
+        """
+        if self._stop.is_set():
+            raise BufferFull('write buffer is shutting down')
+        pending = _Pending(fields)
+        try:
+            self._queue.put_nowait(pending)
+        except queue.Full:
+            self.rejected += 1
+            raise BufferFull('write buffer is full, retry shortly')
+
+        done = pending.durable if durable else pending.assigned
+        if not done.wait(self.timeout):
+            with self._lock:
+                if not pending.claimed:
+                    pending.cancelled = True
+                    self.cancelled += 1
+                    raise TimeoutError('timed out waiting for the write buffer; the sample was not written')
+            # Already being staged: it gets its id (or its error) momentarily
+            if not pending.assigned.wait(self.timeout):
+                raise TimeoutError('timed out waiting for the write buffer')
+            if pending.error is None and durable and not pending.durable.is_set():
+                raise NotYetDurable(pending.result)
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def _claim(self, pending):
+        """Mark a queued sample as being staged, unless its caller already gave up"""
+        with self._lock:
+            if pending.cancelled:
+                return False
+            pending.claimed = True
+            return True
+
+    def _run(self):
+        while not (self._stop.is_set() and self._queue.empty()):
+            try:
+                first = self._queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            try:
+                with self.app.app_context():
+                    self._flush_batch(first)
+            except Exception as e:
+                logger.error(f"Write buffer flush failed: {e}")
+
+    def _flush_batch(self, first):
+        """Stage queued samples until the interval or row limit is hit, then commit once"""
+        deadline = time.monotonic() + self.flush_interval
+        batch = []
+        pending = first
+        try:
+            # pysqlite leaves the transaction to the first INSERT, so a SAVEPOINT issued
+            # before it would start one of its own and RELEASE would commit it
+            db.session.connection().exec_driver_sql('BEGIN IMMEDIATE')
+            while True:
+                # Samples whose request already timed out are dropped unwritten
+                if self._claim(pending):
+                    try:
+                        with db.session.begin_nested():
+                            sample = stage_water_sample(pending.fields)
+                    except Exception as e:
+                        self.failed += 1
+                        logger.warning(f"Write buffer rejected a sample: {e}")
+                        pending.fail(e)
+                    else:
+                        pending.result = sample.to_dict()
+                        batch.append(pending)
+                        pending.assigned.set()
+                pending = None
+
+                remaining = deadline - time.monotonic()
+                if len(batch) >= self.flush_rows or remaining <= 0:
+                    break
+                try:
+                    pending = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+
+            start = time.perf_counter()
+            db.session.commit()
+            self.last_commit_ms = (time.perf_counter() - start) * 1000
+        except Exception as e:
+            db.session.rollback()
+            self.failed += len(batch) + (pending is not None)
+            logger.error(f"Write buffer batch of {len(batch)} samples rolled back "
+                         f"(acknowledged samples are lost): {e}")
+            for item in batch + ([pending] if pending is not None else []):
+                item.fail(e)
+            return
+
+        if not batch:
+            return
+        for item in batch:
+            item.durable.set()
+        self.batches += 1
+        self.rows += len(batch)
+        self.last_batch_rows = len(batch)
+
+    def stats(self):
+        return {
+            'queued': self._queue.qsize(),
+            'batches': self.batches,
+            'rows': self.rows,
+            'rejected': self.rejected,
+            'failed': self.failed,
+            'cancelled': self.cancelled,
+            'avg_batch_rows': round(self.rows / self.batches, 1) if self.batches else 0.0,
+            'last_batch_rows': self.last_batch_rows,
+            'last_commit_ms': round(self.last_commit_ms, 3)
+        }
+
+def start_write_buffer(app):
+    """Start the flusher configured by WRITE_BUFFER_* settings"""
+    return WriteBuffer(
+        app,
+        max_queue=int(app.config['WRITE_BUFFER_MAX_QUEUE']),
+        flush_interval_ms=float(app.config['WRITE_BUFFER_FLUSH_MS']),
+        flush_rows=int(app.config['WRITE_BUFFER_FLUSH_ROWS']),
+        timeout=float(app.config['WRITE_BUFFER_TIMEOUT'])
+    ).start()